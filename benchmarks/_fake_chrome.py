@@ -0,0 +1,276 @@
+"""
+A tiny stand-in for chromium so benchmarks can run without a browser.
+
+Run as a script, it speaks NUL-framed JSON devtools protocol on stdin/stdout,
+or chromium's CBOR with `--cbor`, and answers the handful of commands
+choreographer needs to open and close a browser, plus `Fake.emit` which
+sends `count` copies of an event.
+
+Imported, it provides `FakeChromium`, a `browser_cls` for `Browser`.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import os
+import re
+import sys
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pathlib import Path
+    from typing import Any, Mapping, MutableMapping, Sequence
+
+    from choreographer.channels._interface_type import ChannelInterface
+
+SCREENSHOT_BYTES = 2**20
+
+
+class FakeChromium:
+    """A `BrowserImplInterface` that runs this file instead of chromium."""
+
+    path: str | Path | None = __file__
+
+    @classmethod
+    def find_browser(cls, *, skip_local: bool, skip_typical: bool = False) -> str:
+        _ = skip_local, skip_typical
+        return __file__
+
+    def __init__(
+        self,
+        channel: ChannelInterface,
+        path: Path | str | None = None,
+        **kwargs: Any,
+    ) -> None:
+        _ = path
+        self._channel = channel
+        self._args = [f"--{k}={v}" for k, v in kwargs.items()]
+
+    def pre_open(self) -> None:
+        pass
+
+    def get_popen_args(self) -> Mapping[str, Any]:
+        return {
+            "close_fds": True,
+            "stdin": self._channel.from_choreo_to_external,  # type: ignore [attr-defined]
+            "stdout": self._channel.from_external_to_choreo,  # type: ignore [attr-defined]
+            "start_new_session": True,
+        }
+
+    def get_cli(self) -> Sequence[str]:
+        cbor = ["--cbor"] if getattr(self._channel, "cbor", False) else []
+        return [sys.executable, __file__, *cbor, *self._args]
+
+    def get_env(self) -> MutableMapping[str, str]:
+        return os.environ.copy()
+
+    def clean(self) -> None:
+        pass
+
+    def is_isolated(self) -> bool:
+        return False
+
+
+### Everything below is the fake browser process ###
+
+
+class _Peer:
+    def __init__(self, screenshot_bytes: int, *, cbor: bool = False) -> None:
+        png = os.urandom(screenshot_bytes)
+        self.screenshot: str | bytes = png if cbor else base64.b64encode(png).decode()
+        self.cbor = cbor
+        self.targets: dict[str, str] = {"T0": "about:blank"}
+        self.sessions: dict[str, str] = {}
+        self.discover = False
+        self.counter = 0
+        self.out: list[bytes] = []
+
+    def _new_id(self, prefix: str) -> str:
+        self.counter += 1
+        return f"{prefix}{self.counter}"
+
+    def _info(self, target_id: str) -> dict[str, Any]:
+        return {
+            "targetId": target_id,
+            "type": "page",
+            "url": self.targets[target_id],
+            "attached": target_id in self.sessions.values(),
+        }
+
+    def send(self, obj: Any) -> None:
+        if self.cbor:
+            self.out.append(_cbor_codec().encode(obj))
+        else:
+            self.out.append(json.dumps(obj, separators=(",", ":")).encode() + b"\0")
+
+    def event(self, method: str, params: Any, session_id: str = "") -> None:
+        event = {"method": method, "params": params}
+        if session_id:
+            event["sessionId"] = session_id
+        self.send(event)
+
+    def handle(self, cmd: dict[str, Any]) -> bool:  # noqa: C901, PLR0912, PLR0915
+        method = cmd["method"]
+        params = cmd.get("params", {})
+        result: Any = {}
+        keep_going = True
+        if method == "Target.getTargets":
+            result = {"targetInfos": [self._info(t) for t in self.targets]}
+        elif method == "Target.setDiscoverTargets":
+            self.discover = params.get("discover", False)
+            for t in self.targets:
+                self.event("Target.targetCreated", {"targetInfo": self._info(t)})
+        elif method == "Target.createTarget":
+            target_id = self._new_id("T")
+            self.targets[target_id] = params.get("url", "")
+            result = {"targetId": target_id}
+            if self.discover:
+                self.event(
+                    "Target.targetCreated", {"targetInfo": self._info(target_id)}
+                )
+        elif method == "Target.closeTarget":
+            target_id = params["targetId"]
+            if target_id not in self.targets:
+                return self._error(cmd, -32602, "No target with given id found")
+            for s, t in list(self.sessions.items()):
+                if t == target_id:
+                    del self.sessions[s]
+                    self.event(
+                        "Target.detachedFromTarget",
+                        {"sessionId": s, "targetId": t},
+                    )
+            del self.targets[target_id]
+            if self.discover:
+                self.event("Target.targetDestroyed", {"targetId": target_id})
+            result = {"success": True}
+        elif method in ("Target.attachToTarget", "Target.attachToBrowserTarget"):
+            target_id = params.get("targetId", "browser")
+            if target_id != "browser" and target_id not in self.targets:
+                return self._error(cmd, -32602, "No target with given id found")
+            session_id = self._new_id("S")
+            self.sessions[session_id] = target_id
+            result = {"sessionId": session_id}
+        elif method == "Target.detachFromTarget":
+            session_id = params["sessionId"]
+            target_id = self.sessions.pop(session_id, "")
+            self.event(
+                "Target.detachedFromTarget",
+                {"sessionId": session_id, "targetId": target_id},
+            )
+        elif method == "Page.captureScreenshot":
+            result = {"data": self.screenshot}
+        elif method == "Runtime.evaluate":
+            expression = params.get("expression", "")
+            result = {"result": {"type": "number", "value": len(expression)}}
+        elif method == "Fake.emit":
+            for i in range(params.get("count", 1)):
+                self.event(
+                    params.get("method", "Fake.event"),
+                    {"i": i, **params.get("params", {})},
+                    cmd.get("sessionId", ""),
+                )
+        elif method == "Browser.getVersion":
+            result = {"product": "FakeChrome/1.0", "protocolVersion": "1.3"}
+        elif method == "Browser.close":
+            keep_going = False
+        elif not method.startswith(
+            ("Page.", "Runtime.", "Network.", "Emulation.", "Inspector.", "Storage."),
+        ):
+            return self._error(cmd, -32601, f"'{method}' wasn't found")
+        response = {"id": cmd["id"], "result": result}
+        if "sessionId" in cmd:
+            response["sessionId"] = cmd["sessionId"]
+        self.send(response)
+        return keep_going
+
+    def _error(self, cmd: dict[str, Any], code: int, message: str) -> bool:
+        response = {"id": cmd["id"], "error": {"code": code, "message": message}}
+        if "sessionId" in cmd:
+            response["sessionId"] = cmd["sessionId"]
+        self.send(response)
+        return True
+
+    def flush(self) -> None:
+        data = b"".join(self.out)
+        self.out.clear()
+        view = memoryview(data)
+        while view:
+            view = view[os.write(1, view) :]
+
+
+_LARGE = 2**20
+_ID = re.compile(rb'"id":\s*(\d+)')
+_METHOD = re.compile(rb'"method":\s*"([^"]+)"')
+_SESSION = re.compile(rb'"sessionId":\s*"([^"]*)"')
+
+
+def _skim(frame: bytes) -> dict[str, Any]:
+    # don't let parsing huge commands dominate a benchmark, answer from the head
+    head = frame[:256]
+    cmd: dict[str, Any] = {}
+    for key, pattern in (("id", _ID), ("method", _METHOD), ("sessionId", _SESSION)):
+        if match := pattern.search(head):
+            cmd[key] = (
+                json.loads(match.group(1)) if key == "id" else match.group(1).decode()
+            )
+    return cmd
+
+
+def _cbor_codec() -> Any:
+    from choreographer.channels._cbor import CborCodec  # noqa: PLC0415 cbor only
+
+    return CborCodec()
+
+
+def _run_cbor(peer: _Peer) -> None:
+    from choreographer.channels._cbor import ENVELOPE_HEAD, frame_size  # noqa: PLC0415
+
+    codec = _cbor_codec()
+    data = b""
+    while True:
+        chunk = os.read(0, 2**20)
+        if not chunk:
+            return
+        data += chunk
+        start = 0
+        while len(data) - start >= ENVELOPE_HEAD:
+            end = start + frame_size(data, start)
+            if end > len(data):
+                break
+            if not peer.handle(codec.decode(data[start:end])):
+                peer.flush()
+                return
+            start = end
+        data = data[start:]
+        peer.flush()
+
+
+def _run() -> None:
+    screenshot_bytes = int(os.environ.get("FAKE_SCREENSHOT_BYTES", SCREENSHOT_BYTES))
+    if "--cbor" in sys.argv:
+        _run_cbor(_Peer(screenshot_bytes, cbor=True))
+        return
+    peer = _Peer(screenshot_bytes)
+    partial: list[bytes] = []
+    while True:
+        chunk = os.read(0, 2**20)
+        if not chunk:
+            return
+        if b"\0" not in chunk:
+            partial.append(chunk)
+            continue
+        *frames, rest = b"".join([*partial, chunk]).split(b"\0")
+        partial = [rest]
+        for frame in frames:
+            if not frame:
+                continue
+            cmd = _skim(frame) if len(frame) > _LARGE else json.loads(frame)
+            if not peer.handle(cmd):
+                peer.flush()
+                return
+        peer.flush()
+
+
+if __name__ == "__main__":
+    _run()
@@ -0,0 +1,56 @@
+"""
+Compare writing numpy arrays in bulk against walking them as python lists.
+
+The list column is what every codec did before: `tolist()` and encode that.
+Numbers are only written in bulk with `orjson` or `msgspec` installed.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from choreographer.channels import _wire as wire
+
+if TYPE_CHECKING:
+    from typing import Any, Callable
+
+REPEAT = 3
+SIZE = 10**7
+MIN_SPEEDUP = 5  # for floats with the default codec, when written in bulk
+
+_rng = np.random.default_rng(0)
+ARRAYS = {
+    "10M float64": _rng.random(SIZE),
+    "10M int64": _rng.integers(0, 2**40, SIZE),
+    "1M datetime64": np.arange(10**6).astype("datetime64[s]"),
+}
+
+
+def _best(fn: Callable[[], Any]) -> float:
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def main() -> None:
+    print(f"{'ms':>26} {'list':>10} {'array':>10} {'speedup':>8}")
+    # cbor is measured in bench_cbor.py
+    for codec in [c for c in wire.available_codecs() if not wire.is_binary(c)]:
+        for name, a in ARRAYS.items():
+            walked = _best(lambda c=codec, a=a: wire.serialize({"x": a.tolist()}, c))
+            bulk = _best(lambda c=codec, a=a: wire.serialize({"x": a}, c))
+            label = f"{codec} {name}"
+            print(f"{label:>26} {walked:>10.0f} {bulk:>10.0f} {walked / bulk:>8.1f}")
+            bulk_floats = name == "10M float64" and codec == "simplejson"
+            if bulk_floats and wire._fast_formatter():  # noqa: SLF001
+                assert walked > MIN_SPEEDUP * bulk, f"{label} isn't written in bulk"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Compare ways of sending a render setup's independent commands.
+
+Each round sends the four commands a render typically starts with to a tab
+of the fake browser in `_fake_chrome.py`: one at a time, with
+`asyncio.gather()` and with `send_commands()`. Prints the time per round
+and the writes per round (the pipe's `os.writev()` calls).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from unittest import mock
+
+from _fake_chrome import FakeChromium
+
+import choreographer as choreo
+
+ROUNDS = 500
+SETUP = [
+    ("Page.enable", None),
+    ("Emulation.setDeviceMetricsOverride", {"width": 800, "height": 600}),
+    ("Emulation.setDefaultBackgroundColorOverride", {"color": {"a": 0}}),
+    ("Page.navigate", {"url": "about:blank"}),
+]
+
+
+async def one_at_a_time(tab: choreo.Tab) -> None:
+    for method, params in SETUP:
+        await tab.send_command(method, params)
+
+
+async def gathered(tab: choreo.Tab) -> None:
+    await asyncio.gather(*(tab.send_command(m, p) for m, p in SETUP))
+
+
+async def batched(tab: choreo.Tab) -> None:
+    await tab.send_commands(SETUP)
+
+
+async def main() -> None:
+    print(f"{'':>14} {'us/round':>9} {'writes/round':>13}")
+    async with choreo.Browser(browser_cls=FakeChromium) as browser:
+        tab = await browser.create_tab("")
+        for name, run in (
+            ("one at a time", one_at_a_time),
+            ("gather", gathered),
+            ("send_commands", batched),
+        ):
+            if name == "send_commands" and not hasattr(tab, "send_commands"):
+                continue
+            with mock.patch("os.writev", wraps=os.writev) as writev:
+                start = time.perf_counter()
+                for _ in range(ROUNDS):
+                    await run(tab)
+                elapsed = (time.perf_counter() - start) / ROUNDS * 1e6
+            writes = writev.call_count / ROUNDS
+            print(f"{name:>14} {elapsed:>9.0f} {writes:>13.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
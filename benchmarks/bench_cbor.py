@@ -0,0 +1,80 @@
+"""
+Compare JSON and CBOR pipes on screenshots: bytes on the wire and our CPU.
+
+The first table decodes screenshot responses in process, the bytes are what
+chromium would write. JSON's CPU includes the `base64.b64decode()` the
+caller needs to get the png, CBOR hands over `bytes`.
+
+The second takes screenshots from the fake browser in `_fake_chrome.py`
+and counts this process's CPU time (all threads) per screenshot.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import os
+import time
+
+from _fake_chrome import FakeChromium
+
+import choreographer as choreo
+from choreographer.channels import Envelope
+from choreographer.channels import _cbor as cbor
+
+SIZES = (100 * 2**10, 2**20, 8 * 2**20)
+REPEAT = 20
+SCREENSHOTS = 100
+
+
+def _decode_json(frame: bytes) -> bytes:
+    return base64.b64decode(Envelope(frame).message()["result"]["data"])
+
+
+def _decode_cbor(frame: bytes) -> bytes:
+    return Envelope(frame, "cbor").message()["result"]["data"]
+
+
+def in_process() -> None:
+    print(f"{'png':>8} {'mode':>5} {'wire bytes':>11} {'CPU ms':>8}")
+    for size in SIZES:
+        png = os.urandom(size)
+        data = base64.b64encode(png).decode()
+        json_frame = json.dumps({"id": 1, "result": {"data": data}}).encode()
+        cbor_frame = cbor.CborCodec().encode({"id": 1, "result": {"data": png}})
+        for mode, frame, decode in (
+            ("json", json_frame, _decode_json),
+            ("cbor", cbor_frame, _decode_cbor),
+        ):
+            assert decode(frame) == png
+            start = time.process_time()
+            for _ in range(REPEAT):
+                decode(frame)
+            cpu = (time.process_time() - start) / REPEAT * 1e3
+            print(f"{size // 2**10:>6}KB {mode:>5} {len(frame):>11} {cpu:>8.2f}")
+
+
+async def browser(codec: str) -> float:
+    async with choreo.Browser(browser_cls=FakeChromium, codec=codec) as b:
+        tab = await b.create_tab("")
+        start = time.process_time()
+        for _ in range(SCREENSHOTS):
+            data = (await tab.send_command("Page.captureScreenshot"))["result"]["data"]
+            if codec != "cbor":
+                base64.b64decode(data)
+        return (time.process_time() - start) / SCREENSHOTS * 1e3
+
+
+def main() -> None:
+    in_process()
+    print()
+    print(f"fake browser, {SCREENSHOTS} screenshots of {SIZES[1] // 2**10}KB")
+    print(f"{'mode':>5} {'CPU ms':>8}")
+    os.environ["FAKE_SCREENSHOT_BYTES"] = str(SIZES[1])
+    for mode, codec in (("json", "simplejson"), ("cbor", "cbor")):
+        print(f"{mode:>5} {asyncio.run(browser(codec)):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
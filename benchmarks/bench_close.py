@@ -0,0 +1,43 @@
+"""
+Measure how soon the browser's exit is noticed.
+
+Opens a fake browser (see `_fake_chrome.py`) `ROUNDS` times and prints the
+median time `close()` takes, and the median time from killing the process
+to the watchdog seeing it exit.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import statistics
+import time
+
+from _fake_chrome import FakeChromium
+
+import choreographer as choreo
+from choreographer.utils._io_hub import get_hub
+
+ROUNDS = 20
+
+
+async def main() -> None:
+    closes, kills = [], []
+    for _ in range(ROUNDS):
+        browser = await choreo.Browser(browser_cls=FakeChromium)
+        start = time.perf_counter()
+        await browser.close()
+        closes.append(time.perf_counter() - start)
+
+        browser = await choreo.Browser(browser_cls=FakeChromium)
+        exited = get_hub().wait(browser.subprocess)  # as the watchdog does
+        start = time.perf_counter()
+        browser.subprocess.kill()
+        await exited
+        kills.append(time.perf_counter() - start)
+        await browser.close()
+    print(f"close():          {statistics.median(closes) * 1e3:>6.1f}ms")
+    print(f"exit after kill:  {statistics.median(kills) * 1e3:>6.1f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,121 @@
+"""
+Compare json codecs on messages shaped like the devtools traffic we send.
+
+Encoding: a large `Runtime.evaluate` whose expression embeds a figure, and a
+`Runtime.callFunctionOn` passing the figure as a value.
+Decoding: a screenshot response, a burst of small network events, and a
+nested `DOM.getDocument`-like response.
+"""
+
+from __future__ import annotations
+
+import base64
+import os
+import random
+import time
+from typing import TYPE_CHECKING
+
+from choreographer.channels import _wire as wire
+
+if TYPE_CHECKING:
+    from typing import Any, Callable
+
+REPEAT = 5
+
+random.seed(0)
+_figure = {
+    "data": [
+        {
+            "type": "scatter",
+            "x": [random.random() for _ in range(100_000)],  # noqa: S311
+            "y": [random.random() for _ in range(100_000)],  # noqa: S311
+            "name": f"trace {i}",
+        }
+        for i in range(3)
+    ],
+    "layout": {"title": {"text": "benchmark"}, "width": 700, "height": 500},
+}
+
+ENCODE: dict[str, Any] = {
+    "evaluate 5MB": {
+        "id": 1,
+        "method": "Runtime.evaluate",
+        "sessionId": "A" * 32,
+        "params": {
+            "expression": f"render({wire.serialize(_figure).decode()})",
+            "awaitPromise": True,
+        },
+    },
+    "callFunctionOn figure": {
+        "id": 2,
+        "method": "Runtime.callFunctionOn",
+        "params": {"functionDeclaration": "render", "arguments": [{"value": _figure}]},
+    },
+}
+
+
+def _node(depth: int) -> dict[str, Any]:
+    return {
+        "nodeId": depth,
+        "nodeName": "DIV",
+        "attributes": ["class", "plot-container", "style", "width: 700px"],
+        "children": [_node(depth - 1) for _ in range(4)] if depth else [],
+    }
+
+
+_event = {
+    "method": "Network.responseReceived",
+    "sessionId": "A" * 32,
+    "params": {
+        "requestId": "1000.1",
+        "timestamp": 1234.5678,
+        "type": "Script",
+        "response": {
+            "url": "https://cdn.example.com/plotly.min.js",
+            "status": 200,
+            "headers": {"content-type": "text/javascript", "cache-control": "max-age"},
+            "mimeType": "text/javascript",
+        },
+    },
+}
+
+DECODE: dict[str, list[bytes]] = {
+    "screenshot 4MB": [
+        wire.serialize(
+            {
+                "id": 3,
+                "result": {"data": base64.b64encode(os.urandom(3 * 2**20)).decode()},
+            },
+        ),
+    ],
+    "10k events": [wire.serialize(_event)] * 10_000,
+    "getDocument": [wire.serialize({"id": 4, "result": {"root": _node(7)}})],
+}
+
+
+def _best(fn: Callable[[], Any]) -> float:
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def main() -> None:
+    # cbor is measured in bench_cbor.py
+    codecs = [c for c in wire.available_codecs() if not wire.is_binary(c)]
+    print(f"{'ms':>28} " + " ".join(f"{c:>10}" for c in codecs))
+    for name, obj in ENCODE.items():
+        row = [_best(lambda c=c, o=obj: wire.serialize(o, c)) for c in codecs]
+        print(f"{'encode ' + name:>28} " + " ".join(f"{t:>10.1f}" for t in row))
+    for name, messages in DECODE.items():
+        row = [
+            _best(lambda c=c, m=messages: [wire.deserialize(x, c) for x in m])
+            for c in codecs
+        ]
+        print(f"{'decode ' + name:>28} " + " ".join(f"{t:>10.1f}" for t in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Flood a `Network.*` subscription with events and watch what it costs.
+
+Routes `EVENTS` events through a broker to one async callback in a batch,
+as a busy page's read would, then lets the callbacks run. Prints the peak
+memory traced while they're pending, the time until the last callback ran
+and whether the callback saw them in order. A sync callback is measured
+too, it runs as the event is routed, and an `events()` stream consumed
+by one task.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+import tracemalloc
+
+from choreographer._brokers import Broker
+from choreographer.channels import Envelope, Pipe
+from choreographer.protocol.devtools_async import Session, Target
+
+EVENTS = 50_000
+
+
+async def flood(kind: str) -> tuple[float, float, bool]:
+    pipe = Pipe()
+    broker = Broker(None, pipe)  # type: ignore[arg-type]
+    target = Target("T", broker)
+    session = Session("S", broker)
+    target._add_session(session)  # noqa: SLF001
+    seen: list[int] = []
+    done = asyncio.Event()
+
+    def record(event: dict) -> None:
+        seen.append(event["params"]["n"])
+        if len(seen) == EVENTS:
+            done.set()
+
+    async def callback(event: dict) -> None:
+        await asyncio.sleep(0)
+        record(event)
+
+    async def consume() -> None:
+        async with session.events("Network.*") as events:
+            async for event in events:
+                record(event)
+                if done.is_set():
+                    return
+
+    consumer = None
+    if kind == "stream":
+        consumer = asyncio.create_task(consume())
+        await asyncio.sleep(0)
+    else:
+        session.subscribe("Network.*", record if kind == "sync" else callback)
+    envelopes = [
+        Envelope(
+            b'{"method": "Network.dataReceived", "sessionId": "S", '
+            b'"params": {"n": %d}}' % i,
+        )
+        for i in range(EVENTS)
+    ]
+    tracemalloc.start()
+    start = time.perf_counter()
+    for envelope in envelopes:
+        broker._route(envelope, start)  # noqa: SLF001
+    await done.wait()
+    if consumer:
+        await consumer
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    pipe.close()
+    return peak / 2**20, elapsed * 1e3, seen == sorted(seen)
+
+
+def main() -> None:
+    print(f"{EVENTS} events")
+    print(f"{'callback':>9} {'peak MB':>8} {'ms':>8} {'in order':>9}")
+    for kind in ("async", "sync", "stream"):
+        try:
+            peak, ms, ordered = asyncio.run(flood(kind))
+        except (TypeError, AttributeError):  # not supported yet
+            continue
+        print(f"{kind:>9} {peak:>8.1f} {ms:>8.0f} {ordered!s:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Compare routing unsubscribed events by parsing them against reading envelopes.
+
+The old read loop parsed every message and then looked at `id`, `method` and
+`sessionId`; now only the envelope is read unless something consumes it.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from typing import TYPE_CHECKING
+
+from choreographer import protocol
+from choreographer.channels import Envelope
+from choreographer.channels import _wire as wire
+
+if TYPE_CHECKING:
+    from typing import Any, Callable
+
+REPEAT = 5
+COUNT = 10_000
+
+_events = {
+    "small event": {
+        "method": "Page.lifecycleEvent",
+        "params": {"frameId": "F" * 32, "name": "load", "timestamp": 1.5},
+        "sessionId": "A" * 32,
+    },
+    "network event": {
+        "method": "Network.responseReceived",
+        "params": {
+            "requestId": "1000.1",
+            "timestamp": 1234.5678,
+            "type": "Script",
+            "response": {
+                "url": "https://cdn.example.com/plotly.min.js",
+                "status": 200,
+                "headers": {f"x-header-{i}": "value" * 4 for i in range(20)},
+                "mimeType": "text/javascript",
+            },
+        },
+        "sessionId": "A" * 32,
+    },
+}
+
+
+def _parse(messages: list[bytes]) -> None:
+    for m in messages:
+        response = wire.deserialize(m)
+        protocol.get_error_from_result(response)
+        protocol.calculate_message_key(response)
+        protocol.is_event(response)
+
+
+def _envelope(messages: list[bytes]) -> None:
+    for m in messages:
+        Envelope(m)
+
+
+def _best(fn: Callable[[], Any]) -> float:
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) / COUNT * 1e6
+
+
+def main() -> None:
+    print(f"{'us per event':>16} {'parse':>10} {'envelope':>10}")
+    for name, event in _events.items():
+        # chromium's layout, compact and with sessionId last
+        messages = [json.dumps(event, separators=(",", ":")).encode()] * COUNT
+        parse = _best(lambda m=messages: _parse(m))
+        envelope = _best(lambda m=messages: _envelope(m))
+        print(f"{name:>16} {parse:>10.2f} {envelope:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
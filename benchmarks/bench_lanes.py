@@ -0,0 +1,82 @@
+"""
+Measure how long a tab command waits behind large uploads.
+
+Queues `UPLOADS` commands of 4MB each (say, `Page.setDocumentContent` with
+big documents), then a `Target.createTarget` while they're being written,
+through a broker whose channel writes at `BANDWIDTH` bytes per second.
+Prints how long after it was sent the `Target.createTarget` was written, and
+in which write.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+from choreographer._brokers import Broker
+from choreographer.channels import AsyncPipe
+
+UPLOADS = 20
+SIZE = 4 * 2**20
+BANDWIDTH = 100 * 2**20
+
+
+class _Slow(AsyncPipe):
+    def __init__(self) -> None:
+        super().__init__()
+        self.writes = 0
+        self.written_at: float | None = None
+
+    async def write_frames_async(self, frames: list[bytes]) -> tuple[float, float]:  # type: ignore[override]
+        start = time.perf_counter()
+        self.writes += 1
+        await asyncio.sleep(sum(len(frame) for frame in frames) / BANDWIDTH)
+        if any(b"Target.createTarget" in frame for frame in frames):
+            self.written_at = time.perf_counter()
+        return start, time.perf_counter()
+
+
+async def run() -> tuple[float, int]:
+    channel = _Slow()
+    broker = Broker(None, channel)  # type: ignore[arg-type]
+    sends = [
+        asyncio.create_task(
+            broker.write_json(
+                {
+                    "id": broker.next_command_id(),
+                    "method": "Page.setDocumentContent",
+                    "params": {"frameId": "F", "html": "x" * SIZE},
+                },  # type: ignore[arg-type]
+            ),
+        )
+        for _ in range(UPLOADS)
+    ]
+    await asyncio.sleep(0.3)  # the uploads are encoded and queued
+    start = time.perf_counter()
+    sends.append(
+        asyncio.create_task(
+            broker.write_json(
+                {
+                    "id": broker.next_command_id(),
+                    "method": "Target.createTarget",
+                    "params": {"url": ""},
+                },  # type: ignore[arg-type]
+            ),
+        ),
+    )
+    while channel.written_at is None:  # noqa: ASYNC110 polling the fake channel
+        await asyncio.sleep(0.001)
+    writes = channel.writes
+    broker.clean()
+    await asyncio.gather(*sends, return_exceptions=True)
+    channel.close()
+    return channel.written_at - start, writes
+
+
+def main() -> None:
+    elapsed, writes = asyncio.run(run())
+    print(f"Target.createTarget written after {elapsed * 1e3:.1f}ms, write #{writes}")
+
+
+if __name__ == "__main__":
+    main()
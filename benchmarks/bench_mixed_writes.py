@@ -0,0 +1,60 @@
+"""
+Measure latency of small commands sent while 50MB commands are being sent.
+
+Uses the fake browser in `_fake_chrome.py`, which doesn't parse large
+commands, so it measures choreographer, not the browser.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import statistics
+import time
+
+from _fake_chrome import FakeChromium
+
+import choreographer as choreo
+
+LARGE = 50 * 2**20
+LARGE_COUNT = 5
+
+
+async def _large(browser: choreo.Browser, done: asyncio.Event) -> float:
+    expression = "1+" * (LARGE // 2) + "1"
+    start = time.perf_counter()
+    for _ in range(LARGE_COUNT):
+        await browser.send_command("Runtime.evaluate", {"expression": expression})
+    done.set()
+    return (time.perf_counter() - start) / LARGE_COUNT
+
+
+async def _small(browser: choreo.Browser, done: asyncio.Event) -> list[float]:
+    latencies = []
+    while not done.is_set():
+        start = time.perf_counter()
+        await browser.send_command("Page.enable")
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def run() -> tuple[float, list[float]]:
+    async with choreo.Browser(browser_cls=FakeChromium) as browser:
+        done = asyncio.Event()
+        large, *smalls = await asyncio.gather(
+            _large(browser, done),
+            *(_small(browser, done) for _ in range(4)),
+        )
+    return large, [latency for small in smalls for latency in small]
+
+
+def main() -> None:
+    large, latencies = asyncio.run(run())
+    p50 = statistics.median(latencies) * 1e3
+    p99 = statistics.quantiles(latencies, n=100)[98] * 1e3
+    print(f"{LARGE_COUNT} x {LARGE // 2**20}MB commands, {large * 1e3:.0f} ms each")
+    print(f"{len(latencies)} small commands meanwhile:")
+    print(f"p50 {p50:.2f} ms, p99 {p99:.2f} ms, max {max(latencies) * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
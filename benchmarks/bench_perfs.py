@@ -0,0 +1,60 @@
+"""
+Compare recording command timings in dicts trimmed by copying, as the broker
+used to, with the fixed-size `PerfStore`.
+
+Prints the mean and the worst cost of recording one command: the dicts are
+rebuilt every `TRIM_SIZE` commands once full, the store never is.
+"""
+
+from __future__ import annotations
+
+import time
+
+from choreographer._brokers._perf import PERFS_MAX, PerfStore
+
+COMMANDS = 200_000
+TRIM_SIZE = 500
+
+
+def dicts() -> list[float]:
+    write_perfs: dict[tuple[str, int], tuple[float, float]] = {}
+    read_perfs: dict[tuple[str, int], float] = {}
+    costs = []
+    for i in range(COMMANDS):
+        start = time.perf_counter()
+        key = ("", i)
+        write_perfs[key] = (start, start)
+        read_perfs[key] = start
+        if len(write_perfs) > PERFS_MAX:
+            write_perfs = dict(list(write_perfs.items())[TRIM_SIZE:])
+            read_perfs = dict(list(read_perfs.items())[TRIM_SIZE:])
+        costs.append(time.perf_counter() - start)
+    return costs
+
+
+def store() -> list[float]:
+    perfs = PerfStore()
+    costs = []
+    for i in range(COMMANDS):
+        start = time.perf_counter()
+        perfs.add(i, "Page.enable", 100, start, start, start)
+        costs.append(time.perf_counter() - start)
+    return costs
+
+
+def main() -> None:
+    print(f"{'':>10} {'mean us':>8} {'worst us':>9}")
+    for name, run in (("dicts", dicts), ("PerfStore", store)):
+        costs = run()
+        mean = sum(costs) / len(costs) * 1e6
+        print(f"{name:>10} {mean:>8.2f} {max(costs) * 1e6:>9.1f}")
+    perfs = PerfStore()
+    for i in range(PERFS_MAX):
+        perfs.add(i, "Page.enable", 100, 0, 0.001, 0.002 + i * 1e-7)
+    start = time.perf_counter()
+    perfs.percentiles()
+    print(f"percentiles() of {PERFS_MAX}: {(time.perf_counter() - start) * 1e3:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Measure how the cost of reassembling one message grows with its size.
+
+A thread plays the browser and writes one NUL-terminated message into a
+`Pipe`, we time `Pipe.read_jsons()` until it returns it. The old strategy,
+`raw_buffer += os.read(fd, 10000)`, is timed too for comparison.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+
+from choreographer.channels import Pipe
+
+SIZES_MB = (1, 2, 4, 8, 16, 32)
+REPEAT = 3
+
+
+def _message(size: int) -> bytes:
+    return b'{"id": 1, "result": {"data": "' + b"x" * size + b'"}}\0'
+
+
+def _write_in_thread(fd: int, message: bytes) -> threading.Thread:
+    t = threading.Thread(target=os.write, args=(fd, message), daemon=True)
+    t.start()
+    return t
+
+
+def time_pipe(message: bytes) -> float:
+    pipe = Pipe()
+    pipe.open()
+    try:
+        writer = _write_in_thread(pipe.from_external_to_choreo, message)
+        start = time.perf_counter()
+        jsons, _ = pipe.read_jsons(blocking=True)
+        elapsed = time.perf_counter() - start
+        writer.join()
+        assert len(jsons) == 1
+    finally:
+        pipe.close()
+    return elapsed
+
+
+def time_legacy(message: bytes) -> float:
+    r, w = os.pipe()
+    try:
+        writer = _write_in_thread(w, message)
+        start = time.perf_counter()
+        raw_buffer = os.read(r, 10000)
+        while raw_buffer[-1] != 0:
+            raw_buffer += os.read(r, 10000)
+        elapsed = time.perf_counter() - start
+        writer.join()
+    finally:
+        os.close(r)
+        os.close(w)
+    return elapsed
+
+
+def main() -> None:
+    print(f"{'size MB':>8} {'pipe ms':>10} {'ms/MB':>8} {'legacy ms':>10} {'ms/MB':>8}")
+    for size_mb in SIZES_MB:
+        message = _message(size_mb * 2**20)
+        new = min(time_pipe(message) for _ in range(REPEAT)) * 1000
+        old = min(time_legacy(message) for _ in range(REPEAT)) * 1000
+        print(
+            f"{size_mb:>8} {new:>10.1f} {new / size_mb:>8.2f} "
+            f"{old:>10.1f} {old / size_mb:>8.2f}",
+        )
+
+
+if __name__ == "__main__":
+    main()
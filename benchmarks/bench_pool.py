@@ -0,0 +1,79 @@
+"""
+Compare starting a browser or tab per job with leasing one from a pool.
+
+Each job navigates a tab of a fake browser (see `_fake_chrome.py`), one
+after the other. Prints the median and worst time per job, and the writes
+to the browser per job (a tab pool's reset included), with a new browser
+each, a `BrowserPool` of `SIZE`, a new tab each and a `TabPool` of `SIZE`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import statistics
+import time
+from typing import TYPE_CHECKING
+from unittest import mock
+
+from _fake_chrome import FakeChromium
+
+import choreographer as choreo
+
+if TYPE_CHECKING:
+    from typing import Awaitable, Callable
+
+JOBS = 30
+SIZE = 2
+
+
+async def work(browser: choreo.Browser) -> None:
+    tab = await browser.create_tab("")
+    await tab.send_command("Page.enable")
+    await tab.send_command("Page.navigate", {"url": "about:blank"})
+    await browser.close_tab(tab)
+
+
+async def run(name: str, job: Callable[[], Awaitable[None]]) -> None:
+    times = []
+    with mock.patch("os.writev", wraps=os.writev) as writev:
+        for _ in range(JOBS):
+            start = time.perf_counter()
+            await job()
+            times.append(time.perf_counter() - start)
+        await asyncio.sleep(0.1)  # the last return
+    median, worst = statistics.median(times) * 1e3, max(times) * 1e3
+    writes = writev.call_count / JOBS
+    print(f"{name:>13} {median:>10.2f} {worst:>8.2f} {writes:>7.1f}")
+
+
+async def main() -> None:
+    print(f"{'':>13} {'median ms':>10} {'max ms':>8} {'writes':>7}")
+
+    async def new_browser() -> None:
+        async with choreo.Browser(browser_cls=FakeChromium) as browser:
+            await work(browser)
+
+    await run("new browser", new_browser)
+
+    async with choreo.BrowserPool(SIZE, browser_cls=FakeChromium) as pool:
+
+        async def browser_pool() -> None:
+            async with pool.lease() as browser:
+                await work(browser)
+
+        await run("browser pool", browser_pool)
+
+    async with choreo.Browser(browser_cls=FakeChromium) as browser:
+        await run("new tab", lambda: work(browser))
+        async with choreo.TabPool(browser, SIZE) as tabs:
+
+            async def tab_pool() -> None:
+                async with tabs.lease() as tab:
+                    await tab.send_command("Page.navigate", {"url": "about:blank"})
+
+            await run("tab pool", tab_pool)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
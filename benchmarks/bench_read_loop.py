@@ -0,0 +1,71 @@
+"""
+Measure the read loop's overhead per message, without a browser or a pipe.
+
+A channel hands the broker prepared events, `BATCH` per read, for a
+session nobody has, so the routing work is as small as it gets and what's
+left is the loop: reads, tasks, scheduling.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import TYPE_CHECKING
+
+from choreographer._brokers import Broker
+from choreographer.channels import AsyncPipe, ChannelClosedError, Envelope
+
+if TYPE_CHECKING:
+    from typing import Sequence
+
+MESSAGES = 200_000
+BATCHES = (1, 10, 100)
+_EVENT = b'{"method":"Fake.event","params":{},"sessionId":"nobody"}'
+
+
+class _Feed(AsyncPipe):
+    def __init__(self, batch: int) -> None:
+        super().__init__()
+        self._batch = batch
+        self._left = MESSAGES
+
+    async def read_envelopes_async(self) -> tuple[Sequence[Envelope], float]:
+        if not self._left:
+            raise ChannelClosedError
+        count = min(self._batch, self._left)
+        self._left -= count
+        return [Envelope(_EVENT) for _ in range(count)], time.perf_counter()
+
+
+class _Browser:
+    def __init__(self) -> None:
+        self.closed = asyncio.Event()
+
+    async def close(self) -> None:
+        self.closed.set()
+
+
+async def run(batch: int) -> float:
+    browser = _Browser()
+    channel = _Feed(batch)
+    broker = Broker(browser, channel)  # type: ignore [arg-type]
+    start = time.perf_counter()
+    broker.run_read_loop()
+    await browser.closed.wait()
+    elapsed = time.perf_counter() - start
+    channel.close()
+    # what making the envelopes costs, it isn't the loop's
+    start = time.perf_counter()
+    for _ in range(MESSAGES):
+        Envelope(_EVENT)
+    return (elapsed - (time.perf_counter() - start)) / MESSAGES * 1e6
+
+
+def main() -> None:
+    print(f"{'batch':>6} {'us per message':>15}")
+    for batch in BATCHES:
+        print(f"{batch:>6} {asyncio.run(run(batch)):>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
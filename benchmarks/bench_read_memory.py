@@ -0,0 +1,61 @@
+"""
+Measure peak memory reading a 100MB response, per codec.
+
+A thread writes a screenshot-like response into the pipe, like a browser
+would, while it is read and parsed. The response is built before tracing
+starts, so the peak is what reading it costs.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+from choreographer.channels import Pipe
+from choreographer.channels import _wire as wire
+
+SIZE = 100 * 2**20
+
+
+def _measure(codec: str, response: bytes) -> tuple[float, float]:
+    pipe = Pipe(codec=codec)
+    pipe.open()
+    writer = threading.Thread(
+        target=os.write,
+        args=(pipe.from_external_to_choreo, response),
+    )
+    tracemalloc.start()
+    start = time.perf_counter()
+    writer.start()
+    messages = []
+    while not messages:
+        envelopes, _ = pipe.read_envelopes(blocking=True)
+        messages = [e.message() for e in envelopes]
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    writer.join()
+    pipe.close()
+    assert len(messages[0]["result"]["data"]) == SIZE
+    return peak / 2**20, elapsed * 1000
+
+
+def main() -> None:
+    data = base64.b64encode(os.urandom(SIZE * 3 // 4)).decode()
+    # laid out like chromium's
+    text = json.dumps({"id": 1, "result": {"data": data}}, separators=(",", ":"))
+    response = text.encode() + b"\0"
+    del data, text
+    print(f"{'100MB response':>16} {'peak MB':>10} {'ms':>8}")
+    # cbor is measured in bench_cbor.py
+    for codec in [c for c in wire.available_codecs() if not wire.is_binary(c)]:
+        peak, elapsed = _measure(codec, response)
+        print(f"{codec:>16} {peak:>10.1f} {elapsed:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
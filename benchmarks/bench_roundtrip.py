@@ -0,0 +1,61 @@
+"""
+Measure command round trip latency and threads per browser for each channel,
+and throughput for bursts of concurrent commands.
+
+Uses the fake browser in `_fake_chrome.py`, so it measures choreographer,
+not chromium.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import statistics
+import threading
+import time
+
+from _fake_chrome import FakeChromium
+
+import choreographer as choreo
+from choreographer.channels import AsyncPipe, Pipe
+
+COMMANDS = 3000
+BURST = 500
+
+
+async def run(channel_cls: type[Pipe]) -> tuple[int, list[float], float]:
+    async with choreo.Browser(
+        browser_cls=FakeChromium,
+        channel_cls=channel_cls,
+    ) as browser:
+        threads = threading.active_count() - 1  # not main thread
+        latencies = []
+        for _ in range(COMMANDS):
+            start = time.perf_counter()
+            await browser.send_command("Page.enable")
+            latencies.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        for _ in range(COMMANDS // BURST):
+            await asyncio.gather(
+                *(browser.send_command("Page.enable") for _ in range(BURST)),
+            )
+        rate = COMMANDS / (time.perf_counter() - start)
+    return threads, latencies, rate
+
+
+def main() -> None:
+    print(
+        f"{'channel':>10} {'threads':>8} {'p50 us':>8} {'p99 us':>8} "
+        f"{'burst cmd/s':>12}",
+    )
+    for channel_cls in (Pipe, AsyncPipe):
+        threads, latencies, rate = asyncio.run(run(channel_cls))
+        p50 = statistics.median(latencies) * 1e6
+        p99 = statistics.quantiles(latencies, n=100)[98] * 1e6
+        print(
+            f"{channel_cls.__name__:>10} {threads:>8} {p50:>8.0f} {p99:>8.0f} "
+            f"{rate:>12.0f}",
+        )
+
+
+if __name__ == "__main__":
+    main()
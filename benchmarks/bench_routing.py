@@ -0,0 +1,48 @@
+"""
+Measure how an event's cost changes with the number of open tabs.
+
+Uses the fake browser in `_fake_chrome.py`: opens the tabs, then sends
+events to the last tab's session, which has one subscription for them.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+from _fake_chrome import FakeChromium
+
+import choreographer as choreo
+
+TABS = (10, 100, 1000)
+EVENTS = 20_000
+
+
+async def run(tabs: int) -> float:
+    async with choreo.Browser(browser_cls=FakeChromium) as browser:
+        for _ in range(tabs):
+            tab = await browser.create_tab("")
+        done = asyncio.Event()
+        received = 0
+
+        async def on_event(_: object) -> None:
+            nonlocal received
+            received += 1
+            if received == EVENTS:
+                done.set()
+
+        tab.subscribe("Fake.event", on_event)
+        start = time.perf_counter()
+        await tab.send_command("Fake.emit", params={"count": EVENTS})
+        await done.wait()
+        return (time.perf_counter() - start) / EVENTS * 1e6
+
+
+def main() -> None:
+    print(f"{'tabs':>6} {'event us':>9}")
+    for tabs in TABS:
+        print(f"{tabs:>6} {asyncio.run(run(tabs)):>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Time `Browser.open()` by phase.
+
+Opens a fake browser (see `_fake_chrome.py`) `ROUNDS` times and prints the
+median time of each phase, read off `Browser`'s debug logs: starting the
+process, connecting (channel and read loop), and finding the first tab.
+Also prints the commands `open()` sent.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import statistics
+import time
+
+from _fake_chrome import FakeChromium
+
+import choreographer as choreo
+
+ROUNDS = 20
+PHASES = {  # the log message each phase ends on
+    "spawn": "Starting watchdog",
+    "connect": "Running read loop",
+}
+
+
+class _Marks(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__(logging.DEBUG)
+        self.marks: dict[str, float] = {}
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.marks.setdefault(record.getMessage(), time.perf_counter())
+
+
+async def main() -> None:
+    logger = logging.getLogger("choreographer.browser_async")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    timings: dict[str, list[float]] = {p: [] for p in (*PHASES, "first tab", "total")}
+    commands = []
+    for _ in range(ROUNDS):
+        marks = _Marks()
+        logger.addHandler(marks)
+        browser = choreo.Browser(browser_cls=FakeChromium)
+        start = time.perf_counter()
+        await browser.open()
+        end = time.perf_counter()
+        logger.removeHandler(marks)
+        last = start
+        for phase, message in PHASES.items():
+            timings[phase].append(marks.marks[message] - last)
+            last = marks.marks[message]
+        timings["first tab"].append(end - last)
+        timings["total"].append(end - start)
+        commands.append(browser._broker._last_id + 1)  # noqa: SLF001
+        await browser.close()
+    for phase, times in timings.items():
+        print(f"{phase:>10} {statistics.median(times) * 1e3:>8.1f}ms")
+    print(f"{'commands':>10} {statistics.median(commands):>8.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
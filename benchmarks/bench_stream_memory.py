@@ -0,0 +1,61 @@
+"""
+Compare peak memory writing a 200MB command whole and streamed.
+
+A thread drains the pipe like a browser would. The payload itself is built
+before tracing starts, so the peak is what writing it costs.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+import tracemalloc
+from typing import TYPE_CHECKING
+
+from choreographer.channels import Pipe
+
+if TYPE_CHECKING:
+    from typing import Any, Callable
+
+SIZE = 200 * 2**20
+
+
+def _drain(pipe: Pipe) -> None:
+    while not os.read(pipe.from_choreo_to_external, 2**20).endswith(b"\0"):
+        pass
+
+
+def _measure(write: Callable[[Pipe, Any], Any], command: Any) -> tuple[float, float]:
+    pipe = Pipe()
+    pipe.open()
+    reader = threading.Thread(target=_drain, args=(pipe,))
+    reader.start()
+    tracemalloc.start()
+    start = time.perf_counter()
+    write(pipe, command)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    reader.join()
+    pipe.close()
+    return peak / 2**20, elapsed * 1000
+
+
+def main() -> None:
+    command = {
+        "id": 1,
+        "method": "Runtime.evaluate",
+        "params": {"expression": "1+" * (SIZE // 2) + "1"},
+    }
+    print(f"{'200MB command':>14} {'peak MB':>10} {'ms':>8}")
+    for name, write in (
+        ("whole", lambda p, c: p.write_frames([p.encode(c)])),
+        ("streamed", lambda p, c: p.write_chunks(p.encode_chunks(c))),
+    ):
+        peak, elapsed = _measure(write, command)
+        print(f"{name:>14} {peak:>10.1f} {elapsed:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
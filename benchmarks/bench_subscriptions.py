@@ -0,0 +1,80 @@
+"""
+Measure event dispatch as the number of subscriptions per session grows.
+
+The first table is matching alone: the scan of every subscription the read
+loop used to do, against `SubscriptionIndex.match()`. The second sends
+events through the fake browser in `_fake_chrome.py` to a tab with that many
+subscriptions, one of which matches.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+from _fake_chrome import FakeChromium
+
+import choreographer as choreo
+from choreographer.protocol._subscriptions import SubscriptionIndex, matches
+
+COUNTS = (1, 10, 100, 1000)
+EVENTS = 20_000
+METHODS = ("Fake.event", "Page.loadEventFired", "Network.requestWillBeSent")
+
+
+def _queries(count: int) -> list[str]:
+    # half exact, half prefixes, none of them matching
+    return [f"Other{i}.*" if i % 2 else f"Other.event{i}" for i in range(count)]
+
+
+def matching(count: int) -> tuple[float, float]:
+    queries = [*_queries(count), "Fake.*"]
+    index: SubscriptionIndex[None] = SubscriptionIndex()
+    for query in queries:
+        index[query] = None
+    start = time.perf_counter()
+    for i in range(EVENTS):
+        method = METHODS[i % len(METHODS)]
+        _ = [q for q in queries if matches(q, method)]
+    scan = (time.perf_counter() - start) / EVENTS * 1e6
+    start = time.perf_counter()
+    for i in range(EVENTS):
+        index.match(METHODS[i % len(METHODS)])
+    indexed = (time.perf_counter() - start) / EVENTS * 1e6
+    return scan, indexed
+
+
+async def dispatch(count: int) -> float:
+    async with choreo.Browser(browser_cls=FakeChromium) as browser:
+        tab = await browser.create_tab("")
+        done = asyncio.Event()
+        received = 0
+
+        async def on_event(_: object) -> None:
+            nonlocal received
+            received += 1
+            if received == EVENTS:
+                done.set()
+
+        async def ignore(_: object) -> None:
+            pass
+
+        for query in _queries(count):
+            tab.subscribe(query, ignore)
+        tab.subscribe("Fake.*", on_event)
+        start = time.perf_counter()
+        await tab.send_command("Fake.emit", params={"count": EVENTS})
+        await done.wait()
+        return (time.perf_counter() - start) / EVENTS * 1e6
+
+
+def main() -> None:
+    print(f"{'subscriptions':>13} {'scan us':>8} {'index us':>9} {'event us':>9}")
+    for count in COUNTS:
+        scan, indexed = matching(count)
+        per_event = asyncio.run(dispatch(count))
+        print(f"{count:>13} {scan:>8.2f} {indexed:>9.2f} {per_event:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
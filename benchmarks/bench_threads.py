@@ -0,0 +1,38 @@
+"""
+Count the threads it takes to run many browsers in one process.
+
+Opens `BROWSERS` fake browsers (see `_fake_chrome.py`) at once, printing the
+process's thread count as they open, then the time to open them all.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+from _fake_chrome import FakeChromium
+
+import choreographer as choreo
+
+BROWSERS = 50
+
+
+async def main() -> None:
+    print(f"{'browsers':>9} {'threads':>8}")
+    print(f"{0:>9} {threading.active_count():>8}")
+    browsers = []
+    start = time.perf_counter()
+    for i in range(1, BROWSERS + 1):
+        browser = choreo.Browser(browser_cls=FakeChromium)
+        await browser.open()
+        browsers.append(browser)
+        if i in (1, 10, BROWSERS):
+            print(f"{i:>9} {threading.active_count():>8}")
+    elapsed = time.perf_counter() - start
+    await asyncio.gather(*(browser.close() for browser in browsers))
+    print(f"opened {BROWSERS} in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+"""
+Send commands that never get a response, as a long-running worker might.
+
+Each round sends `COMMANDS` commands through a broker whose channel
+swallows them and gives up on each after 10ms, with `asyncio.wait_for()`
+and, if the broker has it, with `timeout=`. Prints the commands the broker
+still holds and the memory traced after each round, once garbage is
+collected: it should stay flat.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gc
+import time
+import tracemalloc
+
+from choreographer._brokers import Broker
+from choreographer.channels import AsyncPipe, ChannelClosedError
+
+COMMANDS = 2000
+ROUNDS = 5
+
+
+class _Sink(AsyncPipe):
+    async def write_frames_async(self, frames: object) -> tuple[float, float]:  # noqa: ARG002
+        now = time.perf_counter()
+        return now, now
+
+
+async def _give_up(broker: Broker, *, wheel: bool) -> None:
+    command = {"id": broker.next_command_id(), "method": "Page.enable", "params": {}}
+    try:
+        if wheel:
+            await broker.write_json(command, timeout=0.01)  # type: ignore[arg-type]
+        else:
+            await asyncio.wait_for(broker.write_json(command), 0.01)  # type: ignore[arg-type]
+    except (asyncio.TimeoutError, ChannelClosedError):  # how it used to give up
+        pass
+
+
+async def run(*, wheel: bool) -> None:
+    channel = _Sink()
+    broker = Broker(None, channel)  # type: ignore[arg-type]
+    tracemalloc.start()
+    for i in range(ROUNDS):
+        start = time.perf_counter()
+        await asyncio.gather(*(_give_up(broker, wheel=wheel) for _ in range(COMMANDS)))
+        elapsed = time.perf_counter() - start
+        gc.collect()
+        held = len(getattr(broker, "in_flight", getattr(broker, "futures", {})))
+        memory = tracemalloc.get_traced_memory()[0] / 2**20
+        print(f"{i:>6} {held:>6} {memory:>7.2f} {elapsed * 1e3:>6.0f}")
+    tracemalloc.stop()
+    broker.clean()
+    channel.close()
+
+
+def main() -> None:
+    for wheel in (False, True):
+        print("timeout=" if wheel else "asyncio.wait_for()")
+        print(f"{'round':>6} {'held':>6} {'MB':>7} {'ms':>6}")
+        try:
+            asyncio.run(run(wheel=wheel))
+        except TypeError:  # no timeout= yet
+            print("    not supported")
+
+
+if __name__ == "__main__":
+    main()
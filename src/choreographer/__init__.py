@@ -26,10 +26,13 @@ from .browser_sync import (
     BrowserSync,
     TabSync,
 )
+from .pool import BrowserPool, TabPool
 
 __all__ = [
     "Browser",
+    "BrowserPool",
     "BrowserSync",
     "Tab",
+    "TabPool",
     "TabSync",
 ]
@@ -1,35 +1,100 @@
 from __future__ import annotations
 
 import asyncio
+import time
 import warnings
 from functools import partial
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, cast
 
 import logistro
 
 from choreographer import channels, protocol
+from choreographer.channels._interface_type import AsyncChannelInterface
+from choreographer.channels._wire import estimate_size
+from choreographer.protocol._subscriptions import SubscriptionIndex
 from choreographer.utils import _manual_thread_pool
 
+from ._deadlines import TimerWheel
+from ._dispatch import EVENT_CONCURRENCY, Dispatcher
+from ._lanes import WriteLanes, check_priority, classify
+from ._perf import PerfStore
+
 # afrom choreographer.channels import ChannelClosedError
 
 if TYPE_CHECKING:
-    from typing import Any, MutableMapping
+    from typing import Any, Iterator, MutableMapping, Sequence
 
     from choreographer.browser_async import Browser
     from choreographer.channels._interface_type import ChannelInterface
     from choreographer.protocol.devtools_async import Session, Target
 
+    from ._lanes import Lane
 
-_logger = logistro.getLogger(__name__)
 
-PERFS_MAX = 5000  # maximum number of entries in the perf dicts
-TRIM_SIZE = 500  # what to save after trimming it
+_logger = logistro.getLogger(__name__)
 
 
 class UnhandledMessageWarning(UserWarning):
     pass
 
 
+_BATCH_MAX = 1024
+"""The most frames the writer joins into one write."""
+_ENCODE_IN_PIECES = 2**20
+"""
+Commands guessed bigger than this (in bytes) are encoded a piece at a time.
+
+The loop runs between pieces, so small commands aren't held up. A thread
+wouldn't help, encoding holds the GIL.
+"""
+_STREAM = 2**27
+"""
+Commands guessed bigger than this are encoded piece by piece as they're written.
+
+It saves copies of the payload, but nothing else can be written meanwhile.
+"""
+
+
+class Command:
+    """A command waiting for its response, see `Broker.in_flight`."""
+
+    __slots__ = ("future", "method", "sent", "session_id", "size", "written")
+
+    future: asyncio.Future[protocol.BrowserResponse]
+    """Resolves to the response."""
+    method: str
+    """The command's method."""
+    sent: float
+    """The `time.perf_counter()` when it was sent."""
+    session_id: str
+    """The session it was sent on, "" for the browser."""
+    size: int
+    """Its size in bytes, once encoded."""
+    written: asyncio.Future[tuple[float, float]]
+    """Resolves to when writing it started and ended."""
+
+    def __init__(self, method: str, session_id: str) -> None:
+        """
+        Construct the record of a command about to be sent.
+
+        Args:
+            method: the command's method.
+            session_id: the session it is sent on.
+
+        """
+        loop = asyncio.get_running_loop()
+        self.future = loop.create_future()
+        self.written = loop.create_future()
+        self.method = method
+        self.session_id = session_id
+        self.sent = time.perf_counter()
+        self.size = 0
+
+    def __repr__(self) -> str:
+        age = time.perf_counter() - self.sent
+        return f"<Command {self.method} on {self.session_id!r}, {age:.3f}s old>"
+
+
 class Broker:
     """Broker is a middleware implementation for asynchronous implementations."""
 
@@ -40,47 +105,89 @@ class Broker:
     Channel will be the ChannelInterface implementation (pipe or websocket)
     that the broker communicates on.
     """
-    futures: MutableMapping[protocol.MessageKey, asyncio.Future[Any]]
-    """A mapping of all the futures for all sent commands."""
+    in_flight: dict[int, Command]
+    """The commands waiting for a response by id, the oldest first."""
+    timeouts: int
+    """How many commands got no response before their timeout."""
+    late_responses: int
+    """How many responses came after their command timed out or was cancelled."""
 
     _subscriptions_futures: MutableMapping[
         str,
-        MutableMapping[
-            str,
-            list[asyncio.Future[Any]],
-        ],
+        SubscriptionIndex[list[asyncio.Future[Any]]],
     ]
     """A mapping of session id: subscription: list[futures]"""
 
-    write_perfs: MutableMapping[protocol.MessageKey, tuple[float, float]]
-    read_perfs: MutableMapping[protocol.MessageKey, float]
+    perfs: PerfStore
+    """The timings of recent commands, see `get_perf()` and `perfs.percentiles()`."""
+
+    dispatcher: Dispatcher
+    """Runs the subscriptions' callbacks."""
+    lanes: WriteLanes
+    """Commands waiting to be written, by priority, see `lanes.depths()`."""
+
+    read_batches: int
+    """How many reads returned messages, one read returns all that's buffered."""
+    read_messages: int
+    """How many messages were read, `read_messages / read_batches` per batch."""
+    read_batch_max: int
+    """The most messages one read returned."""
 
-    def __init__(self, browser: Browser, channel: ChannelInterface) -> None:
+    def __init__(
+        self,
+        browser: Browser,
+        channel: ChannelInterface,
+        *,
+        event_concurrency: int = EVENT_CONCURRENCY,
+    ) -> None:
         """
         Construct a broker for a synchronous arragenment w/ both ends.
 
         Args:
             browser: The sync browser implementation.
             channel: The channel the browser uses to talk on.
+            event_concurrency: How many async event callbacks can run at once.
 
         """
         self._browser = browser
         self._channel = channel
         self._background_tasks: set[asyncio.Task[Any]] = set()
         # if its a task you dont want canceled at close (like the close task)
-        self._background_tasks_cancellable: set[asyncio.Task[Any]] = set()
-        # if its a user task, can cancel
         self._current_read_task: asyncio.Task[Any] | None = None
-        self.futures = {}
-        self.write_perfs = {}
-        self.read_perfs = {}
+        self.in_flight = {}
+        self._last_id = -1
+        self._deadlines = TimerWheel(self._expire)
+        self.timeouts = self.late_responses = 0
+        self._cleaned = False
+        self.perfs = PerfStore()
         self._subscriptions_futures = {}
-
-        self._write_lock = asyncio.Lock()
-        self._executor = _manual_thread_pool.ManualThreadExecutor(
-            max_workers=2,
-            name="readwrite_thread",
-        )
+        self.dispatcher = Dispatcher(event_concurrency)
+        self.read_batches = self.read_messages = self.read_batch_max = 0
+        # session id: (target, session), kept by the targets, for routing
+        self._sessions: dict[str, tuple[Target, Session]] = {}
+
+        # commands wait here for the writer task, which writes them in batches
+        self.lanes = WriteLanes()
+        self._writer_task: asyncio.Task[None] | None = None
+        # only one of these is set, by _attach_channel()
+        self._async_channel: AsyncChannelInterface | None = None
+        self._executor: _manual_thread_pool.ManualThreadExecutor | None = None
+
+    def _attach_channel(self) -> None:
+        if self._async_channel or self._executor:
+            return
+        loop = asyncio.get_running_loop()
+        if isinstance(self._channel, AsyncChannelInterface) and self._channel.attach(
+            loop,
+        ):
+            _logger.debug("Channel is attached to the loop, no executor needed.")
+            self._async_channel = self._channel
+        else:
+            _logger.debug("Channel will use a read/write thread executor.")
+            self._executor = _manual_thread_pool.ManualThreadExecutor(
+                max_workers=2,
+                name="readwrite_thread",
+            )
 
     def new_subscription_future(
         self,
@@ -91,19 +198,37 @@ class Broker:
             f"Session {session_id} is subscribing to {subscription} one time.",
         )
         if session_id not in self._subscriptions_futures:
-            self._subscriptions_futures[session_id] = {}
+            self._subscriptions_futures[session_id] = SubscriptionIndex()
         if subscription not in self._subscriptions_futures[session_id]:
             self._subscriptions_futures[session_id][subscription] = []
         future = asyncio.get_running_loop().create_future()
         self._subscriptions_futures[session_id][subscription].append(future)
         return future
 
-    def clean(self) -> None:
+    def next_command_id(self) -> int:
+        """Return an id for a command, unique across all sessions."""
+        self._last_id += 1
+        return self._last_id
+
+    def stuck(self, older_than: float = 0) -> list[Command]:
+        """
+        Return the commands waiting for a response, oldest first.
+
+        Args:
+            older_than: only those sent more than this many seconds ago.
+
+        """
+        since = time.perf_counter() - older_than
+        return [c for c in self.in_flight.values() if c.sent <= since]
+
+    def clean(self) -> None:  # noqa: C901 complexity
+        self._cleaned = True
         _logger.debug("Cancelling message futures")
-        for future in self.futures.values():
-            if not future.done():
-                _logger.debug2(f"Cancelling {future}")
-                future.cancel()
+        for command in self.in_flight.values():
+            if not command.future.done():
+                _logger.debug2(f"Cancelling {command}")
+                command.future.cancel()
+        self._deadlines.cancel()
         _logger.debug("Cancelling read task")
         if self._current_read_task and not self._current_read_task.done():
             _logger.debug2(f"Cancelling read: {self._current_read_task}")
@@ -115,14 +240,17 @@ class Broker:
                     if not future.done():
                         _logger.debug2(f"Cancelling {future}")
                         future.cancel()
-        _logger.debug("Cancelling background tasks")
-        for task in self._background_tasks_cancellable:
-            if not task.done():
-                _logger.debug2(f"Cancelling {task}")
-                task.cancel()
-        self._executor.shutdown(wait=True, cancel_futures=True)
-
-    def run_read_loop(self) -> None:  # noqa: C901, PLR0915 complexity
+        _logger.debug("Cancelling event callbacks and streams")
+        self.dispatcher.cancel()
+        for _, event_session in list(self._sessions.values()):
+            event_session.close_streams()
+        _logger.debug("Cancelling writer task")
+        if self._writer_task and not self._writer_task.done():
+            self._writer_task.cancel()
+        if self._executor:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def run_read_loop(self) -> None:
         def check_read_loop_error(result: asyncio.Future[Any]) -> None:
             if result.cancelled():
                 _logger.debug("Readloop cancelled")
@@ -143,178 +271,374 @@ class Broker:
                     _logger.error("Error in run_read_loop.", exc_info=e)
                     raise e
 
-        async def read_loop() -> None:  # noqa: PLR0912, PLR0915, C901
-            loop = asyncio.get_running_loop()
-            fn = partial(self._channel.read_jsons, blocking=True)
-            responses, perf = await loop.run_in_executor(
-                executor=self._executor,
-                func=fn,
+        async def read_loop() -> None:
+            while True:  # one task reads until the channel closes
+                envelopes, perf = await self._read()
+                _logger.debug(f"Channel read found {len(envelopes)} json objects.")
+                self.read_batches += 1
+                self.read_messages += len(envelopes)
+                self.read_batch_max = max(self.read_batch_max, len(envelopes))
+                for envelope in envelopes:
+                    try:
+                        self._route(envelope, perf)
+                    except channels.JSONError:  # noqa: PERF203 rare, and we log each one
+                        _logger.exception("JSONError decoding message. Ignoring")
+                # the read may not have suspended, and a full queue pushes back
+                await self.dispatcher.yield_to_callbacks()
+
+        self._attach_channel()
+        read_task = asyncio.create_task(read_loop())
+        read_task.add_done_callback(check_read_loop_error)
+        self._current_read_task = read_task
+
+    async def _read(self) -> tuple[Sequence[channels.Envelope], float]:
+        if self._async_channel:
+            return await self._async_channel.read_envelopes_async()
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor,
+            partial(self._channel.read_envelopes, blocking=True),
+        )
+
+    def _route(self, envelope: channels.Envelope, perf: float) -> None:  # noqa: C901, PLR0912 complexity
+        # messages are only parsed when something consumes them
+        key = envelope.id
+        if key is None and envelope.has_error:
+            raise protocol.DevtoolsProtocolError(envelope.message())
+
+        # looks for event that we should handle internally
+        self._check_for_closed_session(envelope)
+        # surrounding lines overlap in idea
+        if envelope.is_event:
+            method = cast("str", envelope.method)
+            event_session_id = envelope.session_id
+            _logger.debug2(f"Is event for {event_session_id}")
+            x = self._get_target_session_by_session_id(
+                event_session_id,
+            )
+            if not x:
+                return
+            _, event_session = x
+            if not event_session:
+                _logger.error("Found an event that returned no session.")
+                return
+            _logger.debug(
+                f"Received event {method} for "
+                f"{event_session_id} targeting {event_session}.",
             )
-            _logger.debug(f"Channel read found {len(responses)} json objects.")
-            for response in responses:
-                error = protocol.get_error_from_result(response)
-                key = protocol.calculate_message_key(response)
-                if not key and error:
-                    raise protocol.DevtoolsProtocolError(response)
-
-                # looks for event that we should handle internally
-                self._check_for_closed_session(response)
-                # surrounding lines overlap in idea
-                if protocol.is_event(response):
-                    event_session_id = response.get(
-                        "sessionId",
-                        "",
-                    )
-                    _logger.debug2(f"Is event for {event_session_id}")
-                    x = self._get_target_session_by_session_id(
-                        event_session_id,
-                    )
-                    if not x:
-                        continue
-                    _, event_session = x
-                    if not event_session:
-                        _logger.error("Found an event that returned no session.")
-                        continue
-                    _logger.debug(
-                        f"Received event {response['method']} for "
-                        f"{event_session_id} targeting {event_session}.",
-                    )
 
-                    session_futures = self._subscriptions_futures.get(
-                        event_session_id,
-                    )
+            session_futures = self._subscriptions_futures.get(
+                event_session_id,
+            )
+            _logger.debug2(
+                "Checking for event subscription future.",
+            )
+            if session_futures:
+                for query in session_futures.match(method):
                     _logger.debug2(
-                        "Checking for event subscription future.",
+                        "Found event subscription future.",
                     )
-                    if session_futures:
-                        for query in session_futures:
-                            match = (
-                                query.endswith("*")
-                                and response["method"].startswith(query[:-1])
-                            ) or (response["method"] == query)
-                            if match:
-                                _logger.debug2(
-                                    "Found event subscription future.",
-                                )
-                                for future in session_futures[query]:
-                                    if not future.done():
-                                        future.set_result(response)
-                                session_futures[query] = []
+                    for future in session_futures.pop(query):
+                        if not future.done():
+                            future.set_result(envelope.message())
 
-                    _logger.debug2(
-                        "Checking for event subscription callback.",
-                    )
-                    for query in list(event_session.subscriptions):
-                        match = (
-                            query.endswith("*")
-                            and response["method"].startswith(query[:-1])
-                        ) or (response["method"] == query)
-                        _logger.debug2(
-                            "Found event subscription callback.",
-                        )
-                        if match:
-                            t: asyncio.Task[Any] = asyncio.create_task(
-                                event_session.subscriptions[query][0](response),
-                            )
-                            self._background_tasks_cancellable.add(t)
-                            if not event_session.subscriptions[query][1]:
-                                event_session.unsubscribe(query)
-
-                elif key:
-                    self.read_perfs[key] = perf
-                    _logger.debug(f"Have a response with key {key}")
-                    if key in self.futures:
-                        _logger.debug(f"Found future for key {key}")
-                        future = self.futures.pop(key)
-                    elif "error" in response:
-                        raise protocol.DevtoolsProtocolError(response)
-                    else:
-                        raise RuntimeError(f"Couldn't find a future for key: {key}")
-                    if not future.done():
-                        future.set_result(response)
-                        if len(self.write_perfs) > PERFS_MAX:
-                            self.write_perfs = dict(
-                                list(self.write_perfs.items())[TRIM_SIZE:],
-                            )
-                            self.read_perfs = dict(
-                                list(self.read_perfs.items())[TRIM_SIZE:],
-                            )
-                else:
-                    warnings.warn(
-                        f"Unhandled message type:{response!s}",
-                        UnhandledMessageWarning,
-                        stacklevel=1,
-                    )
-            read_task = asyncio.create_task(read_loop())
-            read_task.add_done_callback(check_read_loop_error)
-            self._current_read_task = read_task
+            _logger.debug2(
+                "Checking for event subscription callback.",
+            )
+            for query in event_session.subscriptions.match(method):
+                _logger.debug2(
+                    "Found event subscription callback.",
+                )
+                subscription = event_session.subscriptions.get(query)
+                if subscription is None:  # a callback unsubscribed it
+                    continue
+                if not subscription.repeating:
+                    event_session.unsubscribe(query)
+                self.dispatcher.dispatch(subscription, method, envelope.message())
+            for query in event_session.streams.match(method):
+                for stream in event_session.streams[query]:
+                    stream.put(method, envelope.message())
+
+        elif key is not None:
+            response = envelope.message()
+            _logger.debug(f"Have a response with key {key}")
+            command = self.in_flight.get(key)
+            if command and command.session_id == envelope.session_id:
+                _logger.debug(f"Found future for key {key}")
+                self._forget(key, command)
+            elif not command and key <= self._last_id:  # it timed out or was cancelled
+                _logger.debug(f"Dropping late response for key {key}")
+                self.late_responses += 1
+                return
+            elif envelope.has_error:
+                raise protocol.DevtoolsProtocolError(response)
+            else:
+                raise RuntimeError(
+                    f"Couldn't find a future for key: {(envelope.session_id, key)}",
+                )
+            self._record_perf(key, command, perf)
+            if not command.future.done():
+                command.future.set_result(response)
+        else:
+            warnings.warn(
+                f"Unhandled message type:{envelope.message()!s}",
+                UnhandledMessageWarning,
+                stacklevel=1,
+            )
 
-        read_task = asyncio.create_task(read_loop())
-        read_task.add_done_callback(check_read_loop_error)
-        self._current_read_task = read_task
+    def _record_perf(self, key: int, command: Command, read_end: float) -> None:
+        written = command.written
+        if written.done() and not written.cancelled() and not written.exception():
+            start, end = written.result()
+        else:  # the response beat the writer's return, possible with threads
+            start = end = float("nan")
+        self.perfs.add(key, command.method, command.size, start, end, read_end)
 
     def get_perf(
         self,
         obj: protocol.BrowserCommand,
     ) -> tuple[float, float, float]:
         """Get the performance tuple for a certain BrowserCommand."""
-        key = protocol.calculate_message_key(obj)
-        if not key:
+        if "id" not in obj:
             return (0, 0, 0)
-        return (*self.write_perfs[key], self.read_perfs[key])
+        return self.perfs.get(obj["id"]) or (0, 0, 0)
+
+    def _forget(self, key: int, command: Command) -> None:
+        if self.in_flight.get(key) is command:
+            del self.in_flight[key]
+        self._deadlines.discard(key)
+
+    def _expire(self, key: int) -> None:
+        command = self.in_flight.pop(key, None)
+        if command and not command.future.done():
+            _logger.debug(f"{command} timed out.")
+            self.timeouts += 1
+            error = asyncio.TimeoutError(f"No response to {command.method} in time.")
+            command.future.set_exception(error)
+            if not command.written.done():  # the writer will skip it
+                command.written.set_exception(error)
 
     async def write_json(
         self,
         obj: protocol.BrowserCommand,
+        *,
+        timeout: float | None = None,
+        priority: Lane | None = None,
     ) -> protocol.BrowserResponse:
-        protocol.verify_params(obj)
-        key = protocol.calculate_message_key(obj)
-        _logger.debug1(f"Broker writing {obj['method']} with key {key}")
-        if not key:
-            raise RuntimeError(
-                "Message strangely formatted and "
-                "choreographer couldn't figure it out why.",
-            )
-        loop = asyncio.get_running_loop()
-        future: asyncio.Future[protocol.BrowserResponse] = loop.create_future()
-        self.futures[key] = future
-        _logger.debug(f"Created future: {key} {future}")
+        """
+        Send a command and wait for its response.
+
+        Args:
+            obj: the command, with a `next_command_id()` for its "id".
+            timeout: seconds to wait for the response, from now, or None to
+                wait as long as it takes.
+            priority: the write lane, "control", "normal" or "bulk", or None
+                to choose by method and size, see `_lanes.classify()`.
+
+        Raises:
+            asyncio.TimeoutError: if the response took longer than `timeout`,
+                a response that comes later is dropped.
+            ValueError: if `priority` isn't a lane.
+
+        """
+        check_priority(priority)
+        key, command = self._register(obj, timeout)
+        future = command.future
+        self._attach_channel()
         try:
-            async with self._write_lock:  # this should be a queue not a lock
-                loop = asyncio.get_running_loop()
-                perf = await loop.run_in_executor(
-                    self._executor,
-                    self._channel.write_json,
-                    obj,
-                )
-            self.write_perfs[key] = perf
-        except (_manual_thread_pool.ExecutorClosedError, asyncio.CancelledError) as e:
+            await self._queue(obj, command, priority)
+            # if we're cancelled before our turn, the writer skips us
+            await command.written
+        except asyncio.CancelledError:
+            if self._cleaned:  # it was the writer, so the channel is done
+                raise channels.ChannelClosedError("Executor is closed.") from None
+            future.cancel()  # it was our caller
+            self._forget(key, command)
+            raise
+        except _manual_thread_pool.ExecutorClosedError as e:
             if not future.cancel() or not future.cancelled():
                 await future  # it wasn't canceled, so listen to it before raising
+            self._forget(key, command)
             raise channels.ChannelClosedError("Executor is closed.") from e
         except Exception as e:  # noqa: BLE001
-            future.set_exception(e)
-            del self.futures[key]
+            if not future.done():  # else it timed out, unwritten
+                future.set_exception(e)
+            self._forget(key, command)
             _logger.debug(f"Future for {key} deleted.")
 
-        return await future
+        try:
+            return await future
+        finally:  # if our caller gave up, the response has nowhere to go
+            self._forget(key, command)
+
+    async def write_jsons(
+        self,
+        objs: Sequence[protocol.BrowserCommand],
+        *,
+        timeout: float | None = None,
+    ) -> list[asyncio.Future[protocol.BrowserResponse]]:
+        """
+        Send commands together and return futures for their responses.
+
+        They are all queued before the writer runs, so they go out in one
+        write. Each future is forgotten once done or cancelled, the caller
+        should cancel those it stops waiting for.
+
+        Args:
+            objs: the commands, each with a `next_command_id()` for its "id".
+            timeout: seconds to wait for each response, or None.
+
+        """
+        registered = [self._register(obj, timeout) for obj in objs]
+        for key, command in registered:
+            command.future.add_done_callback(partial(self._done, key, command))
+            command.written.add_done_callback(partial(self._written, command))
+        self._attach_channel()
+        try:
+            for obj, (_, command) in zip(objs, registered):
+                try:
+                    await self._queue(obj, command)
+                except Exception as e:  # noqa: BLE001, PERF203 it's the command's error
+                    if not command.future.done():
+                        command.future.set_exception(e)
+        except BaseException:
+            for _, command in registered:
+                command.future.cancel()
+            raise
+        return [command.future for _, command in registered]
+
+    def _done(
+        self,
+        key: int,
+        command: Command,
+        _: asyncio.Future[protocol.BrowserResponse],
+    ) -> None:
+        self._forget(key, command)
+        command.written.cancel()  # the writer skips it if it's still queued
+
+    def _written(self, command: Command, written: asyncio.Future[Any]) -> None:
+        if command.future.done():
+            return
+        if written.cancelled():
+            command.future.set_exception(
+                channels.ChannelClosedError("Executor is closed."),
+            )
+        elif written.exception():
+            command.future.set_exception(cast("Exception", written.exception()))
+
+    def _register(
+        self,
+        obj: protocol.BrowserCommand,
+        timeout: float | None,
+    ) -> tuple[int, Command]:
+        protocol.verify_params(obj)
+        key = obj.get("id")
+        _logger.debug1(f"Broker writing {obj['method']} with key {key}")
+        if not isinstance(key, int):
+            raise RuntimeError(  # noqa: TRY004 it's our message, not the caller's
+                "Message strangely formatted and "
+                "choreographer couldn't figure it out why.",
+            )
+        command = Command(obj["method"], obj.get("sessionId", ""))
+        self.in_flight[key] = command
+        if timeout is not None:
+            self._deadlines.add(key, asyncio.get_running_loop().time() + timeout)
+        _logger.debug(f"Created future: {key} {command.future}")
+        return key, command
+
+    async def _queue(
+        self,
+        obj: protocol.BrowserCommand,
+        command: Command,
+        priority: Lane | None = None,
+    ) -> None:
+        # the writer only ever sees finished frames
+        frame = await self._encode(obj)
+        if isinstance(frame, bytes):
+            command.size = len(frame)
+        else:
+            command.size = estimate_size(obj)
+        lane = priority or classify(command.method, command.size)
+        self.lanes.append(lane, frame, command.written)
+        if not self._writer_task or self._writer_task.done():
+            self._writer_task = asyncio.create_task(self._write_loop())
+
+    async def _encode(self, obj: protocol.BrowserCommand) -> bytes | Iterator[bytes]:
+        size = estimate_size(obj)
+        if size < _ENCODE_IN_PIECES:
+            return self._channel.encode(obj)
+        elif size >= _STREAM:
+            _logger.debug(f"Will stream huge {obj['method']} as it's encoded.")
+            return self._channel.encode_chunks(obj)
+        _logger.debug(f"Encoding large {obj['method']} a piece at a time.")
+        pieces = []
+        for piece in self._channel.encode_chunks(obj):
+            pieces.append(piece)
+            await asyncio.sleep(0)  # let the writer and readers run
+        return b"".join(pieces)
+
+    async def _write_loop(self) -> None:
+        # runs while there are commands queued, everything queued by the time
+        # the last write finished goes out in the next one
+        batch: list[asyncio.Future[tuple[float, float]]] = []
+        try:
+            while self.lanes:
+                batch, frames = self.lanes.take(_BATCH_MAX)
+                if not batch:
+                    continue
+                _logger.debug(f"Writer has {len(batch)} commands to write.")
+                try:
+                    perf = await self._write_frames(frames)
+                except Exception as e:  # noqa: BLE001 every caller gets it
+                    for written in batch:
+                        if not written.done():
+                            written.set_exception(e)
+                    continue
+                for written in batch:
+                    if not written.done():
+                        written.set_result(perf)
+        finally:  # if we're cancelled, so is everyone waiting on us
+            for written in batch:
+                written.cancel()
+            self.lanes.cancel()
+
+    async def _write_frames(
+        self,
+        frames: list[bytes] | Iterator[bytes],
+    ) -> tuple[float, float]:
+        loop = asyncio.get_running_loop()
+        if isinstance(frames, list):
+            if self._async_channel:
+                return await self._async_channel.write_frames_async(frames)
+            return await loop.run_in_executor(
+                self._executor,
+                self._channel.write_frames,
+                frames,
+            )
+        if self._async_channel:
+            return await self._async_channel.write_chunks_async(frames)
+        return await loop.run_in_executor(
+            self._executor,
+            self._channel.write_chunks,
+            frames,
+        )
+
+    def _register_session(self, target: Target, session: Session) -> None:
+        self._sessions[session.session_id] = (target, session)
+
+    def _unregister_session(self, target: Target, session_id: str) -> None:
+        entry = self._sessions.get(session_id)
+        if entry and entry[0] is target:
+            del self._sessions[session_id]
 
     def _get_target_session_by_session_id(
         self,
         session_id: str,
     ) -> tuple[Target, Session] | None:
-        if session_id == "":
-            return (self._browser, self._browser.sessions[session_id])
-        for tab in self._browser.tabs.values():
-            if session_id in tab.sessions:
-                return (tab, tab.sessions[session_id])
-        if session_id in self._browser.sessions:
-            return (self._browser, self._browser.sessions[session_id])
-        return None
-
-    def _check_for_closed_session(self, response: protocol.BrowserResponse) -> bool:
-        if "method" in response and response["method"] == "Target.detachedFromTarget":
-            session_closed = response["params"].get(
+        return self._sessions.get(session_id)
+
+    def _check_for_closed_session(self, envelope: channels.Envelope) -> bool:
+        if envelope.method == "Target.detachedFromTarget":
+            session_closed = envelope.message()["params"].get(
                 "sessionId",
                 "",
             )
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import asyncio
+import math
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Callable
+
+RESOLUTION = 0.05
+"""Seconds per tick, deadlines are rounded up to a tick."""
+SLOTS = 256
+"""Ticks in one turn of the wheel, further deadlines wait more turns."""
+
+
+class TimerWheel:
+    """
+    Deadlines for many keys on one loop timer.
+
+    Keys hash into the slot of their deadline's tick, so adding and
+    discarding are O(1), and one timer visits one slot per tick, only
+    while there are deadlines. A deadline expires within `resolution` after
+    it's due, a slot holding some from later turns keeps those.
+    """
+
+    __slots__ = (
+        "_handle",
+        "_next_tick",
+        "_on_expire",
+        "_slots",
+        "_where",
+        "resolution",
+    )
+
+    resolution: float
+    """Seconds per tick."""
+
+    def __init__(
+        self,
+        on_expire: Callable[[int], None],
+        resolution: float = RESOLUTION,
+        slots: int = SLOTS,
+    ) -> None:
+        """
+        Construct an empty wheel.
+
+        Args:
+            on_expire: called with each key whose deadline passed.
+            resolution: seconds per tick.
+            slots: ticks in one turn.
+
+        """
+        self.resolution = resolution
+        self._on_expire = on_expire
+        self._slots: list[dict[int, int]] = [{} for _ in range(slots)]  # key: tick
+        self._where: dict[int, int] = {}  # key: slot
+        self._handle: asyncio.TimerHandle | None = None
+        self._next_tick = 0
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._where
+
+    def add(self, key: int, deadline: float) -> None:
+        """
+        Expire `key` at `deadline`, a `loop.time()`.
+
+        Args:
+            key: the key, replacing its deadline if it has one.
+            deadline: when to expire it.
+
+        """
+        self.discard(key)
+        loop = asyncio.get_running_loop()
+        if not self._handle:
+            self._next_tick = self._tick(loop.time())
+            self._handle = loop.call_at(self._next_tick * self.resolution, self._run)
+        tick = max(math.ceil(deadline / self.resolution), self._next_tick)
+        slot = tick % len(self._slots)
+        self._slots[slot][key] = tick
+        self._where[key] = slot
+
+    def discard(self, key: int) -> None:
+        """Forget `key`'s deadline, if it has one."""
+        slot = self._where.pop(key, None)
+        if slot is not None:
+            del self._slots[slot][key]
+
+    def cancel(self) -> None:
+        """Forget every deadline."""
+        for slot in self._slots:
+            slot.clear()
+        self._where.clear()
+        if self._handle:
+            self._handle.cancel()
+            self._handle = None
+
+    def _tick(self, time: float) -> int:
+        return math.floor(time / self.resolution)
+
+    def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        # the loop may call us a hair early, this is our tick all the same
+        last = max(self._tick(loop.time()), self._next_tick)
+        # a slow loop can skip ticks, but never needs more than one turn
+        first = max(self._next_tick, last - len(self._slots) + 1)
+        for tick in range(first, last + 1):
+            slot = self._slots[tick % len(self._slots)]
+            # the rest are for later turns
+            expired = [key for key, due in slot.items() if due <= tick]
+            for key in expired:
+                self.discard(key)
+                self._on_expire(key)
+            if not slot:  # dicts don't shrink, a burst mustn't stay allocated
+                self._slots[tick % len(self._slots)] = {}
+        self._next_tick = last + 1
+        if self._where:
+            when = self._next_tick * self.resolution
+            self._handle = loop.call_at(when, self._run)
+        else:
+            self._handle = None
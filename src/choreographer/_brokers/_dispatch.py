@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import asyncio
+import inspect
+from typing import TYPE_CHECKING
+
+import logistro
+
+if TYPE_CHECKING:
+    from typing import Any, Awaitable, Callable, Coroutine
+
+    from choreographer import protocol
+    from choreographer.protocol._events import EventQueue, Subscription
+
+_logger = logistro.getLogger(__name__)
+
+EVENT_CONCURRENCY = 100
+"""How many async event callbacks can run at once by default."""
+BLOCK_TIMEOUT = 5.0
+"""Seconds reading stays paused for a full "block" queue before it drops events."""
+
+
+class Dispatcher:
+    """
+    Runs subscriptions' callbacks on events.
+
+    Sync callbacks run inline, as the event is routed. Async ones get the
+    event through their subscription's `EventQueue`, which has one worker
+    task while it isn't empty, so each subscription sees its events in order.
+    At most `concurrency` async callbacks run at once, across the browser.
+    A sync callback that returns an awaitable, like a lambda wrapping an
+    async function, has it awaited in a task, under the same limit.
+
+    A full "block" queue pauses reading for at most `block_timeout`: its
+    callback may be waiting on a response that can't be read meanwhile, so
+    after that the queue falls back to "drop-oldest", with a warning.
+    """
+
+    concurrency: int
+    """How many async callbacks can run at once."""
+    running: int
+    """How many async callbacks are running."""
+    inline: int
+    """How many sync callbacks were run."""
+    block_timeout: float
+    """Seconds a full "block" queue can pause reading."""
+
+    def __init__(
+        self,
+        concurrency: int = EVENT_CONCURRENCY,
+        block_timeout: float = BLOCK_TIMEOUT,
+    ) -> None:
+        """
+        Construct a dispatcher.
+
+        Args:
+            concurrency: how many async callbacks can run at once.
+            block_timeout: seconds a full "block" queue can pause reading.
+
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.concurrency = concurrency
+        self.block_timeout = block_timeout
+        self.running = self.inline = 0
+        # made on first use, python<3.10 binds it to the loop it's made in
+        self._slots: asyncio.Semaphore | None = None
+        self._workers: dict[EventQueue, asyncio.Task[None]] = {}
+        self._awaiting: set[asyncio.Task[None]] = set()
+        self._blocked: set[EventQueue] = set()
+        self._room: asyncio.Future[None] | None = None
+
+    def dispatch(
+        self,
+        subscription: Subscription,
+        method: str,
+        event: protocol.BrowserResponse,
+    ) -> None:
+        """
+        Run or queue a subscription's callback with an event.
+
+        Args:
+            subscription: the subscription that matched.
+            method: the event's method.
+            event: the event.
+
+        """
+        queue = subscription.queue
+        if queue is None:
+            self.inline += 1
+            try:
+                result = subscription.callback(event)
+            except Exception:
+                _logger.exception(f"Callback for {method} failed.")
+                return
+            if inspect.isawaitable(result):
+                task = asyncio.create_task(self._await(result))
+                self._awaiting.add(task)
+                task.add_done_callback(self._awaiting.discard)
+            return
+        self.put(queue, method, event)
+        if queue not in self._workers:
+            self._workers[queue] = asyncio.create_task(
+                self._drain(queue, subscription.callback),
+            )
+
+    def put(self, queue: EventQueue, method: str, event: Any) -> None:
+        """Add an event to a queue, a full "block" queue pauses reading."""
+        queue.put(method, event)
+        if queue.overflow == "block" and queue.full():
+            self._blocked.add(queue)
+
+    def blocked(self) -> bool:
+        """Return True if a full "block" queue wants reading paused."""
+        return bool(self._blocked)
+
+    async def yield_to_callbacks(self) -> None:
+        """Let queued callbacks start, waiting while a "block" queue is full."""
+        if not self._blocked:
+            await asyncio.sleep(0)
+            return
+        _logger.debug("Event queue full, reading paused.")
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.block_timeout
+        while self._blocked:
+            if not self._room or self._room.done():
+                self._room = loop.create_future()
+            try:
+                await asyncio.wait_for(
+                    asyncio.shield(self._room),
+                    deadline - loop.time(),
+                )
+            except asyncio.TimeoutError:
+                self._stop_blocking()
+
+    def _stop_blocking(self) -> None:
+        # its callback may be waiting on a response we'd read: stop waiting
+        for queue in self._blocked:
+            _logger.warning(
+                f"Event queue full for {self.block_timeout}s, reading paused, "
+                "its callback may be waiting on the browser. Dropping its "
+                "oldest events from now on.",
+            )
+            queue.overflow = "drop-oldest"
+        self._blocked.clear()
+        if self._room and not self._room.done():
+            self._room.set_result(None)
+
+    async def _drain(
+        self,
+        queue: EventQueue,
+        callback: Callable[[protocol.BrowserResponse], Coroutine[Any, Any, Any]],
+    ) -> None:
+        if not self._slots:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        try:
+            while queue:
+                async with self._slots:
+                    # taken once we may run, so waiting events can coalesce
+                    event = queue.get()
+                    self.made_room(queue)
+                    self.running += 1
+                    try:
+                        await callback(event)
+                    except Exception:
+                        _logger.exception("Event callback failed.")
+                    finally:
+                        self.running -= 1
+        finally:
+            del self._workers[queue]
+            self.release(queue)
+
+    async def _await(self, awaitable: Awaitable[Any]) -> None:
+        if not self._slots:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        try:
+            async with self._slots:
+                self.running += 1
+                try:
+                    await awaitable
+                except Exception:
+                    _logger.exception("Event callback failed.")
+                finally:
+                    self.running -= 1
+        finally:
+            if inspect.iscoroutine(awaitable):
+                awaitable.close()  # if cancelled before it started
+
+    def made_room(self, queue: EventQueue) -> None:
+        """Resume reading if `queue` was the last full "block" queue."""
+        if queue in self._blocked and not queue.full():
+            self._blocked.discard(queue)
+        if not self._blocked and self._room and not self._room.done():
+            self._room.set_result(None)
+
+    def release(self, queue: EventQueue) -> None:
+        """Resume reading even if `queue` is full, it won't be consumed."""
+        self._blocked.discard(queue)
+        self.made_room(queue)
+
+    def cancel(self) -> None:
+        """Cancel the workers and awaits, waiting events are dropped."""
+        for task in [*self._workers.values(), *self._awaiting]:
+            if not task.done():
+                _logger.debug2(f"Cancelling {task}")
+                task.cancel()
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import asyncio
+    from typing import Iterator, Literal
+
+    Lane = Literal["control", "normal", "bulk"]
+    Written = asyncio.Future[tuple[float, float]]
+
+LANES: tuple[Lane, ...] = ("control", "normal", "bulk")
+"""The priority classes of commands, highest first."""
+
+CONTROL = frozenset(
+    {
+        "Browser.close",
+        "Target.activateTarget",
+        "Target.attachToBrowserTarget",
+        "Target.attachToTarget",
+        "Target.closeTarget",
+        "Target.createBrowserContext",
+        "Target.createTarget",
+        "Target.detachFromTarget",
+        "Target.disposeBrowserContext",
+        "Target.setDiscoverTargets",
+    },
+)
+"""Methods that manage the browser and its tabs, they go first."""
+
+BULK = frozenset(
+    {
+        "Page.captureScreenshot",
+        "Page.captureSnapshot",
+        "Page.printToPDF",
+    },
+)
+"""Methods that make large responses, they go after the rest."""
+
+BULK_BYTES = 2**20
+"""Frames this large are bulk, and a write takes bulk frames up to about this."""
+
+STARVE_AFTER = 8
+"""A lane passed over by this many writes in a row goes first in the next."""
+
+
+def classify(method: str, size: int) -> Lane:
+    """Return the lane for a command by its method and encoded size."""
+    if method in CONTROL:
+        return "control"
+    if method in BULK or size >= BULK_BYTES:
+        return "bulk"
+    return "normal"
+
+
+def check_priority(priority: str | None) -> None:
+    """Raise `ValueError` unless `priority` is None or one of `LANES`."""
+    if priority is not None and priority not in LANES:
+        raise ValueError(
+            f"priority must be one of {', '.join(LANES)} or None, not {priority!r}",
+        )
+
+
+class WriteLanes:
+    """
+    The frames waiting for the writer, in one queue per priority lane.
+
+    A write takes control frames, then normal ones, then bulk ones up to
+    about `BULK_BYTES` (at least one), so a big payload can't hold up tab
+    churn or shutdown by more than one write. A lane that was passed over by
+    `STARVE_AFTER` writes in a row goes first in the next.
+    """
+
+    __slots__ = ("_passed", "_queues", "peaks", "sent")
+
+    peaks: dict[Lane, int]
+    """The deepest each lane has been."""
+    sent: dict[Lane, int]
+    """How many frames each lane has had written."""
+
+    def __init__(self) -> None:
+        """Construct empty lanes."""
+        self._queues: dict[Lane, deque[tuple[bytes | Iterator[bytes], Written]]] = {
+            lane: deque() for lane in LANES
+        }
+        self._passed: dict[Lane, int] = dict.fromkeys(LANES, 0)
+        self.peaks = dict.fromkeys(LANES, 0)
+        self.sent = dict.fromkeys(LANES, 0)
+
+    def __len__(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def depths(self) -> dict[Lane, int]:
+        """Return how many frames wait in each lane."""
+        return {lane: len(queue) for lane, queue in self._queues.items()}
+
+    def append(
+        self,
+        lane: Lane,
+        frame: bytes | Iterator[bytes],
+        written: Written,
+    ) -> None:
+        """
+        Queue a frame.
+
+        Args:
+            lane: its lane.
+            frame: the frame, or an iterator of its chunks to stream.
+            written: resolves with the write's (start, end) once written.
+
+        """
+        queue = self._queues[lane]
+        queue.append((frame, written))
+        self.peaks[lane] = max(self.peaks[lane], len(queue))
+
+    def _order(self) -> list[Lane]:
+        starved = [lane for lane in LANES if self._passed[lane] >= STARVE_AFTER]
+        return starved + [lane for lane in LANES if lane not in starved]
+
+    def take(self, limit: int) -> tuple[list[Written], list[bytes] | Iterator[bytes]]:
+        """
+        Take the next write's frames, a stream goes alone.
+
+        Args:
+            limit: the most frames to take.
+
+        Returns:
+            The frames' `written` futures and the frames, or the stream.
+
+        """
+        batch: list[Written] = []
+        frames: list[bytes] = []
+        taken = dict.fromkeys(LANES, 0)
+        for lane in self._order():
+            queue = self._queues[lane]
+            size = 0
+            while queue and len(frames) < limit:
+                frame, written = queue[0]
+                if written.done():  # cancelled while waiting
+                    queue.popleft()
+                    continue
+                if not isinstance(frame, bytes):  # a stream goes alone
+                    if frames:
+                        break
+                    queue.popleft()
+                    self._count({**taken, lane: 1})
+                    return [written], frame
+                if lane == "bulk" and size and size + len(frame) > BULK_BYTES:
+                    break
+                queue.popleft()
+                batch.append(written)
+                frames.append(frame)
+                taken[lane] += 1
+                size += len(frame)
+        self._count(taken)
+        return batch, frames
+
+    def _count(self, taken: dict[Lane, int]) -> None:
+        for lane in LANES:
+            self.sent[lane] += taken[lane]
+            if taken[lane] or not self._queues[lane]:
+                self._passed[lane] = 0
+            else:
+                self._passed[lane] += 1
+
+    def cancel(self) -> None:
+        """Drop every frame, cancelling what waits on them."""
+        for queue in self._queues.values():
+            while queue:
+                queue.popleft()[1].cancel()
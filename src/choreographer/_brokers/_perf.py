@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import math
+from array import array
+from typing import TYPE_CHECKING, cast
+
+if TYPE_CHECKING:
+    from typing import Sequence
+
+PERFS_MAX = 5000
+"""How many commands' timings are kept by default."""
+
+_NAN = float("nan")
+
+
+def _percentile(values: list[float], q: float) -> float:
+    """Return the `q`th percentile of sorted `values`, interpolating."""
+    position = (len(values) - 1) * q / 100
+    low = math.floor(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+class PerfStore:
+    """
+    The timings of the last `capacity` commands, in fixed-size arrays.
+
+    Each command takes the oldest slot, so adding and evicting are O(1) and
+    memory doesn't grow. Times are `time.perf_counter()`s, NaN if unknown.
+    """
+
+    __slots__ = (
+        "_keys",
+        "_methods",
+        "_next",
+        "_read_end",
+        "_sizes",
+        "_slots",
+        "_write_end",
+        "_write_start",
+        "capacity",
+    )
+
+    capacity: int
+    """How many commands are kept."""
+
+    def __init__(self, capacity: int = PERFS_MAX) -> None:
+        """
+        Construct an empty store.
+
+        Args:
+            capacity: how many commands to keep, the oldest go first.
+
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._write_start = array("d", [_NAN]) * capacity
+        self._write_end = array("d", [_NAN]) * capacity
+        self._read_end = array("d", [_NAN]) * capacity
+        self._sizes = array("q", [0]) * capacity
+        self._methods: list[str | None] = [None] * capacity
+        self._keys: list[int | None] = [None] * capacity
+        self._slots: dict[int, int] = {}
+        self._next = 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._slots
+
+    def add(  # noqa: PLR0913, PLR0917 it's a record
+        self,
+        key: int,
+        method: str,
+        size: int,
+        write_start: float,
+        write_end: float,
+        read_end: float,
+    ) -> None:
+        """
+        Record a command that got its response.
+
+        Args:
+            key: the command's id.
+            method: the command's method.
+            size: the command's size in bytes.
+            write_start: when writing it started.
+            write_end: when writing it ended.
+            read_end: when its response was read.
+
+        """
+        slot = self._next
+        self._next = (slot + 1) % self.capacity
+        old = self._keys[slot]
+        if old is not None and self._slots.get(old) == slot:
+            del self._slots[old]
+        self._keys[slot] = key
+        self._methods[slot] = method
+        self._sizes[slot] = size
+        self._write_start[slot] = write_start
+        self._write_end[slot] = write_end
+        self._read_end[slot] = read_end
+        self._slots[key] = slot
+
+    def get(self, key: int) -> tuple[float, float, float] | None:
+        """Return (write start, write end, read end) or None if it isn't kept."""
+        slot = self._slots.get(key)
+        if slot is None:
+            return None
+        return (self._write_start[slot], self._write_end[slot], self._read_end[slot])
+
+    def percentiles(
+        self,
+        q: Sequence[float] = (50, 90, 99),
+    ) -> dict[str, dict[str, float]]:
+        """
+        Summarize the kept commands by method.
+
+        Args:
+            q: the percentiles to compute, from 0 to 100.
+
+        Returns:
+            For each method, "count" and "bytes" (the total), and for each
+            percentile "write_p50" (seconds spent writing) and "roundtrip_p50"
+            (write start to response read) and so on.
+
+        """
+        writes: dict[str, list[float]] = {}
+        roundtrips: dict[str, list[float]] = {}
+        sizes: dict[str, int] = {}
+        for slot in self._slots.values():
+            method = cast("str", self._methods[slot])
+            start = self._write_start[slot]
+            if math.isnan(start):  # it was answered before its write returned
+                continue
+            writes.setdefault(method, []).append(self._write_end[slot] - start)
+            roundtrips.setdefault(method, []).append(self._read_end[slot] - start)
+            sizes[method] = sizes.get(method, 0) + self._sizes[slot]
+        summary: dict[str, dict[str, float]] = {}
+        for method, durations in writes.items():
+            durations.sort()
+            trips = sorted(roundtrips[method])
+            stats: dict[str, float] = {"count": len(durations), "bytes": sizes[method]}
+            for p in q:
+                stats[f"write_p{p:g}"] = _percentile(durations, p)
+                stats[f"roundtrip_p{p:g}"] = _percentile(trips, p)
+            summary[method] = stats
+        return summary
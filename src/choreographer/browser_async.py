@@ -16,10 +16,12 @@ import logistro
 from choreographer import protocol
 
 from ._brokers import Broker
+from ._brokers._dispatch import EVENT_CONCURRENCY
 from .browsers import BrowserClosedError, BrowserFailedError, Chromium
-from .channels import ChannelClosedError, Pipe
+from .channels import AsyncPipe, ChannelClosedError
 from .protocol.devtools_async import Session, Target
-from .utils import TmpDirWarning, _manual_thread_pool
+from .utils import TmpDirWarning
+from .utils._io_hub import LogPipe, get_hub
 from .utils._kill import kill
 
 if TYPE_CHECKING:
@@ -30,10 +32,13 @@ if TYPE_CHECKING:
     from typing_extensions import Self  # 3.9 needs this, could be from typing in 3.10
 
     from .browsers._interface_type import BrowserImplInterface
+    from .channels import Codec
     from .channels._interface_type import ChannelInterface
 
 
 MAX_POPULATE_LOOPS = 40 if "CI" in os.environ else 20
+FIRST_TAB_TIMEOUT = MAX_POPULATE_LOOPS * 0.1
+"""Seconds `open()` waits for the browser to report its first tab."""
 
 
 _logger = logistro.getLogger(__name__)
@@ -89,7 +94,9 @@ class Browser(Target):
         path: str | Path | None = None,
         *,
         browser_cls: type[BrowserImplInterface] = Chromium,
-        channel_cls: type[ChannelInterface] = Pipe,
+        channel_cls: type[ChannelInterface] = AsyncPipe,
+        codec: str | Codec | None = None,
+        event_concurrency: int = EVENT_CONCURRENCY,
         **kwargs: Any,
     ) -> None:
         """
@@ -98,24 +105,31 @@ class Browser(Target):
         Args:
             path: The path to the browser executable.
             browser_cls: The type of browser (default: `Chromium`).
-            channel_cls: The type of channel to browser (default: `Pipe`).
+            channel_cls: The type of channel to browser (default: `AsyncPipe`).
+            codec: The json codec, or its name, for the channel to use
+                (default: the global default, usually "simplejson"). "cbor"
+                uses chromium's binary protocol, binary fields are `bytes`.
+                Only passed to `channel_cls` if given.
+            event_concurrency: How many `async def` event callbacks can run
+                at once (default: 100).
             kwargs: The arguments that the browser_cls takes. For example,
                 headless=True/False, enable_gpu=True/False, etc.
 
         """
         _logger.debug("Attempting to open new browser.")
 
-        self._process_executor = _manual_thread_pool.ManualThreadExecutor(
-            max_workers=3,
-            name="checking_close",
-        )
         self._make_lock()
         self.tabs = {}
         self.targets = {}
 
         # Compose Resources
-        self._channel = channel_cls()
-        self._broker = Broker(self, self._channel)
+        # a channel_cls without a codec argument still works if none is given
+        self._channel = channel_cls(codec=codec) if codec is not None else channel_cls()
+        self._broker = Broker(
+            self,
+            self._channel,
+            event_concurrency=event_concurrency,
+        )
         self._browser_impl = browser_cls(self._channel, path, **kwargs)
 
     def is_isolated(self) -> bool:
@@ -133,15 +147,17 @@ class Browser(Target):
             parser = self._browser_impl.logger_parser
         else:
             parser = None
-        self._logger_pipe, _ = logistro.getPipeLogger(
-            "browser_proc",
-            parser=parser,
+        # read by the loop, or a thread if it can't watch pipes
+        self._logger_pipe = get_hub().log_pipe("browser_proc", parser=parser)
+        stderr = (
+            self._logger_pipe.fd
+            if isinstance(self._logger_pipe, LogPipe)
+            else self._logger_pipe
         )
 
         def run() -> subprocess.Popen[bytes] | subprocess.Popen[str]:  # depends on args
             self._browser_impl.pre_open()
             cli = self._browser_impl.get_cli()
-            stderr = self._logger_pipe
             env = self._browser_impl.get_env()
             args = self._browser_impl.get_popen_args()
             return subprocess.Popen(  # noqa: S603
@@ -153,10 +169,7 @@ class Browser(Target):
 
         _logger.debug("Trying to open browser.")
         loop = asyncio.get_running_loop()
-        self.subprocess = await loop.run_in_executor(
-            self._process_executor,
-            run,
-        )
+        self.subprocess = await loop.run_in_executor(get_hub().executor, run)
 
         super().__init__("0", self._broker)
         self._add_session(Session("", self._broker))
@@ -169,14 +182,7 @@ class Browser(Target):
             _logger.debug("Running read loop")
             self._broker.run_read_loop()
             await asyncio.sleep(0)  # let watchdog start before populate
-            counter = 0
-            while not self.get_tab():
-                _logger.debug("Populating Targets")
-                await self.populate_targets()
-                await asyncio.sleep(0.1)
-                counter += 1
-                if counter >= MAX_POPULATE_LOOPS:
-                    break
+            await self._discover_first_tab()
         except (BrowserClosedError, BrowserFailedError, asyncio.CancelledError) as e:
             raise BrowserFailedError(
                 "The browser seemed to close immediately after starting.",
@@ -208,14 +214,8 @@ class Browser(Target):
             return not _is_open
         else:
             try:
-                loop = asyncio.get_running_loop()
-
-                await loop.run_in_executor(
-                    self._process_executor,
-                    self.subprocess.wait,
-                    wait,
-                )
-            except subprocess.TimeoutExpired:
+                await asyncio.wait_for(get_hub().wait(self.subprocess), wait)
+            except asyncio.TimeoutError:
                 return False
             except asyncio.CancelledError:
                 return True
@@ -274,7 +274,10 @@ class Browser(Target):
         self._broker.clean()
 
         _logger.debug("Broker cleaned up.")
-        if self._logger_pipe:
+        if isinstance(self._logger_pipe, LogPipe):
+            self._logger_pipe.close()  # the browser has exited
+            _logger.debug("Logging pipe closed.")
+        elif self._logger_pipe:
             os.close(self._logger_pipe)  # subprocess has it open anyway
             # could have closed this copy immediately
             _logger.debug("Logging pipe closed.")
@@ -282,7 +285,6 @@ class Browser(Target):
         _logger.debug("Browser channel closed.")
         self._browser_impl.clean()  # os blocky/hangy across networks
         _logger.debug("Browser implementation cleaned up.")
-        self._process_executor.shutdown(wait=False, cancel_futures=True)
 
     async def __aexit__(
         self,
@@ -295,20 +297,13 @@ class Browser(Target):
         return None
 
     async def _watchdog(self) -> None:
-        _executor = _manual_thread_pool.ManualThreadExecutor(
-            max_workers=1,
-            name="watchdog_wait",
-        )
         try:
             with warnings.catch_warnings():
                 warnings.filterwarnings("ignore", category=TmpDirWarning)
                 _logger.debug("In watchdog")
                 loop = asyncio.get_running_loop()
                 _logger.debug2("Running wait.")
-                await loop.run_in_executor(
-                    _executor,
-                    self.subprocess.wait,
-                )
+                await get_hub().wait(self.subprocess)
 
                 _logger.warning("Wait expired, Browser is being closed by watchdog.")
                 self._watch_dog_task = (
@@ -317,24 +312,28 @@ class Browser(Target):
                 await self.close()
                 await asyncio.sleep(1)
                 await loop.run_in_executor(
-                    _executor,
+                    get_hub().executor,
                     self._browser_impl.clean,
                 )  # this is a backup
         except asyncio.CancelledError:
             pass
         finally:
-            _executor.shutdown(wait=False, cancel_futures=True)
             _logger.debug("Watchdog full shutdown (in finally:)")
 
     def _add_tab(self, tab: Tab) -> None:
         if not isinstance(tab, Tab):
             raise TypeError(f"tab must be an object of {self._tab_type}")
         self.tabs[tab.target_id] = tab
+        for session in tab.sessions.values():
+            self._broker._register_session(tab, session)  # noqa: SLF001 for routing
 
     def _remove_tab(self, target_id: str) -> None:
         if isinstance(target_id, Tab):
             target_id = target_id.target_id
-        del self.tabs[target_id]
+        tab = self.tabs.pop(target_id)
+        for session_id, session in tab.sessions.items():
+            self._broker._unregister_session(tab, session_id)  # noqa: SLF001 for routing
+            session.close_streams()
 
     def get_tab(self) -> Tab | None:
         """
@@ -348,6 +347,72 @@ class Browser(Target):
             return next(iter(self.tabs.values()))
         return None
 
+    async def _discover_first_tab(self) -> None:
+        # the browser reports its targets as events, and we attach to the
+        # pages once the first is reported, instead of asking until one is
+        loop = asyncio.get_running_loop()
+        first_page: asyncio.Future[None] = loop.create_future()
+        pages: list[str] = []
+
+        def created(event: protocol.BrowserResponse) -> None:
+            info = event["params"]["targetInfo"]
+            if info["type"] == "page" and info["targetId"] not in self.tabs:
+                pages.append(info["targetId"])
+                if not first_page.done():
+                    first_page.set_result(None)
+
+        _logger.debug("Discovering targets.")
+        self.subscribe("Target.targetCreated", created)  # inline, it's no coroutine
+        exited = get_hub().wait(self.subprocess)  # if it dies meanwhile
+        try:
+            response = await self.send_command(
+                "Target.setDiscoverTargets",
+                params={"discover": True},
+            )
+            if "error" in response:
+                _logger.debug(f"Can't discover targets: {response['error']}")
+                await self.populate_targets()
+                return
+            waiting: set[asyncio.Future[Any]] = {first_page, exited}
+            await asyncio.wait(
+                waiting,
+                timeout=FIRST_TAB_TIMEOUT,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if exited.done():
+                raise BrowserClosedError("The browser closed while opening.")
+        except ChannelClosedError as e:  # it died before answering
+            raise BrowserClosedError("The browser closed while opening.") from e
+        finally:
+            exited.cancel()
+            self.unsubscribe("Target.targetCreated")
+        if not first_page.done():
+            _logger.debug("The browser reported no tab.")
+        _logger.debug(f"Found {len(pages)} tabs.")
+        # one write: the sessions, and no more target events
+        await asyncio.gather(
+            *(self._attach_tab(target_id) for target_id in pages),
+            self.send_command(
+                "Target.setDiscoverTargets",
+                params={"discover": False},
+            ),
+        )
+
+    async def _attach_tab(self, target_id: str) -> None:
+        new_tab = Tab(target_id, self._broker)
+        try:
+            await new_tab.create_session()
+        except protocol.DevtoolsProtocolError as e:
+            if e.code == protocol.Ecode.TARGET_NOT_FOUND:
+                _logger.warning(
+                    f"Target {target_id} not found (could be closed before)",
+                )
+                return
+            else:
+                raise
+        self._add_tab(new_tab)
+        _logger.debug(f"The target {target_id} was added")
+
     async def populate_targets(self) -> None:
         """Solicit the actual browser for all targets to add to the browser object."""
         if await self._is_closed():
@@ -357,25 +422,14 @@ class Browser(Target):
             raise RuntimeError("Could not get targets") from Exception(
                 response["error"],
             )
-        for json_response in response["result"]["targetInfos"]:
-            if (
-                json_response["type"] == "page"
+        await asyncio.gather(
+            *(
+                self._attach_tab(json_response["targetId"])
+                for json_response in response["result"]["targetInfos"]
+                if json_response["type"] == "page"
                 and json_response["targetId"] not in self.tabs
-            ):
-                target_id = json_response["targetId"]
-                new_tab = Tab(target_id, self._broker)
-                try:
-                    await new_tab.create_session()
-                except protocol.DevtoolsProtocolError as e:
-                    if e.code == protocol.Ecode.TARGET_NOT_FOUND:
-                        _logger.warning(
-                            f"Target {target_id} not found (could be closed before)",
-                        )
-                        continue
-                    else:
-                        raise
-                self._add_tab(new_tab)
-                _logger.debug(f"The target {target_id} was added")
+            ),
+        )
 
     async def create_session(self) -> Session:
         """
@@ -288,7 +288,10 @@ class Chromium:
             ],
         )
         if isinstance(self._channel, Pipe):
-            cli.append("--remote-debugging-pipe")
+            if self._channel.cbor:
+                cli.append("--remote-debugging-pipe=cbor")
+            else:
+                cli.append("--remote-debugging-pipe")
             if platform.system() == "Windows":
                 # its gonna read on 3
                 # its gonna write on 4
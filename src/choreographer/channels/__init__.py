@@ -6,13 +6,27 @@ This is a low-level part of the API.
 """
 
 from ._errors import BlockWarning, ChannelClosedError, JSONError
-from ._wire import register_custom_encoder
+from ._wire import (
+    Codec,
+    Envelope,
+    available_codecs,
+    register_codec,
+    register_custom_encoder,
+    set_default_codec,
+)
+from .async_pipe import AsyncPipe
 from .pipe import Pipe
 
 __all__ = [
+    "AsyncPipe",
     "BlockWarning",
     "ChannelClosedError",
+    "Codec",
+    "Envelope",
     "JSONError",
     "Pipe",
+    "available_codecs",
+    "register_codec",
     "register_custom_encoder",
+    "set_default_codec",
 ]
@@ -0,0 +1,280 @@
+"""
+The CBOR dialect chromium speaks with `--remote-debugging-pipe=cbor`.
+
+Chromium's encoder (crdtp) uses a small part of CBOR (RFC 8949), and its
+parser accepts little more:
+
+- every message is an envelope: tag 24, then a byte string with a 4-byte
+  length holding the map. There is no terminator, the length frames it.
+- maps and arrays have indefinite length, nested maps are envelopes too.
+- integers fit in 32 bits, others are doubles.
+- text is UTF-8 text or, untagged, a UTF-16LE byte string.
+- binary (base64 strings in json mode) is tag 22 then a byte string.
+
+Binary fields, like the data of `Page.captureScreenshot`, are exchanged as
+`bytes`: no base64 on either side and a quarter less on the wire.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import struct
+from typing import TYPE_CHECKING
+
+from ._errors import JSONError
+
+if TYPE_CHECKING:
+    from typing import Any
+
+ENVELOPE = b"\xd8\x18\x5a"
+"""Tag 24 then the head of a byte string with a 4-byte length."""
+ENVELOPE_HEAD = len(ENVELOPE) + 4
+"""The bytes before an envelope's content."""
+
+# the major types, the top 3 bits of an item's first byte
+_UINT, _NINT, _BYTES, _TEXT, _LIST, _DICT, _TAG, _SIMPLE = range(8)
+# the bottom 5 bits: the argument itself, or its size, or indefinite length
+_DIRECT_MAX = 23
+_ONE_BYTE, _EIGHT_BYTES, _INDEFINITE = 24, 27, 31
+_FALSE, _TRUE, _NONE, _UNDEFINED = 20, 21, 22, 23
+
+_BINARY = 0xD6  # tag 22, expected conversion to base64
+_BINARY_TAG = 22
+_EMBEDDED_TAG = 24  # encoded cbor data item
+_MAP = 0xBF
+_ARRAY = 0x9F
+_BREAK = 0xFF
+_NULL = 0xF6
+_INT32 = 2**31
+_DOUBLE = struct.Struct(">d")
+_FLOATS = {25: struct.Struct(">e"), 26: struct.Struct(">f"), 27: _DOUBLE}
+
+
+def frame_size(data: bytes | bytearray, start: int = 0) -> int:
+    """
+    Return the size of the envelope at `start`, `data` must hold its head.
+
+    Raises:
+        ValueError: if there is no envelope at `start`.
+
+    """
+    if data[start : start + len(ENVELOPE)] != ENVELOPE:
+        raise ValueError(f"Not a cbor envelope: {bytes(data[start : start + 8])!r}")
+    size = int.from_bytes(data[start + len(ENVELOPE) : start + ENVELOPE_HEAD], "big")
+    return ENVELOPE_HEAD + size
+
+
+def _head(out: bytearray, major: int, n: int) -> None:
+    major <<= 5
+    if n <= _DIRECT_MAX:
+        out.append(major | n)
+    elif n < 2**8:
+        out += bytes((major | _ONE_BYTE, n))
+    elif n < 2**16:
+        out.append(major | 25)
+        out += n.to_bytes(2, "big")
+    elif n < 2**32:
+        out.append(major | 26)
+        out += n.to_bytes(4, "big")
+    else:
+        out.append(major | 27)
+        out += n.to_bytes(8, "big")
+
+
+def _key(k: Any) -> str:
+    if isinstance(k, str):
+        return k
+    if k is None or isinstance(k, (bool, int, float)):
+        return json.dumps(k)  # the key json would write
+    raise TypeError(f"Keys must be str, int, float, bool or None, not {type(k)}")
+
+
+def _encode(obj: Any, out: bytearray) -> None:  # noqa: C901, PLR0912 one branch a type
+    if obj is None:
+        out.append(_NULL)
+    elif obj is True:
+        out.append(0xF5)
+    elif obj is False:
+        out.append(0xF4)
+    elif isinstance(obj, str):
+        text = obj.encode("utf-8")
+        _head(out, _TEXT, len(text))
+        out += text
+    elif isinstance(obj, int):
+        if 0 <= obj < _INT32:
+            _head(out, _UINT, obj)
+        elif -_INT32 <= obj < 0:
+            _head(out, _NINT, -1 - obj)
+        else:  # chromium only reads 32-bit integers
+            out.append(0xFB)
+            out += _DOUBLE.pack(obj)
+    elif isinstance(obj, float):
+        if math.isfinite(obj):
+            out.append(0xFB)
+            out += _DOUBLE.pack(obj)
+        else:
+            out.append(_NULL)
+    elif isinstance(obj, dict):
+        out += ENVELOPE
+        out += b"\0\0\0\0"  # the length, once we know it
+        start = len(out)
+        out.append(_MAP)
+        for k, v in obj.items():
+            _encode(_key(k), out)
+            _encode(v, out)
+        out.append(_BREAK)
+        size = len(out) - start
+        if size >= 2**32:
+            raise ValueError("A cbor envelope can't hold more than 4GB.")
+        out[start - 4 : start] = size.to_bytes(4, "big")
+    elif isinstance(obj, (list, tuple)):
+        out.append(_ARRAY)
+        for v in obj:
+            _encode(v, out)
+        out.append(_BREAK)
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        out.append(_BINARY)
+        _head(out, _BYTES, len(obj))
+        out += obj
+    else:
+        from ._wire import _default  # noqa: PLC0415 it imports us
+
+        _encode(_default(obj), out)
+
+
+def _argument(data: bytes | bytearray, pos: int, info: int) -> tuple[int, int]:
+    if info <= _DIRECT_MAX:
+        return info, pos
+    if info > _EIGHT_BYTES:
+        raise JSONError(f"Unsupported cbor length {info} at {pos - 1}.")
+    size = 1 << (info - _ONE_BYTE)
+    return int.from_bytes(data[pos : pos + size], "big"), pos + size
+
+
+def _decode(data: bytes | bytearray, pos: int) -> tuple[Any, int]:  # noqa: C901, PLR0911, PLR0912 one branch a type
+    initial = data[pos]
+    major, info = initial >> 5, initial & 0x1F
+    pos += 1
+    if major == _SIMPLE:
+        if info in _FLOATS:
+            fmt = _FLOATS[info]
+            return fmt.unpack_from(data, pos)[0], pos + fmt.size
+        if info == _FALSE:
+            return False, pos
+        if info == _TRUE:
+            return True, pos
+        if info in (_NONE, _UNDEFINED):
+            return None, pos
+        raise JSONError(f"Unsupported cbor value {initial:#x} at {pos - 1}.")
+    if info == _INDEFINITE and major in (_LIST, _DICT):
+        if major == _LIST:
+            items = []
+            while data[pos] != _BREAK:
+                item, pos = _decode(data, pos)
+                items.append(item)
+            return items, pos + 1
+        mapping = {}
+        while data[pos] != _BREAK:
+            key, pos = _decode(data, pos)
+            mapping[key], pos = _decode(data, pos)
+        return mapping, pos + 1
+    n, pos = _argument(data, pos, info)
+    if major == _UINT:
+        return n, pos
+    elif major == _NINT:
+        return -1 - n, pos
+    elif major == _BYTES:  # untagged, it's how crdtp writes UTF-16
+        return data[pos : pos + n].decode("utf-16-le"), pos + n
+    elif major == _TEXT:
+        return data[pos : pos + n].decode("utf-8"), pos + n
+    elif major == _LIST:
+        items = []
+        for _ in range(n):
+            item, pos = _decode(data, pos)
+            items.append(item)
+        return items, pos
+    elif major == _DICT:
+        mapping = {}
+        for _ in range(n):
+            key, pos = _decode(data, pos)
+            mapping[key], pos = _decode(data, pos)
+        return mapping, pos
+    # a tag
+    if n in (_EMBEDDED_TAG, _BINARY_TAG) and data[pos] >> 5 == _BYTES:
+        size, start = _argument(data, pos + 1, data[pos] & 0x1F)
+        if n == _BINARY_TAG:
+            with memoryview(data) as view:  # one copy, even from a bytearray
+                return bytes(view[start : start + size]), start + size
+        item, end = _decode(data, start)
+        if end != start + size:
+            raise JSONError(f"Cbor envelope at {pos} has {end - start} of {size}.")
+        return item, end
+    return _decode(data, pos)  # other tags don't change what we return
+
+
+def _skip(data: bytes | bytearray, pos: int) -> int:
+    """Return where the item at `pos` ends, envelopes aren't looked into."""
+    if data[pos : pos + len(ENVELOPE)] == ENVELOPE:
+        return frame_size(data, pos) + pos
+    return _decode(data, pos)[1]
+
+
+class CborCodec:
+    """
+    Chromium's CBOR, for `--remote-debugging-pipe=cbor`.
+
+    It is binary: messages are framed by their length, not terminated, and
+    it can't be mixed with json. Binary fields are `bytes`, in both
+    directions, and numpy and pandas objects are written as lists.
+    """
+
+    binary = True
+
+    def encode(self, obj: Any) -> bytes:
+        out = bytearray()
+        _encode(obj, out)
+        return bytes(out)
+
+    def decode(self, message: str | bytes | bytearray) -> Any:
+        if isinstance(message, str):
+            raise JSONError("Cbor messages are bytes, not str.")
+        try:
+            obj, end = _decode(message, 0)
+        except (IndexError, UnicodeDecodeError, struct.error) as e:
+            raise JSONError from e
+        if end != len(message):
+            raise JSONError(f"Cbor message has {len(message) - end} extra bytes.")
+        return obj
+
+    def peek(
+        self,
+        message: bytes | bytearray,
+    ) -> tuple[int | None, str | None, str, bool] | None:
+        """
+        Read a message's id, method, session id and if it's an error.
+
+        Params and results are skipped over by their envelope's length, not
+        parsed. Returns None if the message isn't laid out like chromium's.
+        """
+        try:
+            if message[ENVELOPE_HEAD : ENVELOPE_HEAD + 1] != b"\xbf":
+                return None
+            id_, method, session_id, has_error = None, None, "", False
+            pos = ENVELOPE_HEAD + 1
+            while message[pos] != _BREAK:
+                key, pos = _decode(message, pos)
+                if key == "id":
+                    id_, pos = _decode(message, pos)
+                elif key == "method":
+                    method, pos = _decode(message, pos)
+                elif key == "sessionId":
+                    session_id, pos = _decode(message, pos)
+                else:
+                    has_error = has_error or key == "error"
+                    pos = _skip(message, pos)
+        except (IndexError, ValueError, JSONError, struct.error):
+            return None
+        if not isinstance(id_, (int, type(None))) or not isinstance(session_id, str):
+            return None
+        return id_, method, session_id, has_error
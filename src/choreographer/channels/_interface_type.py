@@ -2,17 +2,29 @@
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Protocol
+from typing import TYPE_CHECKING, Protocol, runtime_checkable
 
 if TYPE_CHECKING:
-    from typing import Any, Mapping, Sequence
+    import asyncio
+    from typing import Any, Iterable, Iterator, Mapping, Sequence
 
     from choreographer.protocol import BrowserResponse
 
+    from ._wire import Codec, Envelope
+
 
 class ChannelInterface(Protocol):
     """Defines the basic interface of a channel."""
 
+    def __init__(self, *, codec: str | Codec | None = None) -> None:
+        ...
+        # """
+        # Construct the channel.
+        #
+        # Args:
+        #   codec: the json codec (or its name) to use, None for the default.
+        # """
+
     # Not sure I like the obj type
     def write_json(self, obj: Mapping[str, Any]) -> tuple[float, float]:
         ...
@@ -24,6 +36,38 @@ class ChannelInterface(Protocol):
         #
         # """
 
+    def encode(self, obj: Mapping[str, Any]) -> bytes:
+        ...
+        # """
+        # Serialize an object into one frame for `write_frames()`.
+        #
+        # Args:
+        #   obj: the object to send to the browser.
+        #
+        # """
+
+    def write_frames(self, frames: Sequence[bytes]) -> tuple[float, float]:
+        ...
+        # """
+        # Write frames from `encode()`, in order, all of them before returning.
+        #
+        # Args:
+        #   frames: the encoded frames.
+        #
+        # """
+
+    def encode_chunks(self, obj: Mapping[str, Any]) -> Iterator[bytes]:
+        ...
+        # """
+        # Serialize an object a piece at a time, for `write_chunks()`.
+        # """
+
+    def write_chunks(self, chunks: Iterable[bytes]) -> tuple[float, float]:
+        ...
+        # """
+        # Write one frame from `encode_chunks()` as its pieces are encoded.
+        # """
+
     def read_jsons(
         self,
         *,
@@ -37,6 +81,16 @@ class ChannelInterface(Protocol):
         #   blocking: should this method block on read or return immediately.
         # """
 
+    def read_envelopes(
+        self,
+        *,
+        blocking: bool = True,
+    ) -> tuple[Sequence[Envelope], float]:
+        ...
+        # """
+        # Like `read_jsons()` but return `Envelope`s, which parse on demand.
+        # """
+
     def close(self) -> None:
         ...
         # """Close the channel."""
@@ -50,4 +104,41 @@ class ChannelInterface(Protocol):
         # """Return true if comm channel is active."""
 
 
+@runtime_checkable
+class AsyncChannelInterface(ChannelInterface, Protocol):
+    """Defines a channel that can wait on the event loop instead of a thread."""
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> bool:
+        ...
+        # """
+        # Prepare to be used from `loop`, return False if the loop can't.
+        #
+        # Once attached, only the `_async` methods may be used.
+        # """
+
+    async def write_json_async(self, obj: Mapping[str, Any]) -> tuple[float, float]:
+        ...
+        # """
+        # Like `write_json()` but wait on the loop if the channel is full.
+        # """
+
+    async def write_frames_async(self, frames: Sequence[bytes]) -> tuple[float, float]:
+        ...
+        # """
+        # Like `write_frames()` but wait on the loop if the channel is full.
+        # """
+
+    async def write_chunks_async(self, chunks: Iterable[bytes]) -> tuple[float, float]:
+        ...
+        # """
+        # Like `write_chunks()` but wait on the loop if the channel is full.
+        # """
+
+    async def read_envelopes_async(self) -> tuple[Sequence[Envelope], float]:
+        ...
+        # """
+        # Like `read_envelopes()` but wait on the loop until there is a message.
+        # """
+
+
 # Can't docstring protocols! EW!
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
 import json
-from typing import TYPE_CHECKING
+import math
+import re
+from functools import lru_cache, partial
+from typing import TYPE_CHECKING, Protocol
 
 import logistro
 import simplejson
@@ -10,7 +13,9 @@ from simplejson import errors as sjerrors
 from ._errors import JSONError
 
 if TYPE_CHECKING:
-    from typing import Any
+    from typing import Any, Callable, Iterator
+
+    from choreographer.protocol import BrowserResponse
 
 _logger = logistro.getLogger(__name__)
 
@@ -18,50 +23,567 @@ _custom_encoder: type[json.JSONEncoder] | None = None
 
 
 def register_custom_encoder(e: type[json.JSONEncoder] | None) -> None:
+    """
+    Encode all messages with `json.dumps(obj, cls=e)`, whatever the codec.
+
+    Args:
+        e: the `json.JSONEncoder` subclass to use, None to go back to codecs.
+
+    """
     global _custom_encoder  # noqa: PLW0603 what other choice do we have
     _custom_encoder = e
 
 
+def _convert_isoformat(o: Any, raw: Callable[[bytes], Any] | None) -> Any:
+    _ = raw
+    return o.isoformat()
+
+
+def _convert_array(o: Any, raw: Callable[[bytes], Any] | None) -> Any:
+    if o.shape == ():
+        if o.dtype.kind in ("i", "u"):
+            return int(o)
+        elif o.dtype.kind == "f":
+            return float(o)
+        raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+    if raw and (text := _format_array(o)) is not None:
+        return raw(text)
+    if hasattr(o, "values") and hasattr(o.values, "tolist"):
+        return o.values.tolist()
+    if hasattr(o, "tolist"):
+        return o.tolist()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+@lru_cache(maxsize=None)
+def _fast_formatter() -> Callable[[Any], bytes] | None:
+    """Return the fastest encoder we have for lists and ndarrays, if any."""
+    try:
+        import orjson  # noqa: PLC0415 optional dependency
+
+        return partial(orjson.dumps, option=orjson.OPT_SERIALIZE_NUMPY)
+    except ImportError:
+        pass
+    try:
+        import msgspec  # noqa: PLC0415 optional dependency
+
+        encode = msgspec.json.Encoder().encode
+        return lambda a: encode(a.tolist() if hasattr(a, "tolist") else a)
+    except ImportError:
+        return None
+
+
+def _format_array(o: Any) -> bytes | None:
+    """
+    Write a numpy array, pandas Series or Index as json, in bulk.
+
+    NaN, infinities and NaT become null. Returns None for anything it doesn't
+    know, python's float formatting is what we're avoiding, so without
+    `orjson` or `msgspec` installed only datetime64 is done here.
+    """
+    a = o.to_numpy() if hasattr(o, "to_numpy") else o
+    if type(a).__name__ != "ndarray" or type(a).__module__ != "numpy":
+        return None
+    import numpy as np  # noqa: PLC0415 we have an ndarray so it's there
+
+    kind = a.dtype.kind
+    formatter = _fast_formatter()
+    if kind == "M":
+        return _format_dates(np, a, formatter)
+    elif kind in ("f", "i", "u", "b") and formatter:
+        try:
+            return formatter(np.ascontiguousarray(a))
+        except TypeError:  # float16 or byte-swapped, say
+            return None
+    return None
+
+
+def _format_dates(
+    np: Any,
+    a: Any,
+    formatter: Callable[[Any], bytes] | None,
+) -> bytes | None:
+    if formatter:  # they write datetimes natively
+        if np.datetime_data(a.dtype)[0] in ("ns", "ps", "fs", "as"):
+            a = a.astype("datetime64[us]")  # or tolist() gives ints
+        return formatter(a.tolist())
+    elif a.ndim != 1:
+        return None
+    elif not len(a):
+        return b"[]"
+    dates = '","'.join(np.datetime_as_string(a).tolist())
+    return f'["{dates}"]'.replace('"NaT"', "null").encode()
+
+
+_converters: dict[type, Callable[[Any, Callable[[bytes], Any] | None], Any] | None] = {}
+"""What `_default()` does with each type it's seen, None if it can't."""
+
+
+def _default(o: Any, raw: Callable[[bytes], Any] | None = None) -> Any:
+    """
+    Convert numpy, pandas, and date-likes into things json understands.
+
+    Args:
+        o: the object the codec couldn't serialize.
+        raw: how the codec wraps already-encoded json, if it can.
+
+    """
+    t = type(o)
+    if t not in _converters:
+        if hasattr(o, "dtype") and hasattr(o, "shape"):
+            _converters[t] = _convert_array
+        elif hasattr(o, "isoformat"):
+            _converters[t] = _convert_isoformat
+        else:
+            _converters[t] = None
+    convert = _converters[t]
+    if convert is None:
+        raise TypeError(f"Object of type {t.__name__} is not JSON serializable")
+    return convert(o, raw)
+
+
+def _finite(o: Any) -> Any:
+    """Return a copy of `o` with NaN and infinities replaced by None."""
+    if isinstance(o, float):
+        return o if math.isfinite(o) else None
+    elif isinstance(o, (str, int)) or o is None:
+        return o
+    elif isinstance(o, dict):
+        return {k: _finite(v) for k, v in o.items()}
+    elif isinstance(o, (list, tuple)):
+        return [_finite(v) for v in o]
+    return _finite(_default(o))
+
+
+def _simplejson_raw(text: bytes) -> simplejson.RawJSON:
+    return simplejson.RawJSON(text.decode())
+
+
 class MultiEncoder(simplejson.JSONEncoder):
     """Special json encoder for numpy types."""
 
     # docs say subclassing inferior, just pass this method as a kward
     def default(self, o: Any) -> Any:
-        if hasattr(o, "dtype") and o.dtype.kind in ("i", "u") and o.shape == ():
-            return int(o)
-        elif hasattr(o, "dtype") and o.dtype.kind == "f" and o.shape == ():
-            return float(o)
-        elif hasattr(o, "dtype") and o.shape != ():
-            if hasattr(o, "values") and hasattr(o.values, "tolist"):
-                return o.values.tolist()
-            if hasattr(o, "tolist"):
-                return o.tolist()
-        elif hasattr(o, "isoformat"):
-            return o.isoformat()
-        return simplejson.JSONEncoder.default(self, o)
+        return _default(o, _simplejson_raw)
 
 
-def serialize(obj: Any) -> bytes:
-    try:
-        if not _custom_encoder:
-            message = simplejson.dumps(
-                obj,
-                ensure_ascii=False,
-                ignore_nan=True,
-                cls=MultiEncoder,
+class Codec(Protocol):
+    """
+    Defines the interface of a json backend.
+
+    Every codec writes NaN and infinities as null, numpy and pandas objects as
+    numbers or lists, and date-likes with `isoformat()`.
+    """
+
+    def encode(self, obj: Any) -> bytes: ...
+    def decode(self, message: str | bytes | bytearray) -> Any: ...
+
+    # decode raises `JSONError` on bad input
+    # a codec with `wants_text = True` parses `str`, callers holding bytes can
+    # decode them first and let go of them before the parse
+    # a codec with `binary = True` writes chromium's cbor, not json: messages
+    # are framed by their length, not terminated, and chromium must be told
+    # a codec with `peek(message)` reads (id, method, session_id, has_error)
+    # for `Envelope`, or returns None
+
+
+class SimplejsonCodec:
+    """The original codec, `simplejson` is a dependency so it's always there."""
+
+    wants_text = True
+
+    def encode(self, obj: Any) -> bytes:
+        return simplejson.dumps(
+            obj,
+            ensure_ascii=False,
+            ignore_nan=True,
+            cls=MultiEncoder,
+        ).encode("utf-8")
+
+    def decode(self, message: str | bytes | bytearray) -> Any:
+        try:
+            if not isinstance(message, str):
+                message = message.decode()
+            return simplejson.loads(message)
+        except (sjerrors.JSONDecodeError, UnicodeDecodeError) as e:
+            raise JSONError from e
+
+
+class JsonCodec:
+    """A codec with python's `json`, it walks the object again if it finds NaN."""
+
+    wants_text = True
+
+    def __init__(self) -> None:
+        self._encoder = json.JSONEncoder(
+            ensure_ascii=False,
+            allow_nan=False,
+            default=_default,
+        )
+
+    def encode(self, obj: Any) -> bytes:
+        try:
+            message = self._encoder.encode(obj)
+        except ValueError as e:
+            if "Out of range float" not in str(e):
+                raise
+            message = self._encoder.encode(_finite(obj))
+        return message.encode("utf-8")
+
+    def decode(self, message: str | bytes | bytearray) -> Any:
+        try:
+            return json.loads(message)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise JSONError from e
+
+
+class OrjsonCodec:
+    """A codec with `orjson`, an optional dependency."""
+
+    def __init__(self) -> None:
+        import orjson  # noqa: PLC0415 optional dependency
+
+        self._orjson = orjson
+        # older orjson has no Fragment, arrays are written as lists then
+        self._default = partial(_default, raw=getattr(orjson, "Fragment", None))
+
+    def encode(self, obj: Any) -> bytes:
+        # not OPT_SERIALIZE_NUMPY, it writes NaT as 1970
+        return self._orjson.dumps(
+            obj,
+            default=self._default,
+            option=self._orjson.OPT_NON_STR_KEYS,
+        )
+
+    def decode(self, message: str | bytes | bytearray) -> Any:
+        try:
+            return self._orjson.loads(message)
+        except self._orjson.JSONDecodeError as e:
+            raise JSONError from e
+
+
+class MsgspecCodec:
+    """
+    A codec with `msgspec`, an optional dependency.
+
+    `msgspec` writes UTC `datetime`s ending in "Z", not "+00:00".
+    """
+
+    def __init__(self) -> None:
+        import msgspec  # noqa: PLC0415 optional dependency
+
+        self._error = msgspec.DecodeError
+        self._encoder = msgspec.json.Encoder(
+            enc_hook=partial(_default, raw=msgspec.Raw),
+        )
+        self._decoder = msgspec.json.Decoder()
+
+    def encode(self, obj: Any) -> bytes:
+        return self._encoder.encode(obj)
+
+    def decode(self, message: str | bytes | bytearray) -> Any:
+        try:
+            return self._decoder.decode(message)
+        except self._error as e:
+            raise JSONError from e
+
+
+def _cbor_codec() -> Codec:
+    from ._cbor import CborCodec  # noqa: PLC0415 it imports this module
+
+    return CborCodec()
+
+
+_codec_factories: dict[str, Callable[[], Codec]] = {
+    "simplejson": SimplejsonCodec,
+    "json": JsonCodec,
+    "orjson": OrjsonCodec,
+    "msgspec": MsgspecCodec,
+    "cbor": _cbor_codec,
+}
+_codecs: dict[str, Codec] = {}
+_default_codec: str | Codec = "simplejson"
+
+
+def register_codec(name: str, factory: Callable[[], Codec]) -> None:
+    """
+    Make a codec available by name.
+
+    Args:
+        name: the name to use with `set_default_codec()` or `Browser(codec=)`.
+        factory: a callable returning the codec, called on first use.
+
+    """
+    _codec_factories[name] = factory
+    _codecs.pop(name, None)
+
+
+def available_codecs() -> list[str]:
+    """Return the names of the codecs whose dependencies are installed."""
+    names = []
+    for name in _codec_factories:
+        try:
+            get_codec(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def get_codec(codec: str | Codec | None = None) -> Codec:
+    """
+    Return a codec by name, or the default codec.
+
+    Args:
+        codec: a name, a codec (returned as is), or None for the default.
+
+    Raises:
+        ValueError: if the name isn't registered.
+        ImportError: if the codec's dependency isn't installed.
+
+    """
+    if codec is None:
+        codec = _default_codec
+    if not isinstance(codec, str):
+        return codec
+    if codec not in _codecs:
+        if codec not in _codec_factories:
+            raise ValueError(
+                f"Unknown codec {codec!r}, choose from {list(_codec_factories)}.",
             )
-        else:
-            message = json.dumps(obj, cls=_custom_encoder)
-    except (json.JSONDecodeError, simplejson.JSONDecodeError) as e:
-        raise JSONError from e
-    _logger.debug(f"Serialized: {message[:15]}...{message[-15:]}, size: {len(message)}")
-    _logger.debug2(f"Whole message: {message}")
+        _codecs[codec] = _codec_factories[codec]()
+    return _codecs[codec]
 
-    return message.encode("utf-8")
 
+def set_default_codec(codec: str | Codec) -> None:
+    """
+    Set the codec used by channels that weren't given one.
 
-def deserialize(message: str) -> Any:
-    try:
-        return simplejson.loads(message)
-    except sjerrors.JSONDecodeError as e:
-        raise JSONError from e
+    Args:
+        codec: a name or a codec.
+
+    """
+    global _default_codec  # noqa: PLW0603 what other choice do we have
+    get_codec(codec)  # fail here, not on first message
+    _default_codec = codec
+
+
+_ESTIMATE_SAMPLE = 16
+"""Past this many items, a list's size is guessed from its first items."""
+
+
+def estimate_size(obj: Any, depth: int = 4) -> int:
+    """
+    Guess, cheaply, how many bytes `obj` serializes to.
+
+    Strings and arrays count their length, long lists are sampled, and
+    anything deeper than `depth` counts as a few bytes. It is meant to tell
+    a 50MB payload from a small command, not to be exact.
+
+    Args:
+        obj: the object to serialize.
+        depth: how far into containers to look.
+
+    """
+    if isinstance(obj, (str, bytes)):
+        return len(obj)
+    if hasattr(obj, "nbytes"):  # numpy and friends
+        return int(obj.nbytes)
+    if depth and isinstance(obj, dict):
+        return sum(estimate_size(v, depth - 1) + 4 for v in obj.values())
+    if depth and isinstance(obj, (list, tuple)):
+        sample = obj[:_ESTIMATE_SAMPLE]
+        total = sum(estimate_size(v, depth - 1) + 1 for v in sample)
+        return total * len(obj) // len(sample) if sample else 2
+    return 8
+
+
+def is_binary(codec: str | Codec | None = None) -> bool:
+    """Return True if the codec isn't json, see `Codec`."""
+    return getattr(get_codec(codec), "binary", False)
+
+
+def serialize(obj: Any, codec: str | Codec | None = None) -> bytes:
+    if _custom_encoder and not is_binary(codec):
+        message = json.dumps(obj, cls=_custom_encoder).encode("utf-8")
+    else:
+        message = get_codec(codec).encode(obj)
+    _logger.debug(
+        f"Serialized: {message[:15]!r}...{message[-15:]!r}, size: {len(message)}",
+    )
+    if _logger.isEnabledFor(logistro.DEBUG2):  # the repr is expensive
+        _logger.debug2(f"Whole message: {message!r}")
+
+    return message
+
+
+_CHUNK = 2**18
+"""About how much json `iter_serialize()` encodes at a time."""
+
+
+def iter_serialize(
+    obj: Any,
+    codec: str | Codec | None = None,
+    chunk_size: int = _CHUNK,
+) -> Iterator[bytes]:
+    """
+    Serialize `obj` a piece at a time, joined the pieces are one json.
+
+    Big strings, lists and the dicts holding them are split up, anything else
+    is encoded whole, so a payload never exists as json all at once. A binary
+    codec, which needs the length up front, encodes everything whole.
+
+    Args:
+        obj: the object to serialize.
+        codec: the codec (or its name), None for the default.
+        chunk_size: about how many characters or items to encode at a time.
+
+    """
+    if _custom_encoder or is_binary(codec):
+        yield serialize(obj, codec)
+        return
+    yield from _iter_encode(obj, get_codec(codec), chunk_size)
+
+
+def _iter_encode(obj: Any, codec: Codec, chunk_size: int) -> Iterator[bytes]:
+    if isinstance(obj, str) and len(obj) > chunk_size:
+        yield b'"'
+        for i in range(0, len(obj), chunk_size):
+            yield codec.encode(obj[i : i + chunk_size])[1:-1]  # drop the quotes
+        yield b'"'
+    elif isinstance(obj, (list, tuple)) and (size := estimate_size(obj)) > chunk_size:
+        step = max(1, chunk_size * len(obj) // size)  # items per piece
+        yield b"["
+        for i in range(0, len(obj), step):
+            if i:
+                yield b","
+            if step == 1:
+                yield from _iter_encode(obj[i], codec, chunk_size)
+            else:
+                yield codec.encode(list(obj[i : i + step]))[1:-1]  # drop the []
+        yield b"]"
+    elif (
+        isinstance(obj, dict)
+        and all(isinstance(k, str) for k in obj)
+        and estimate_size(obj) > chunk_size
+    ):
+        yield b"{"
+        for i, (k, v) in enumerate(obj.items()):
+            yield (b"," if i else b"") + codec.encode(k) + b":"
+            yield from _iter_encode(v, codec, chunk_size)
+        yield b"}"
+    else:
+        yield codec.encode(obj)
+
+
+def deserialize(
+    message: str | bytes | bytearray, codec: str | Codec | None = None
+) -> Any:
+    return get_codec(codec).decode(message)
+
+
+# chromium writes "id" or "method" first and appends "sessionId" last
+_HEAD = re.compile(rb'\{"(?:id":(\d+),"(result|error)"|method":"([^"\\]+)","params")')
+_TAIL = re.compile(rb',"sessionId":"([^"\\]*)"\}\Z')
+_TAIL_SIZE = 128
+
+
+class Envelope:
+    """
+    The fields of a message needed to route it, the rest is parsed on demand.
+
+    The fields are read straight off the bytes, by the codec if it can `peek()`,
+    if the message isn't laid out like chromium's are, it is just parsed.
+    """
+
+    __slots__ = (
+        "_codec",
+        "_message",
+        "_raw",
+        "has_error",
+        "id",
+        "method",
+        "session_id",
+    )
+
+    id: int | None
+    """The command id, if it's a response."""
+    method: str | None
+    """The event name, if it's an event."""
+    session_id: str
+    """The session id, "" for the browser session."""
+    has_error: bool
+    """True if the message carries an error."""
+
+    def __init__(
+        self,
+        raw: bytes | bytearray,
+        codec: str | Codec | None = None,
+    ) -> None:
+        """
+        Read the envelope of one message.
+
+        Args:
+            raw: the message, without its terminator.
+            codec: the codec to parse it with, if it's needed.
+
+        Raises:
+            JSONError: if the message had to be parsed and wasn't json.
+
+        """
+        self._raw = raw
+        self._codec = codec
+        self._message: BrowserResponse | None = None
+        head = _HEAD.match(raw)
+        if not head:
+            peek = getattr(get_codec(codec), "peek", None)
+            fields = peek(raw) if peek else None
+            if fields is None:
+                self._read(self.message())
+                return
+            self.id, method, self.session_id, self.has_error = fields
+            self.method = method if self.id is None else None
+            return
+        id_, result, method = head.groups()
+        self.id = int(id_) if id_ else None
+        self.has_error = result == b"error"
+        self.method = method.decode() if method else None
+        tail = _TAIL.search(raw, max(0, len(raw) - _TAIL_SIZE))
+        self.session_id = tail.group(1).decode() if tail else ""
+
+    @classmethod
+    def from_message(cls, message: BrowserResponse) -> Envelope:
+        """Wrap a message that is already parsed."""
+        self = cls.__new__(cls)
+        self._raw = b""
+        self._codec = None
+        self._message = message
+        self._read(message)
+        return self
+
+    def _read(self, message: BrowserResponse) -> None:
+        self.id = message.get("id")
+        self.has_error = "error" in message
+        self.method = message.get("method") if self.id is None else None
+        self.session_id = message.get("sessionId", "")
+
+    @property
+    def is_event(self) -> bool:
+        """True if the message is an event."""
+        return self.method is not None
+
+    def message(self) -> BrowserResponse:
+        """Parse (once) and return the whole message."""
+        if self._message is None:
+            codec = get_codec(self._codec)
+            raw, self._raw = self._raw, b""
+            if getattr(codec, "wants_text", False):
+                try:
+                    text = raw.decode()
+                except UnicodeDecodeError as e:
+                    raise JSONError from e
+                del raw  # free the bytes before parsing
+                self._message = codec.decode(text)
+            else:
+                self._message = codec.decode(raw)
+        return self._message
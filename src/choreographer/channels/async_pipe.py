@@ -0,0 +1,185 @@
+"""Provides a pipe channel that waits on the asyncio event loop, not threads."""
+
+from __future__ import annotations
+
+import os
+import time
+from typing import TYPE_CHECKING
+
+import logistro
+
+from ._errors import ChannelClosedError
+from .pipe import Pipe, _advance, _gather
+
+if TYPE_CHECKING:
+    import asyncio
+    from typing import Any, Iterable, Mapping, Sequence
+
+    from ._wire import Envelope
+
+_logger = logistro.getLogger(__name__)
+
+
+def _wake(future: asyncio.Future[None]) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class AsyncPipe(Pipe):
+    """
+    Defines an operating system pipe that can be watched by the event loop.
+
+    Once `attach()`ed, both of our ends of the pipe are non-blocking and the
+    `_async` methods wait with `loop.add_reader()`/`loop.add_writer()`.
+    If the loop can't watch pipes (the Windows proactor loop can't),
+    `attach()` returns False and this is just a `Pipe`.
+    """
+
+    def __init__(self, **kwargs: Any) -> None:
+        """
+        Construct a pipe using os functions.
+
+        Args:
+            kwargs: passed to `Pipe`.
+
+        """
+        super().__init__(**kwargs)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._waiters: dict[int, asyncio.Future[None]] = {}
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> bool:
+        """
+        Prepare the pipe to be used from `loop`.
+
+        Args:
+            loop: the running loop that will call the `_async` methods.
+
+        Returns:
+            False if the loop can't watch our file descriptors.
+
+        """
+        try:
+            loop.add_reader(self._read_from_browser, lambda: None)
+            loop.remove_reader(self._read_from_browser)
+        except (NotImplementedError, ValueError, OSError) as e:
+            _logger.debug(f"Loop can't watch pipes, won't attach: {e!r}")
+            return False
+        self._set_read_blocking(blocking=False)
+        os.set_blocking(self._write_to_browser, False)
+        self._loop = loop
+        _logger.debug("Pipe attached to event loop.")
+        return True
+
+    async def _wait(self, fd: int, *, write: bool) -> None:
+        if not self._loop or not self.is_ready():
+            raise ChannelClosedError("Pipe is not attached or closed.")
+        future = self._loop.create_future()
+        self._waiters[fd] = future
+        if write:
+            self._loop.add_writer(fd, _wake, future)
+        else:
+            self._loop.add_reader(fd, _wake, future)
+        try:
+            await future
+        finally:
+            self._forget(fd, write=write)
+
+    def _forget(self, fd: int, *, write: bool) -> None:
+        # only once: after close() the fd number may belong to someone else
+        if self._waiters.pop(fd, None) is None:
+            return
+        if self._loop and not self._loop.is_closed():
+            if write:
+                self._loop.remove_writer(fd)
+            else:
+                self._loop.remove_reader(fd)
+
+    async def write_json_async(self, obj: Mapping[str, Any]) -> tuple[float, float]:
+        """
+        Send one json down the pipe, waiting on the loop while it's full.
+
+        Args:
+            obj: any python object that serializes to json.
+
+        """
+        return await self.write_frames_async([self.encode(obj)])
+
+    async def write_frames_async(self, frames: Sequence[bytes]) -> tuple[float, float]:
+        """
+        Like `write_frames()`, but wait on the loop while the pipe is full.
+
+        Args:
+            frames: the frames, in order.
+
+        Returns:
+            The time writing started and the time it ended.
+
+        """
+        self._check_writable()
+        start = time.perf_counter()
+        await self._write_all_async(frames)
+        return (start, time.perf_counter())
+
+    async def _write_all_async(self, frames: Sequence[bytes]) -> None:
+        views = [memoryview(frame) for frame in frames]
+        while views:
+            try:
+                views = _advance(views, self._write_some(views))
+            except BlockingIOError:
+                pass
+            except OSError as e:
+                self.close()
+                raise ChannelClosedError from e
+            if views:
+                _logger.debug(f"Pipe full, {len(views)} frames left to write.")
+                await self._wait(self._write_to_browser, write=True)
+
+    async def write_chunks_async(self, chunks: Iterable[bytes]) -> tuple[float, float]:
+        """
+        Like `write_chunks()`, but wait on the loop while the pipe is full.
+
+        Chunks are encoded on the loop, a group at a time, between waits.
+
+        Args:
+            chunks: the pieces of the frame, ending with the terminator.
+
+        Returns:
+            The time writing started and the time it ended.
+
+        """
+        self._check_writable()
+        start = time.perf_counter()
+        started = False
+        try:
+            for group in _gather(chunks):
+                await self._write_all_async(group)
+                started = True
+        except ChannelClosedError:
+            raise
+        except Exception:
+            if started and self._terminator:
+                await self._write_all_async([self._terminator])
+            raise
+        return (start, time.perf_counter())
+
+    async def read_envelopes_async(self) -> tuple[Sequence[Envelope], float]:
+        """
+        Wait on the loop until the pipe has at least one message, return them all.
+
+        Returns:
+            A list of envelopes and the time they were read.
+
+        """
+        while True:
+            envelopes, perf = self.read_envelopes(blocking=False)
+            if envelopes:
+                return envelopes, perf
+            await self._wait(self._read_from_browser, write=False)
+
+    def close(self) -> None:
+        """Close the pipe, waking anyone waiting on it."""
+        for fd, future in list(self._waiters.items()):
+            self._forget(fd, write=fd == self._write_to_browser)
+            if not future.done():
+                future.set_exception(ChannelClosedError())
+        super().close()
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import io
 import os
 import platform
 import sys
@@ -12,21 +13,181 @@ from typing import TYPE_CHECKING
 
 import logistro
 
+from . import _cbor as cbor
 from . import _wire as wire
 from ._errors import BlockWarning, ChannelClosedError, JSONError
 
 if TYPE_CHECKING:
-    from typing import Any, Mapping, Sequence
+    from typing import Any, Iterable, Iterator, Mapping, Sequence
 
     from choreographer.protocol import BrowserResponse
 
 _with_block = bool(sys.version_info[:3] >= (3, 12) or platform.system() != "Windows")
 
+if platform.system() == "Linux":
+    import fcntl
+
+    # python only names the constant after 3.10
+    _F_SETPIPE_SZ: int | None = getattr(fcntl, "F_SETPIPE_SZ", 1031)
+else:
+    _F_SETPIPE_SZ = None
+
 _logger = logistro.getLogger(__name__)
 
+_READ_CHUNK = 2**16
+"""The minimum free space we offer each read."""
+_ZEROS = bytes(_READ_CHUNK)
+_DETACH_SIZE = 2**20
+"""Frames this big are handed over with the buffer they're in, not copied."""
+_PIPE_CAPACITY = 2**20
+"""The capacity we ask linux for, the default unprivileged maximum."""
+_WRITE_GROUP = 2**18
+"""How much `write_chunks()` collects before writing."""
+_BYE = b"{bye}\n"
+"""What our chromium wrapper says when chromium exits."""
+_IOV_MAX = (
+    os.sysconf("SC_IOV_MAX") if "SC_IOV_MAX" in getattr(os, "sysconf_names", {}) else 1
+)
+"""The most buffers one `os.writev()` takes, 1 means no `os.writev()` (windows)."""
+
 # should be closing my ends from the start?
 
 
+class _FrameBuffer:
+    """
+    Reassembles NUL-framed messages in one growing `bytearray`.
+
+    Reads go directly into free space at the end of the buffer and only bytes
+    that haven't been scanned for a NUL are scanned again, so the cost of
+    reassembling a message is linear in its size.
+    """
+
+    __slots__ = ("_buf", "_end", "_scan", "_start")
+
+    def __init__(self, size: int = _READ_CHUNK) -> None:
+        self._buf = bytearray(size)
+        self._start = 0  # the beginning of the first unreturned frame
+        self._scan = 0  # everything before this has been checked for NUL
+        self._end = 0  # everything before this has been read
+
+    def capacity(self) -> int:
+        return len(self._buf)
+
+    def pending_is(self, value: bytes) -> bool:
+        """Return True if the incomplete frame is exactly `value`."""
+        return (
+            self._end - self._start == len(value)
+            and self._buf[self._start : self._end] == value
+        )
+
+    def _reserve(self) -> None:
+        if len(self._buf) - self._end >= _READ_CHUNK:
+            return
+        if self._start:  # move the partial frame to the front
+            pending = self._end - self._start
+            self._buf[:pending] = self._buf[self._start : self._end]
+            self._scan -= self._start
+            self._start, self._end = 0, pending
+        if len(self._buf) - self._end < _READ_CHUNK:  # still full, double it
+            for _ in range(max(len(self._buf), _READ_CHUNK) // _READ_CHUNK):
+                self._buf += _ZEROS  # no temporary the size of the buffer
+
+    def fill(self, reader: io.RawIOBase) -> int | None:
+        """Read once into the buffer, return bytes read or None if it'd block."""
+        self._reserve()
+        with memoryview(self._buf) as view, view[self._end :] as free:
+            read = reader.readinto(free)
+        if read:
+            self._end += read
+        return read
+
+    def frames(self) -> list[bytes | bytearray]:
+        """Pop all complete frames (without their NUL) from the buffer."""
+        frames: list[bytes | bytearray] = []
+        while (nul := self._buf.find(0, self._scan, self._end)) >= 0:
+            if nul - self._start >= _DETACH_SIZE:
+                frames.append(self._detach(nul, nul + 1))
+                continue
+            if nul > self._start:
+                with memoryview(self._buf) as view:
+                    frames.append(bytes(view[self._start : nul]))
+            self._start = self._scan = nul + 1
+        self._scan = self._end
+        if self._start == self._end:
+            self._start = self._scan = self._end = 0
+        return frames
+
+    def _detach(self, stop: int, after: int) -> bytearray:
+        """Hand over the whole buffer as the frame ending at `stop`, no copy."""
+        frame, start = self._buf, self._start
+        rest = frame[after : self._end]
+        self._buf = bytearray(max(_READ_CHUNK, 2 * len(rest)))
+        self._buf[: len(rest)] = rest
+        self._start = self._scan = 0
+        self._end = len(rest)
+        del frame[stop:]  # bytearray trims either end in place
+        del frame[:start]
+        return frame
+
+
+class _EnvelopeBuffer(_FrameBuffer):
+    """
+    Reassembles chromium's CBOR envelopes, which are framed by their length.
+
+    Raises:
+        ValueError: from `frames()`, if the stream isn't envelopes.
+
+    """
+
+    __slots__ = ()
+
+    def frames(self) -> list[bytes | bytearray]:
+        """Pop all complete envelopes from the buffer."""
+        frames: list[bytes | bytearray] = []
+        while self._end - self._start >= cbor.ENVELOPE_HEAD:
+            end = self._start + cbor.frame_size(self._buf, self._start)
+            if end > self._end:
+                break
+            if end - self._start >= _DETACH_SIZE:
+                frames.append(self._detach(end, end))
+                continue
+            with memoryview(self._buf) as view:
+                frames.append(bytes(view[self._start : end]))
+            self._start = end
+        self._scan = self._end
+        if self._start == self._end:
+            self._start = self._scan = self._end = 0
+        return frames
+
+
+def _advance(views: list[memoryview], written: int) -> list[memoryview]:
+    """Drop `written` bytes from the front of `views`."""
+    done = 0
+    for view in views:
+        if written < len(view):
+            break
+        written -= len(view)
+        done += 1
+    views = views[done:]
+    if written:
+        views[0] = views[0][written:]
+    return views
+
+
+def _gather(chunks: Iterable[bytes]) -> Iterator[list[bytes]]:
+    """Group small chunks so each write has at least `_WRITE_GROUP` bytes."""
+    group: list[bytes] = []
+    size = 0
+    for chunk in chunks:
+        group.append(chunk)
+        size += len(chunk)
+        if size >= _WRITE_GROUP:
+            yield group
+            group, size = [], 0
+    if group:
+        yield group
+
+
 # if we're a pipe we expect these public attributes
 class Pipe:
     """Defines an operating system pipe."""
@@ -37,9 +198,31 @@ class Pipe:
     """Consumers needs this, it is the channel choreo writes to the browser on."""
     shutdown_lock: Lock
     """Once this is locked, the pipe is closed and can't be reopened."""
+    cbor: bool
+    """True if the pipe speaks CBOR, chromium needs `--remote-debugging-pipe=cbor`."""
+
+    def __init__(
+        self,
+        *,
+        codec: str | wire.Codec | None = None,
+        pipe_capacity: int | None = _PIPE_CAPACITY,
+    ) -> None:
+        """
+        Construct a pipe using os functions.
 
-    def __init__(self) -> None:
-        """Construct a pipe using os functions."""
+        Args:
+            codec: the json codec (or its name) to use, None for the default,
+                see `choreographer.channels.available_codecs()`. "cbor" speaks
+                chromium's binary protocol instead of json.
+            pipe_capacity: (linux only) the kernel buffer size to request for
+                both directions, `None` leaves the OS default.
+
+        """
+        if codec is not None:
+            wire.get_codec(codec)  # fail early if it's not available
+        self._codec = codec
+        self.cbor = wire.is_binary(codec)
+        self._terminator = b"" if self.cbor else b"\0"
         # This is where pipe listens (from browser)
         # So pass the write to browser
         self._read_from_browser, self._write_from_browser = list(os.pipe())
@@ -62,6 +245,22 @@ class Pipe:
         self.shutdown_lock = Lock()  # should be private
         self._open_lock = Lock()  # should be private
 
+        if pipe_capacity:
+            self._set_capacity(self._read_from_browser, pipe_capacity)
+            self._set_capacity(self._write_to_browser, pipe_capacity)
+
+        self._buffer = _EnvelopeBuffer() if self.cbor else _FrameBuffer()
+        self._reader = io.FileIO(self._read_from_browser, "rb", closefd=False)
+        self._read_blocking: bool | None = None  # unknown until we set it
+
+    def _set_capacity(self, fd: int, size: int) -> None:
+        if _F_SETPIPE_SZ is None:
+            return
+        try:
+            fcntl.fcntl(fd, _F_SETPIPE_SZ, size)  # type: ignore [reportPossiblyUnboundVariable]
+        except OSError as e:  # above /proc/sys/fs/pipe-max-size, probably
+            _logger.debug(f"Couldn't set pipe capacity to {size}: {e}")
+
     def is_ready(self) -> bool:
         """Return true if pipe open."""
         return not self.shutdown_lock.locked() and self._open_lock.locked()
@@ -79,6 +278,23 @@ class Pipe:
         if not self._open_lock.acquire(blocking=False):
             raise RuntimeError("Cannot open same pipe twice.")
 
+    def encode(self, obj: Mapping[str, Any]) -> bytes:
+        """
+        Serialize an object into a frame for `write_frames()`.
+
+        Args:
+            obj: any python object that serializes to json.
+
+        """
+        encoded_message = wire.serialize(obj, self._codec) + self._terminator
+        _logger.debug(
+            f"Encoded message {encoded_message[:15]!r}...{encoded_message[-15:]!r}, "
+            f"size: {len(encoded_message)}.",
+        )
+        if _logger.isEnabledFor(logistro.DEBUG2):  # the repr is expensive
+            _logger.debug2(f"Full Message: {encoded_message!r}")
+        return encoded_message
+
     def write_json(self, obj: Mapping[str, Any]) -> tuple[float, float]:
         """
         Send one json down the pipe.
@@ -87,48 +303,122 @@ class Pipe:
             obj: any python object that serializes to json.
 
         """
+        return self.write_frames([self.encode(obj)])
+
+    def _check_writable(self) -> None:
         if not self.is_ready():
             raise ChannelClosedError(
                 "The communication channel was either never "
                 "opened or closed. Was .open() or .close() called?",
             )
-        encoded_message = wire.serialize(obj) + b"\0"
-        _logger.debug(
-            f"Writing message {encoded_message[:15]!r}...{encoded_message[-15:]!r}, "
-            f"size: {len(encoded_message)}.",
-        )
-        _logger.debug2(f"Full Message: {encoded_message!r}")
+
+    def _write_some(self, views: list[memoryview]) -> int:
+        if _IOV_MAX > 1:
+            written = os.writev(self._write_to_browser, views[:_IOV_MAX])
+        else:
+            written = os.write(self._write_to_browser, views[0])
+        _logger.debug(f"***Wrote {written} bytes from {len(views)} frames***")
+        return written
+
+    def write_frames(self, frames: Sequence[bytes]) -> tuple[float, float]:
+        """
+        Send frames from `encode()` down the pipe, as few writes as possible.
+
+        Blocks until everything is written.
+
+        Args:
+            frames: the frames, in order.
+
+        Returns:
+            The time writing started and the time it ended.
+
+        """
+        self._check_writable()
         start = time.perf_counter()
+        self._write_all(frames)
+        return (start, time.perf_counter())
+
+    def _write_all(self, frames: Sequence[bytes]) -> None:
+        views = [memoryview(frame) for frame in frames]
         try:
-            ret = os.write(self._write_to_browser, encoded_message)
-            _logger.debug(
-                f"***Wrote {ret}/{len(encoded_message)}***",
-            )
-            if ret != len(encoded_message):
-                _logger.critical(
-                    f"***Did not write entire message. {ret}/{len(encoded_message)}***",
-                )
+            while views:
+                views = _advance(views, self._write_some(views))
         except OSError as e:
             self.close()
             raise ChannelClosedError from e
+
+    def encode_chunks(self, obj: Mapping[str, Any]) -> Iterator[bytes]:
+        """
+        Serialize an object a piece at a time, for `write_chunks()`.
+
+        Args:
+            obj: any python object that serializes to json.
+
+        """
+        yield from wire.iter_serialize(obj, self._codec)
+        if self._terminator:
+            yield self._terminator
+
+    def write_chunks(self, chunks: Iterable[bytes]) -> tuple[float, float]:
+        """
+        Send one frame, from `encode_chunks()`, down the pipe as it's encoded.
+
+        Only a few chunks are held at a time. If encoding fails halfway, the
+        frame is terminated anyway so the browser can drop it.
+
+        Args:
+            chunks: the pieces of the frame, ending with the terminator.
+
+        Returns:
+            The time writing started and the time it ended.
+
+        """
+        self._check_writable()
+        start = time.perf_counter()
+        started = False
+        try:
+            for group in _gather(chunks):
+                self._write_all(group)
+                started = True
+        except ChannelClosedError:
+            raise
+        except Exception:
+            if started and self._terminator:
+                self._write_all([self._terminator])
+            raise
         return (start, time.perf_counter())
 
-    def read_jsons(  # noqa: PLR0912, PLR0915, C901 branches, complexity
+    def _set_read_blocking(self, *, blocking: bool) -> None:
+        if _with_block and self._read_blocking is not blocking:
+            os.set_blocking(self._read_from_browser, blocking)
+            self._read_blocking = blocking
+
+    def _check_bye(self) -> None:
+        if self._buffer.pending_is(_BYE):
+            _logger.debug(f"Received {_BYE!r}. is bye?")
+            self.close()
+            raise ChannelClosedError
+
+    def read_envelopes(  # noqa: C901, PLR0912 branches, complexity
         self,
         *,
         blocking: bool = True,
-    ) -> tuple[Sequence[BrowserResponse], float]:
+    ) -> tuple[Sequence[wire.Envelope], float]:
         """
-        Read from the pipe and return one or more jsons in a list.
+        Read from the pipe and return the envelopes of one or more messages.
+
+        Partial messages are kept in the pipe's buffer between calls,
+        so a non-blocking read never loses data, it just returns nothing
+        until the rest of the message arrives.
 
         Args:
             blocking: The read option can be set to block or not.
 
         Returns:
-            A list of jsons.
+            A list of envelopes, each one parses its message on demand.
 
         """
-        jsons: list[BrowserResponse] = []
+        envelopes: list[wire.Envelope] = []
         if not self.is_ready():
             raise ChannelClosedError(
                 "The communication channel was either never "
@@ -139,66 +429,72 @@ class Pipe:
                 "Windows python version < 3.12 does not support non-blocking",
                 BlockWarning,
             )
+        self._check_bye()
+        frames: list[bytes | bytearray] = []
+        loop_count = 0
         try:
-            if _with_block:
-                os.set_blocking(self._read_from_browser, blocking)
-        except OSError as e:
-            self.close()
-            raise ChannelClosedError from e
-        raw_buffer = None  # if we fail in read, we already defined
-        loop_count = 1
-        try:
-            raw_buffer = os.read(
-                self._read_from_browser,
-                10000,
-            )  # 10MB buffer, nbd, doesn't matter w/ this
-            _logger.debug(
-                f"First read in loop: {raw_buffer[:15]!r}...{raw_buffer[-15:]!r}. "
-                f"size: {len(raw_buffer)}.",
-            )
-            _logger.debug2(f"Whole buffer: {raw_buffer!r}")
-            if not raw_buffer or raw_buffer == b"{bye}\n":
-                if raw_buffer:
-                    _logger.debug(f"Received {raw_buffer!r}. is bye?")
-                # we seem to need {bye} even if chrome closes NOTE
-                self.close()
-                raise ChannelClosedError
-            while raw_buffer[-1] != 0:
-                _logger.debug("Partial message from browser received.")
+            self._set_read_blocking(blocking=blocking)
+            while not frames:
                 loop_count += 1
-                if _with_block:
-                    os.set_blocking(self._read_from_browser, True)
-                raw_buffer += os.read(self._read_from_browser, 10000)
+                read = self._buffer.fill(self._reader)
+                if read is None:  # would block
+                    break
+                if not read:
+                    # we seem to need {bye} even if chrome closes NOTE
+                    raise EOFError  # noqa: TRY301 handled below
+                frames = self._buffer.frames()
+                if not frames:
+                    self._check_bye()
+                    _logger.debug("Partial message from browser received.")
         except BlockingIOError:
             _logger.debug("BlockingIOError")
-            return jsons, time.perf_counter()
-        except OSError as e:
-            _logger.debug("OSError")
+        except ChannelClosedError:
+            raise
+        except (EOFError, OSError, ValueError) as e:  # ValueError: garbled cbor
+            _logger.debug(f"{type(e).__name__} on read")
             self.close()
-            if not raw_buffer or raw_buffer == b"{bye}\n":
-                raise ChannelClosedError from e
+            raise ChannelClosedError from e
             # this could be hard to test as it is a real OS corner case
         finally:
             _logger.debug(
-                f"Total loops: {loop_count}, "
-                f"Final size: {len(raw_buffer) if raw_buffer else 0}.",
+                f"Total loops: {loop_count}, Buffered size: {self._buffer.capacity()}.",
             )
-            _logger.debug2(f"Whole buffer: {raw_buffer!r}")
-        if raw_buffer is None:
-            return jsons, time.perf_counter()
-        decoded_buffer = raw_buffer.decode("utf-8")
-        raw_messages = decoded_buffer.split("\0")
-        _logger.debug(f"Received {len(raw_messages)} raw_messages.")
-        for raw_message in raw_messages:
-            if raw_message:
-                try:
-                    jsons.append(wire.deserialize(raw_message))
-                except JSONError:
-                    _logger.exception("JSONError decoding message. Ignoring")
-                except:
-                    _logger.exception("Error in trying to decode JSON off our read.")
-                    raise
-        return jsons, time.perf_counter()
+        _logger.debug(f"Received {len(frames)} raw_messages.")
+        for raw_message in frames:
+            if _logger.isEnabledFor(logistro.DEBUG2):  # the repr is expensive
+                _logger.debug2(f"Raw message: {raw_message!r}")
+            try:
+                envelopes.append(wire.Envelope(raw_message, self._codec))
+            except JSONError:
+                _logger.exception("JSONError decoding message. Ignoring")
+            except:
+                _logger.exception("Error in trying to decode JSON off our read.")
+                raise
+        return envelopes, time.perf_counter()
+
+    def read_jsons(
+        self,
+        *,
+        blocking: bool = True,
+    ) -> tuple[Sequence[BrowserResponse], float]:
+        """
+        Read from the pipe and return one or more jsons in a list.
+
+        Args:
+            blocking: The read option can be set to block or not.
+
+        Returns:
+            A list of jsons.
+
+        """
+        envelopes, perf = self.read_envelopes(blocking=blocking)
+        jsons: list[BrowserResponse] = []
+        for envelope in envelopes:
+            try:
+                jsons.append(envelope.message())
+            except JSONError:  # noqa: PERF203 rare, and we log each one
+                _logger.exception("JSONError decoding message. Ignoring")
+        return jsons, perf
 
     def _unblock_fd(self, fd: int) -> None:
         try:
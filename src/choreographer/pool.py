@@ -0,0 +1,525 @@
+"""Provides `BrowserPool` and `TabPool`, warm browsers and tabs leased per job."""
+
+from __future__ import annotations
+
+import abc
+import asyncio
+import contextlib
+import time
+from typing import TYPE_CHECKING, Generic, TypeVar
+from urllib.parse import urlsplit
+
+import logistro
+
+from choreographer import protocol
+
+from .browser_async import Browser, Tab
+from .browsers import BrowserClosedError, ChromeNotFoundError
+
+if TYPE_CHECKING:
+    from types import TracebackType
+    from typing import Any, AsyncContextManager, AsyncIterator, Sequence
+
+_logger = logistro.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+RETRY_DELAY = 1.0
+"""Seconds to wait before trying again after failing to start a browser or tab."""
+OPEN_ATTEMPTS = 3
+"""Tries `open()` gives each browser or tab before it raises."""
+
+# trying again won't help: no chrome, bad arguments, or a tab pool's browser closed
+_PERMANENT = (
+    BrowserClosedError,
+    ChromeNotFoundError,
+    FileNotFoundError,
+    PermissionError,
+    TypeError,
+    ValueError,
+)
+
+TAB_RESET = (
+    ("Page.navigate", {"url": "about:blank"}),
+    ("Emulation.clearDeviceMetricsOverride", None),
+    ("Emulation.setDefaultBackgroundColorOverride", None),
+    ("Emulation.setEmulatedMedia", {"media": "", "features": []}),
+)
+"""What `TabPool` sends a returned tab, with clearing storage, in one write."""
+
+
+class _Member(Generic[_T]):
+    __slots__ = ("item", "jobs", "leased", "started")
+
+    def __init__(self, item: _T) -> None:
+        self.item = item
+        self.jobs = 0
+        self.started = time.monotonic()
+        self.leased = 0.0
+
+
+class _Pool(abc.ABC, Generic[_T]):
+    # the leasing, the subclasses make, check and destroy what's leased
+
+    size: int
+    """How many the pool keeps."""
+    max_jobs: int | None
+    """Jobs each does before it's replaced, None for no limit."""
+    max_age: float | None
+    """Seconds each is used before it's replaced, None for no limit."""
+
+    leases: int
+    """How many leases were given out."""
+    recycled: int
+    """How many were replaced for their jobs or age."""
+    unhealthy: int
+    """How many were replaced for failing their check, or dying."""
+    start_failures: int
+    """How many failed to start."""
+    wait_total: float
+    """Seconds spent waiting for a lease, summed."""
+    wait_max: float
+    """The longest wait for a lease."""
+
+    def __init__(
+        self,
+        size: int,
+        max_jobs: int | None,
+        max_age: float | None,
+    ) -> None:
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.size = size
+        self.max_jobs = max_jobs
+        self.max_age = max_age
+        # made on the loop, None wakes a waiter to tell it the pool closed
+        self._idle: asyncio.Queue[_Member[_T] | None] | None = None
+        self._leased: set[_Member[_T]] = set()
+        self._tasks: set[asyncio.Task[None]] = set()
+        self._closed = True
+        self._opened = 0.0
+        self._busy = 0.0  # seconds of finished leases
+        self._waiting = 0
+        self.leases = self.recycled = self.unhealthy = self.start_failures = 0
+        self.wait_total = self.wait_max = 0.0
+
+    def __repr__(self) -> str:
+        """Show the pool's state and waiters."""
+        state = "closed" if self._closed else "open"
+        return (
+            f"<{type(self).__name__} {state}, {self._idle_count()} idle, "
+            f"{len(self._leased)} leased, {self._waiting} waiting>"
+        )
+
+    @abc.abstractmethod
+    async def _create(self) -> _T: ...
+
+    @abc.abstractmethod
+    async def _alive(self, item: _T) -> bool: ...
+
+    @abc.abstractmethod
+    async def _check(self, item: _T) -> bool: ...
+
+    @abc.abstractmethod
+    async def _destroy(self, item: _T) -> None: ...
+
+    async def open(self) -> None:
+        """
+        Fill the pool, waiting until it's full.
+
+        Raises:
+            Exception: what failed to start, at once if trying again can't
+                help (like `ChromeNotFoundError`) or else after
+                `OPEN_ATTEMPTS` tries. The pool is closed again.
+
+        """
+        if not self._closed:
+            raise RuntimeError("Can't re-open the pool")
+        _logger.info(f"Opening {self!r} of {self.size}.")
+        self._closed = False
+        self._opened = time.monotonic()
+        self._idle = asyncio.Queue()
+        starts = [
+            asyncio.create_task(self._start(OPEN_ATTEMPTS)) for _ in range(self.size)
+        ]
+        try:
+            await asyncio.gather(*starts)
+        except BaseException:
+            for task in starts:
+                task.cancel()
+            await asyncio.gather(*starts, return_exceptions=True)
+            await self.close()
+            raise
+
+    async def close(self) -> None:
+        """Empty the pool, what's leased is destroyed when returned."""
+        if self._closed or not self._idle:
+            return
+        _logger.info(f"Closing {self!r}.")
+        self._closed = True
+        while self._tasks:  # starts, returns and replacements finish
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        destroying = []
+        while not self._idle.empty():
+            member = self._idle.get_nowait()
+            if member:
+                destroying.append(self._destroy(member.item))
+        for _ in range(self._waiting):  # leases waiting raise
+            self._idle.put_nowait(None)
+        await asyncio.gather(*destroying, return_exceptions=True)
+
+    async def __aexit__(
+        self,
+        type_: type[BaseException] | None,
+        value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Close the pool."""
+        await self.close()
+
+    @contextlib.asynccontextmanager
+    async def _lease(self, timeout: float | None) -> AsyncIterator[_T]:
+        member = await self._acquire(timeout)
+        try:
+            yield member.item
+        finally:
+            self._background(self._return(member))
+
+    async def _acquire(self, timeout: float | None) -> _Member[_T]:
+        if self._closed or not self._idle:
+            raise RuntimeError("The pool is closed.")
+        start = time.perf_counter()
+        self._waiting += 1
+        try:
+            while True:
+                member = await asyncio.wait_for(self._idle.get(), timeout)
+                if member is None or self._closed:
+                    raise RuntimeError("The pool is closed.")
+                if self._too_old(member):  # it may age while idle
+                    self.recycled += 1
+                    self._replace(member)
+                elif await self._alive(member.item):  # or die
+                    break
+                else:
+                    self.unhealthy += 1
+                    self._replace(member)
+        finally:
+            self._waiting -= 1
+            waited = time.perf_counter() - start
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+        self.leases += 1
+        member.jobs += 1
+        member.leased = time.monotonic()
+        self._leased.add(member)
+        return member
+
+    async def _return(self, member: _Member[_T]) -> None:
+        self._leased.discard(member)
+        self._busy += time.monotonic() - member.leased
+        worn = (self.max_jobs and member.jobs >= self.max_jobs) or self._too_old(member)
+        # no need to check what's replaced anyway
+        healthy = worn or self._closed or await self._check(member.item)
+        if self._closed or not self._idle:
+            await self._destroy(member.item)
+        elif not healthy:
+            self.unhealthy += 1
+            self._replace(member)
+        elif worn:
+            self.recycled += 1
+            self._replace(member)
+        else:
+            self._idle.put_nowait(member)
+
+    def _too_old(self, member: _Member[_T]) -> bool:
+        if not self.max_age:
+            return False
+        return time.monotonic() - member.started >= self.max_age
+
+    def _replace(self, member: _Member[_T]) -> None:
+        _logger.debug(f"Replacing {member.item!r} after {member.jobs} jobs.")
+        self._background(self._destroy(member.item))
+        if not self._closed:
+            self._background(self._start())
+
+    async def _start(self, attempts: int | None = None) -> None:
+        # open() raises after `attempts`, replacements keep trying
+        tries = 0
+        while not self._closed:
+            tries += 1
+            try:
+                item = await self._create()
+            except Exception as e:
+                self.start_failures += 1
+                permanent = isinstance(e, _PERMANENT)
+                if attempts is not None and (permanent or tries >= attempts):
+                    raise
+                _logger.warning(f"{type(self).__name__} failed to start one: {e!r}")
+                if permanent:
+                    return
+                await asyncio.sleep(RETRY_DELAY)
+                continue
+            if self._closed or not self._idle:  # closed while we were starting
+                await self._destroy(item)
+            else:
+                self._idle.put_nowait(_Member(item))
+            return
+
+    def _background(self, coroutine: Any) -> None:
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _idle_count(self) -> int:
+        return self._idle.qsize() if self._idle else 0
+
+    def utilization(self) -> float:
+        """Return the fraction of the pool's time spent leased."""
+        if not self._opened:
+            return 0.0
+        now = time.monotonic()
+        busy = self._busy + sum(now - member.leased for member in self._leased)
+        return busy / ((now - self._opened) * self.size)
+
+    def stats(self) -> dict[str, Any]:
+        """Return the pool's metrics, for tuning `size`."""
+        return {
+            "size": self.size,
+            "idle": self._idle_count(),
+            "leased": len(self._leased),
+            "waiting": self._waiting,
+            "leases": self.leases,
+            "wait_mean": self.wait_total / self.leases if self.leases else 0.0,
+            "wait_max": self.wait_max,
+            "utilization": self.utilization(),
+            "recycled": self.recycled,
+            "unhealthy": self.unhealthy,
+            "start_failures": self.start_failures,
+        }
+
+
+class BrowserPool(_Pool[Browser]):
+    """
+    Keeps `size` browsers open and leases them out, one job at a time.
+
+    `async with pool.lease() as browser:` waits for an idle browser. When the
+    job is done the browser goes back, in the background, through a health
+    check (it must answer `Browser.getVersion` within `check_timeout`), and is
+    closed and replaced if it fails it, has done `max_jobs` jobs or is older
+    than `max_age` seconds, which an idle browser is also checked for when
+    it's leased. A job should close the tabs it creates. Leases waiting when
+    the pool closes raise `RuntimeError`.
+
+    Metrics for tuning `size` are attributes, and `stats()` sums them up.
+    """
+
+    check_timeout: float
+    """Seconds a returned browser has to answer its health check."""
+
+    def __init__(
+        self,
+        size: int = 4,
+        *,
+        max_jobs: int | None = None,
+        max_age: float | None = None,
+        check_timeout: float = 5.0,
+        **kwargs: Any,
+    ) -> None:
+        """
+        Construct a pool, `open()` starts its browsers.
+
+        Args:
+            size: how many browsers to keep open (default 4).
+            max_jobs: replace a browser after this many jobs (default no limit).
+            max_age: replace a browser after this many seconds (default no
+                limit), checked when it's leased and returned.
+            check_timeout: seconds a returned browser has to answer its
+                health check (default 5).
+            kwargs: passed to each `Browser()`, like `path` or `headless`.
+
+        """
+        super().__init__(size, max_jobs, max_age)
+        self.check_timeout = check_timeout
+        self._kwargs = kwargs
+
+    async def __aenter__(self) -> BrowserPool:  # noqa: PYI034 no typing_extensions
+        """Open the pool as a context, closing it on exit."""
+        await self.open()
+        return self
+
+    def lease(self, timeout: float | None = None) -> AsyncContextManager[Browser]:
+        """
+        Lease a browser for one job, as an async context manager.
+
+        Args:
+            timeout: seconds to wait for an idle browser, None (the default)
+                to wait as long as it takes. Raises `asyncio.TimeoutError`.
+
+        """
+        return self._lease(timeout)
+
+    async def _create(self) -> Browser:
+        browser = Browser(**self._kwargs)
+        try:
+            await browser.open()
+        except BaseException:
+            with contextlib.suppress(Exception):
+                await browser.close()
+            raise
+        return browser
+
+    async def _alive(self, item: Browser) -> bool:
+        return not await item._is_closed()  # noqa: SLF001 crashed while idle?
+
+    async def _check(self, item: Browser) -> bool:
+        try:
+            response = await item.send_command(
+                "Browser.getVersion",
+                timeout=self.check_timeout,
+            )
+        except Exception as e:  # noqa: BLE001 any failure is a failed check
+            _logger.warning(f"Browser failed its health check: {e!r}")
+            return False
+        return "result" in response
+
+    async def _destroy(self, item: Browser) -> None:
+        await item.close()
+
+
+# wildcards, so jobs can still subscribe to these names themselves
+_WATCHING = ("Page.frameNavigated*", "Inspector.targetCrashed*")
+
+
+class TabPool(_Pool[Tab]):
+    """
+    Keeps `size` tabs of a browser open and attached, leasing them per job.
+
+    `async with pool.lease() as tab:` waits for an idle tab, with its session
+    attached and `domains` enabled. When the job is done, the tab is reset
+    in the background with one write: it goes to about:blank, the storage
+    of the origins it visited is cleared, emulation is reset (`TAB_RESET`),
+    and subscriptions and `events()` streams the job left are removed. A
+    tab is closed and replaced if the reset fails, it crashed or was closed,
+    or it has done `max_jobs` jobs or is older than `max_age` seconds.
+    """
+
+    browser: Browser
+    """The browser the tabs are in."""
+    domains: tuple[str, ...]
+    """The domains enabled on every tab."""
+    reset_timeout: float
+    """Seconds a returned tab has to finish its reset."""
+
+    def __init__(  # noqa: PLR0913 they're options
+        self,
+        browser: Browser,
+        size: int = 4,
+        *,
+        domains: Sequence[str] = ("Page", "Runtime"),
+        max_jobs: int | None = None,
+        max_age: float | None = None,
+        reset_timeout: float = 5.0,
+    ) -> None:
+        """
+        Construct a pool, `open()` creates its tabs.
+
+        Args:
+            browser: an open browser to make the tabs in.
+            size: how many tabs to keep open (default 4).
+            domains: the domains to enable on each tab (default Page and
+                Runtime), Page and Inspector always are.
+            max_jobs: replace a tab after this many jobs (default no limit).
+            max_age: replace a tab after this many seconds (default no limit).
+            reset_timeout: seconds a returned tab has to finish its reset
+                (default 5).
+
+        """
+        super().__init__(size, max_jobs, max_age)
+        self.browser = browser
+        self.domains = tuple(dict.fromkeys(("Page", "Inspector", *domains)))
+        self.reset_timeout = reset_timeout
+        self._origins: dict[str, set[str]] = {}  # target_id: visited origins
+        self._crashed: set[str] = set()
+
+    async def __aenter__(self) -> TabPool:  # noqa: PYI034 no typing_extensions
+        """Open the pool as a context, closing it on exit."""
+        await self.open()
+        return self
+
+    def lease(self, timeout: float | None = None) -> AsyncContextManager[Tab]:
+        """
+        Lease a tab for one job, as an async context manager.
+
+        Args:
+            timeout: seconds to wait for an idle tab, None (the default) to
+                wait as long as it takes. Raises `asyncio.TimeoutError`.
+
+        """
+        return self._lease(timeout)
+
+    async def _create(self) -> Tab:
+        tab = await self.browser.create_tab("")
+        target_id = tab.target_id
+        origins = self._origins[target_id] = set()
+
+        def navigated(event: protocol.BrowserResponse) -> None:
+            url = urlsplit(event["params"]["frame"]["url"])
+            if url.scheme in ("http", "https"):
+                origins.add(f"{url.scheme}://{url.netloc}")
+
+        def crashed(_: protocol.BrowserResponse) -> None:
+            self._crashed.add(target_id)
+
+        tab.subscribe(_WATCHING[0], navigated)
+        tab.subscribe(_WATCHING[1], crashed)
+        try:
+            responses = await tab.send_commands([f"{d}.enable" for d in self.domains])
+        except BaseException:  # timed out, or the channel closed
+            await self._destroy(tab)
+            raise
+        for response in responses:
+            if "error" in response:
+                await self._destroy(tab)
+                raise RuntimeError(
+                    "Could not enable the tab's domains",
+                ) from protocol.DevtoolsProtocolError(response)
+        return tab
+
+    async def _alive(self, item: Tab) -> bool:
+        return item.target_id not in self._crashed and item.target_id in (
+            self.browser.tabs
+        )
+
+    async def _check(self, item: Tab) -> bool:
+        if not await self._alive(item):
+            return False
+        session = item.get_session()
+        for string in [s for s in session.subscriptions if s not in _WATCHING]:
+            session.unsubscribe(string)
+        session.close_streams()
+        origins = self._origins[item.target_id]
+        commands: list[Any] = list(TAB_RESET)
+        commands.extend(
+            ("Storage.clearDataForOrigin", {"origin": o, "storageTypes": "all"})
+            for o in sorted(origins)
+        )
+        origins.clear()
+        try:
+            responses = await item.send_commands(
+                commands,
+                timeout=self.reset_timeout,
+            )
+        except Exception as e:  # noqa: BLE001 any failure is a failed reset
+            _logger.warning(f"Tab {item.target_id} failed its reset: {e!r}")
+            return False
+        errors = [response for response in responses if "error" in response]
+        if errors:
+            _logger.warning(f"Tab {item.target_id} failed its reset: {errors!r}")
+        return not errors
+
+    async def _destroy(self, item: Tab) -> None:
+        self._origins.pop(item.target_id, None)
+        self._crashed.discard(item.target_id)
+        if item.target_id in self.browser.tabs:
+            with contextlib.suppress(Exception):  # it may have crashed
+                await self.browser.close_tab(item.target_id)
@@ -0,0 +1,223 @@
+"""Provide the bounded queues events wait in for their consumers."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+if TYPE_CHECKING:
+    from types import TracebackType
+    from typing import Callable, Literal
+
+    from choreographer import protocol
+    from choreographer._brokers._dispatch import Dispatcher
+
+    Overflow = Literal["block", "drop-oldest", "coalesce"]
+
+OVERFLOWS = ("block", "drop-oldest", "coalesce")
+"""What a full queue can do with one more event, see `EventQueue`."""
+
+
+class EventQueue:
+    """
+    Events waiting for a consumer, in the order they came.
+
+    With a `maxsize`, a full queue follows its `overflow` policy:
+
+    - "block": keep the event, but the broker stops reading from the browser
+      until there is room again. Commands' responses wait too, so a consumer
+      mustn't wait on the browser while its queue is full: if it's still
+      full after the dispatcher's `block_timeout`, it becomes "drop-oldest".
+    - "drop-oldest": drop the oldest waiting event.
+    - "coalesce": replace the waiting event with the same method, keeping its
+      place in line, or else drop the oldest.
+    """
+
+    __slots__ = ("_items", "_latest", "coalesced", "dropped", "maxsize", "overflow")
+
+    maxsize: int
+    """How many events can wait, 0 for no limit."""
+    overflow: Overflow
+    """The policy for when it's full."""
+    dropped: int
+    """How many events were dropped."""
+    coalesced: int
+    """How many events replaced a waiting one."""
+
+    def __init__(self, maxsize: int = 0, overflow: Overflow = "block") -> None:
+        """
+        Construct an empty queue.
+
+        Args:
+            maxsize: how many events can wait, 0 (the default) for no limit.
+            overflow: "block", "drop-oldest" or "coalesce", see the class.
+
+        """
+        if maxsize < 0:
+            raise ValueError("maxsize can't be negative")
+        if overflow not in OVERFLOWS:
+            raise ValueError(f"overflow must be one of {OVERFLOWS}, not {overflow!r}")
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.dropped = self.coalesced = 0
+        self._items: deque[list[Any]] = deque()  # [method, event] boxes
+        self._latest: dict[str, list[Any]] = {}  # method: its last box, to coalesce
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __repr__(self) -> str:
+        return (
+            f"<EventQueue {len(self)}/{self.maxsize or 'inf'} {self.overflow}, "
+            f"dropped={self.dropped} coalesced={self.coalesced}>"
+        )
+
+    def full(self) -> bool:
+        """Return True if the next event overflows."""
+        return bool(self.maxsize) and len(self._items) >= self.maxsize
+
+    def put(self, method: str, event: protocol.BrowserResponse) -> None:
+        """
+        Add an event, following the overflow policy if the queue is full.
+
+        Args:
+            method: the event's method.
+            event: the event.
+
+        """
+        if self.full():
+            if self.overflow == "coalesce":
+                box = self._latest.get(method)
+                if box is not None:
+                    box[1] = event
+                    self.coalesced += 1
+                    return
+            if self.overflow != "block":
+                self._forget(self._items.popleft())
+                self.dropped += 1
+        box = [method, event]
+        self._items.append(box)
+        if self.overflow == "coalesce":
+            self._latest[method] = box
+
+    def get(self) -> protocol.BrowserResponse:
+        """Remove and return the oldest event, raises IndexError if empty."""
+        box = self._items.popleft()
+        self._forget(box)
+        return box[1]  # type: ignore[no-any-return]
+
+    def _forget(self, box: list[Any]) -> None:
+        if self._latest.get(box[0]) is box:
+            del self._latest[box[0]]
+
+
+class Subscription(NamedTuple):
+    """A subscription's callback, and how it consumes events."""
+
+    callback: Callable[[protocol.BrowserResponse], Any]
+    """Takes the event, `async def` ones run from `queue`, others inline."""
+    repeating: bool
+    """False to unsubscribe after the first event."""
+    queue: EventQueue | None
+    """Where events wait for an async callback, None for a sync one."""
+
+
+class EventStream:
+    """
+    The events matching a subscription, as an async iterator.
+
+    Made by `Session.events()`, it collects events from then on, so none
+    fire unseen before it's iterated. The broker puts events straight into
+    its `queue`; `drain()` takes all that are waiting at once. Iteration
+    ends after `close()`, which leaving `async with` does, once the waiting
+    events are consumed, or when the session goes away.
+    """
+
+    __slots__ = ("_dispatcher", "_on_close", "_waiter", "closed", "query", "queue")
+
+    query: str
+    """The subscription string."""
+    queue: EventQueue
+    """The events waiting to be consumed."""
+    closed: bool
+    """True once it gets no more events."""
+
+    def __init__(
+        self,
+        query: str,
+        queue: EventQueue,
+        dispatcher: Dispatcher,
+        on_close: Callable[[EventStream], None],
+    ) -> None:
+        """
+        Construct a stream, see `Session.events()`.
+
+        Args:
+            query: the subscription string.
+            queue: where its events wait.
+            dispatcher: the broker's, which pauses reading for "block" queues.
+            on_close: unsubscribes the stream.
+
+        """
+        self.query = query
+        self.queue = queue
+        self.closed = False
+        self._dispatcher = dispatcher
+        self._on_close = on_close
+        self._waiter: asyncio.Future[None] | None = None
+
+    def __repr__(self) -> str:
+        state = "closed" if self.closed else "open"
+        return f"<EventStream {self.query!r} {state}, {self.queue!r}>"
+
+    def put(self, method: str, event: protocol.BrowserResponse) -> None:
+        """Add an event, the broker calls this."""
+        self._dispatcher.put(self.queue, method, event)
+        self._wake()
+
+    def drain(self) -> list[protocol.BrowserResponse]:
+        """Remove and return all waiting events, without waiting for any."""
+        events = [self.queue.get() for _ in range(len(self.queue))]
+        self._dispatcher.made_room(self.queue)
+        return events
+
+    def close(self) -> None:
+        """Stop collecting events, those waiting can still be consumed."""
+        if self.closed:
+            return
+        self.closed = True
+        self._on_close(self)
+        self._dispatcher.release(self.queue)  # nobody may read what's left
+        self._wake()
+
+    def _wake(self) -> None:
+        if self._waiter and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def __aiter__(self) -> EventStream:
+        return self
+
+    async def __anext__(self) -> protocol.BrowserResponse:
+        while not self.queue:
+            if self.closed:
+                raise StopAsyncIteration
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        event = self.queue.get()
+        self._dispatcher.made_room(self.queue)
+        return event
+
+    async def __aenter__(self) -> EventStream:  # noqa: PYI034 no typing_extensions
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        self.close()
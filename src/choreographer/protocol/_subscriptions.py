@@ -0,0 +1,95 @@
+"""Provide an index of event subscriptions, so matching doesn't scan them all."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, MutableMapping, TypeVar
+
+if TYPE_CHECKING:
+    from typing import Iterator
+
+_T = TypeVar("_T")
+
+_CACHE_MAX = 4096
+"""The most event methods whose matches are remembered."""
+
+
+def matches(query: str, method: str) -> bool:
+    """Return True if a subscription `query` wants events named `method`."""
+    return (query.endswith("*") and method.startswith(query[:-1])) or (method == query)
+
+
+class SubscriptionIndex(MutableMapping[str, _T]):
+    """
+    A mapping of subscription string: value, which can `match()` an event.
+
+    Exact subscriptions are a dict lookup and prefixes ("Network.*") are
+    found by slicing the method at each prefix length in use, then the
+    result is remembered per method until the subscriptions change. Either
+    way, matching an event doesn't get slower with more subscriptions.
+
+    Iteration, like `match()`, is in subscription order.
+    """
+
+    def __init__(self) -> None:
+        """Construct an empty index."""
+        self._items: dict[str, _T] = {}
+        self._order: dict[str, int] = {}
+        self._count = 0
+        self._prefixes: dict[str, str] = {}  # query without "*": query
+        self._lengths: dict[int, int] = {}  # prefix length: how many
+        self._cache: dict[str, tuple[str, ...]] = {}
+
+    def __getitem__(self, query: str) -> _T:
+        return self._items[query]
+
+    def __setitem__(self, query: str, value: _T) -> None:
+        if query not in self._items:
+            self._order[query] = self._count
+            self._count += 1
+            if query.endswith("*"):
+                prefix = query[:-1]
+                self._prefixes[prefix] = query
+                self._lengths[len(prefix)] = self._lengths.get(len(prefix), 0) + 1
+            self._cache.clear()
+        self._items[query] = value
+
+    def __delitem__(self, query: str) -> None:
+        del self._items[query]
+        del self._order[query]
+        if query.endswith("*"):
+            prefix = query[:-1]
+            del self._prefixes[prefix]
+            self._lengths[len(prefix)] -= 1
+            if not self._lengths[len(prefix)]:
+                del self._lengths[len(prefix)]
+        self._cache.clear()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._items!r})"
+
+    def match(self, method: str) -> tuple[str, ...]:
+        """
+        Return the subscriptions matching an event, in subscription order.
+
+        Args:
+            method: the event's method, like "Page.loadEventFired".
+
+        """
+        found = self._cache.get(method)
+        if found is None:
+            queries = {method} if method in self._items else set()
+            for length in self._lengths:
+                query = self._prefixes.get(method[:length])
+                if query is not None:
+                    queries.add(query)
+            found = tuple(sorted(queries, key=self._order.__getitem__))
+            if len(self._cache) >= _CACHE_MAX:
+                self._cache.clear()
+            self._cache[method] = found
+        return found
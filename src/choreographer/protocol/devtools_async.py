@@ -2,18 +2,38 @@
 
 from __future__ import annotations
 
+import asyncio
 import inspect
 from typing import TYPE_CHECKING, overload
 
 import logistro
 
 from choreographer import protocol
+from choreographer._brokers._lanes import check_priority
+from choreographer.protocol._events import EventQueue, EventStream, Subscription
+from choreographer.protocol._subscriptions import SubscriptionIndex
 
 if TYPE_CHECKING:
-    import asyncio
-    from typing import Any, Callable, Coroutine, Literal, MutableMapping
+    from typing import (
+        Any,
+        AsyncIterator,
+        Callable,
+        Literal,
+        MutableMapping,
+        Sequence,
+        Tuple,
+        Union,
+    )
 
     from choreographer._brokers import Broker
+    from choreographer._brokers._lanes import Lane
+    from choreographer.protocol._events import Overflow
+
+    Params = Union[MutableMapping[str, Any], None]
+    CommandSpec = Union[str, Tuple[str, Params]]
+    """A method, or (method, params)."""
+    TargetedSpec = Union[CommandSpec, Tuple[Union["Session", "Target"], str, Params]]
+    """Also (session or target, method, params), to send on another."""
 
 _logger = logistro.getLogger(__name__)
 
@@ -24,14 +44,11 @@ class Session:
     session_id: str
     """The id of the session given by the browser."""
     message_id: int
-    """All messages are counted per session and this is the current message id."""
-    subscriptions: MutableMapping[
-        str,
-        tuple[
-            Callable[[protocol.BrowserResponse], Coroutine[Any, Any, Any]],
-            bool,
-        ],
-    ]
+    """How many commands the session has sent, their ids come from the broker."""
+    subscriptions: SubscriptionIndex[Subscription]
+    """Subscription string: (callback, repeating, queue), indexed for matching."""
+    streams: SubscriptionIndex[list[EventStream]]
+    """Subscription string: the open `events()` streams, indexed for matching."""
 
     def __init__(self, session_id: str, broker: Broker) -> None:
         """
@@ -54,7 +71,8 @@ class Session:
         self.session_id = session_id
         _logger.debug(f"New session: {session_id}")
         self.message_id = 0
-        self.subscriptions = {}
+        self.subscriptions = SubscriptionIndex()
+        self.streams = SubscriptionIndex()
 
     @overload
     async def send_command(
@@ -63,6 +81,8 @@ class Session:
         params: MutableMapping[str, Any] | None = None,
         *,
         with_perf: Literal[False] = False,
+        timeout: float | None = None,
+        priority: Lane | None = None,
     ) -> protocol.BrowserResponse: ...
 
     @overload
@@ -72,6 +92,8 @@ class Session:
         params: MutableMapping[str, Any] | None = None,
         *,
         with_perf: Literal[True],
+        timeout: float | None = None,
+        priority: Lane | None = None,
     ) -> tuple[protocol.BrowserResponse, tuple[float, float, float]]: ...
 
     async def send_command(
@@ -80,6 +102,8 @@ class Session:
         params: MutableMapping[str, Any] | None = None,
         *,
         with_perf: bool = False,
+        timeout: float | None = None,
+        priority: Lane | None = None,
     ) -> (
         tuple[protocol.BrowserResponse, tuple[float, float, float]]
         | protocol.BrowserResponse
@@ -93,6 +117,11 @@ class Session:
             command: devtools command to send
             params: the parameters to send
             with_perf (bool): Return the optional tuple.
+            timeout: seconds to wait for the response, None (the default)
+                to wait as long as it takes. Raises `asyncio.TimeoutError`.
+            priority: "control", "normal" or "bulk", the write lane, which
+                by default (None) is chosen by method and size. Control
+                commands are written ahead of queued bulk ones.
 
         Returns:
             A message key (session, message id) tuple or None
@@ -100,11 +129,32 @@ class Session:
             perf_counters() for write start, end, and read end.
 
         """
-        current_id = self.message_id
+        check_priority(priority)  # before the command takes an id
+        json_command = self._command(command, params)
+        if with_perf:
+            return (
+                await self._broker.write_json(
+                    json_command,
+                    timeout=timeout,
+                    priority=priority,
+                ),
+                self._broker.get_perf(json_command),
+            )
+        return await self._broker.write_json(
+            json_command,
+            timeout=timeout,
+            priority=priority,
+        )
+
+    def _command(
+        self,
+        command: str,
+        params: MutableMapping[str, Any] | None,
+    ) -> protocol.BrowserCommand:
         self.message_id += 1
         json_command = protocol.BrowserCommand(
             {
-                "id": current_id,
+                "id": self._broker.next_command_id(),
                 "method": command,
             },
         )
@@ -117,34 +167,99 @@ class Session:
             f"Cmd '{command}', param keys '{params.keys() if params else ''}', "
             f"sessionId '{self.session_id}'",
         )
-        _logger.debug2(f"Full params: {str(params).replace('%', '%%')}")
-        if with_perf:
-            return (
-                await self._broker.write_json(json_command),
-                self._broker.get_perf(json_command),
+        if _logger.isEnabledFor(logistro.DEBUG2):  # str() of params is expensive
+            _logger.debug2(f"Full params: {str(params).replace('%', '%%')}")
+        return json_command
+
+    @overload
+    async def send_commands(
+        self,
+        commands: Sequence[CommandSpec],
+        *,
+        ordered: Literal[True] = True,
+        timeout: float | None = None,
+    ) -> list[protocol.BrowserResponse]: ...
+
+    @overload
+    async def send_commands(
+        self,
+        commands: Sequence[CommandSpec],
+        *,
+        ordered: Literal[False],
+        timeout: float | None = None,
+    ) -> AsyncIterator[tuple[int, protocol.BrowserResponse]]: ...
+
+    async def send_commands(
+        self,
+        commands: Sequence[CommandSpec],
+        *,
+        ordered: bool = True,
+        timeout: float | None = None,
+    ) -> (
+        list[protocol.BrowserResponse]
+        | AsyncIterator[tuple[int, protocol.BrowserResponse]]
+    ):
+        """
+        Send several devtools commands on the session in one write.
+
+            await session.send_commands(
+                [
+                    "Page.enable",
+                    ("Emulation.setDeviceMetricsOverride", viewport),
+                    ("Page.navigate", {"url": url}),
+                ],
             )
-        return await self._broker.write_json(json_command)
+
+        The browser may run them concurrently, so commands that depend on
+        another's result need to wait for it.
+
+        Args:
+            commands: each a method, or a (method, params) tuple.
+            ordered: True (the default) to return the responses in order,
+                False to return an async iterator of (index, response) in the
+                order they come.
+            timeout: seconds to wait for each response, None (the default)
+                to wait as long as it takes.
+
+        """
+        json_commands = [self._command(*_split(command)) for command in commands]
+        futures = await self._broker.write_jsons(json_commands, timeout=timeout)
+        return await _collect(futures, ordered=ordered)
 
     def subscribe(
         self,
         string: str,
-        callback: Callable[[protocol.BrowserResponse], Coroutine[Any, Any, Any]],
+        callback: Callable[[protocol.BrowserResponse], Any],
         *,
         repeating: bool = True,
+        maxsize: int = 0,
+        overflow: Overflow = "block",
     ) -> None:
         """
         Subscribe to an event on this session.
 
+        An `async def` callback, or object with an `async def __call__`, gets
+        events in order, one at a time, from a queue. Any other callable is
+        called as the event is read, so it must be quick, and if it returns
+        an awaitable that's awaited in a task.
+
         Args:
             string: the name of the event. Can use * wildcard at the end.
             callback: the callback (which takes a message dict and returns nothing)
             repeating: default True, should the callback execute more than once
+            maxsize: how many events can wait for an async callback, 0 (the
+                default) for no limit.
+            overflow: what to do with an event when `maxsize` are waiting:
+                "block" (the default) pauses reading from the browser,
+                "drop-oldest" drops the oldest waiting event and "coalesce"
+                replaces a waiting event of the same method. While reading
+                is paused no responses are read, so a callback awaiting a
+                command would wait forever: after 5 seconds a blocked queue
+                falls back to "drop-oldest", with a warning.
 
         """
-        if not inspect.iscoroutinefunction(callback):
-            raise TypeError(
-                "Call back must be be `async def` type function.",
-            )
+        if not callable(callback):
+            raise TypeError("Call back must be callable.")
         if string in self.subscriptions:
             raise ValueError(
                 "You are already subscribed to this string, "
@@ -153,7 +268,13 @@ class Session:
         else:
             # so this should be per session
             # and that means we need a list of all sessions
-            self.subscriptions[string] = (callback, repeating)
+            queue = (
+                EventQueue(maxsize, overflow)
+                if inspect.iscoroutinefunction(callback)
+                or inspect.iscoroutinefunction(type(callback).__call__)
+                else None
+            )
+            self.subscriptions[string] = Subscription(callback, repeating, queue)
 
     def unsubscribe(self, string: str) -> None:
         """
@@ -167,6 +288,55 @@ class Session:
             return
         del self.subscriptions[string]
 
+    def events(
+        self,
+        string: str,
+        *,
+        maxsize: int = 0,
+        overflow: Overflow = "block",
+    ) -> EventStream:
+        """
+        Return an async iterator of the events matching `string`.
+
+        It collects events from now on. Use it with `async with` so it's
+        closed after, or call its `close()`.
+
+            async with session.events("Network.*", maxsize=1000) as events:
+                async for event in events:
+                    ...
+
+        Args:
+            string: the name of the event. Can use * wildcard at the end.
+            maxsize: how many events can wait to be consumed, 0 (the
+                default) for no limit.
+            overflow: what to do with an event when `maxsize` are waiting,
+                see `subscribe()`.
+
+        """
+        stream = EventStream(
+            string,
+            EventQueue(maxsize, overflow),
+            self._broker.dispatcher,
+            self._remove_stream,
+        )
+        if string not in self.streams:
+            self.streams[string] = []
+        self.streams[string].append(stream)
+        return stream
+
+    def _remove_stream(self, stream: EventStream) -> None:
+        streams = self.streams.get(stream.query, [])
+        if stream in streams:
+            streams.remove(stream)
+            if not streams:
+                del self.streams[stream.query]
+
+    def close_streams(self) -> None:
+        """End every `events()` stream, as when the session goes away."""
+        for streams in list(self.streams.values()):
+            for stream in list(streams):
+                stream.close()
+
     def subscribe_once(self, string: str) -> asyncio.Future[Any]:
         """
         Return a future for a browser event.
@@ -217,11 +387,15 @@ class Target:
         if not isinstance(session, Session):
             raise TypeError("session must be a session type class")
         self.sessions[session.session_id] = session
+        self._broker._register_session(self, session)  # noqa: SLF001 for routing
 
     def _remove_session(self, session_id: str) -> None:
         if isinstance(session_id, Session):
             session_id = session_id.session_id
-        _ = self.sessions.pop(session_id, None)
+        session = self.sessions.pop(session_id, None)
+        self._broker._unregister_session(self, session_id)  # noqa: SLF001 for routing
+        if session:
+            session.close_streams()
 
     def get_session(self) -> Session:
         """Retrieve the first session of the target, if it exists."""
@@ -239,6 +413,8 @@ class Target:
         params: MutableMapping[str, Any] | None = None,
         *,
         with_perf: Literal[False] = False,
+        timeout: float | None = None,
+        priority: Lane | None = None,
     ) -> protocol.BrowserResponse: ...
 
     @overload
@@ -248,6 +424,8 @@ class Target:
         params: MutableMapping[str, Any] | None = None,
         *,
         with_perf: Literal[True],
+        timeout: float | None = None,
+        priority: Lane | None = None,
     ) -> tuple[protocol.BrowserResponse, tuple[float, float, float]]: ...
 
     async def send_command(
@@ -256,6 +434,8 @@ class Target:
         params: MutableMapping[str, Any] | None = None,
         *,
         with_perf: bool = False,
+        timeout: float | None = None,
+        priority: Lane | None = None,
     ) -> (
         protocol.BrowserResponse
         | tuple[protocol.BrowserResponse, tuple[float, float, float]]
@@ -269,6 +449,10 @@ class Target:
             command: devtools command to send
             params: the parameters to send
             with_perf (bool): Also return perf tuple
+            timeout: seconds to wait for the response, None to wait as long
+                as it takes.
+            priority: the write lane, "control", "normal", "bulk" or None to
+                choose by method and size.
 
         """
         if not self.sessions.values():
@@ -277,9 +461,77 @@ class Target:
         # so mypy can't handle bool = Literal[True, False]
         # so this is suboptimal but it quiets typer
         if with_perf:
-            return await session.send_command(command, params, with_perf=True)
+            return await session.send_command(
+                command,
+                params,
+                with_perf=True,
+                timeout=timeout,
+                priority=priority,
+            )
         else:
-            return await session.send_command(command, params, with_perf=False)
+            return await session.send_command(
+                command,
+                params,
+                with_perf=False,
+                timeout=timeout,
+                priority=priority,
+            )
+
+    @overload
+    async def send_commands(
+        self,
+        commands: Sequence[TargetedSpec],
+        *,
+        ordered: Literal[True] = True,
+        timeout: float | None = None,
+    ) -> list[protocol.BrowserResponse]: ...
+
+    @overload
+    async def send_commands(
+        self,
+        commands: Sequence[TargetedSpec],
+        *,
+        ordered: Literal[False],
+        timeout: float | None = None,
+    ) -> AsyncIterator[tuple[int, protocol.BrowserResponse]]: ...
+
+    async def send_commands(
+        self,
+        commands: Sequence[TargetedSpec],
+        *,
+        ordered: bool = True,
+        timeout: float | None = None,
+    ) -> (
+        list[protocol.BrowserResponse]
+        | AsyncIterator[tuple[int, protocol.BrowserResponse]]
+    ):
+        """
+        Send several commands in one write, on this target or others.
+
+        Like `Session.send_commands()`, on the first session in the target.
+        A (session or target, method, params) tuple sends that command on the
+        session, or on the target's first session, so a browser can send to
+        many tabs at once.
+
+        Args:
+            commands: each a method, a (method, params) tuple or a (session
+                or target, method, params) tuple.
+            ordered: True (the default) to return the responses in order,
+                False to return an async iterator of (index, response).
+            timeout: seconds to wait for each response, or None.
+
+        """
+        json_commands = []
+        for command in commands:
+            if isinstance(command, tuple) and len(command) == 3:  # noqa: PLR2004 (on, method, params)
+                on, method, params = command
+                session = on if isinstance(on, Session) else on.get_session()
+            else:
+                session = self.get_session()
+                method, params = _split(command)  # type: ignore[arg-type]
+            json_commands.append(session._command(method, params))  # noqa: SLF001
+        futures = await self._broker.write_jsons(json_commands, timeout=timeout)
+        return await _collect(futures, ordered=ordered)
 
     async def create_session(self) -> Session:
         """Create a new session on this target."""
@@ -331,9 +583,11 @@ class Target:
     def subscribe(
         self,
         string: str,
-        callback: Callable[[protocol.BrowserResponse], Coroutine[Any, Any, Any]],
+        callback: Callable[[protocol.BrowserResponse], Any],
         *,
         repeating: bool = True,
+        maxsize: int = 0,
+        overflow: Overflow = "block",
     ) -> None:
         """
         Subscribe to an event on the main session of this target.
@@ -342,10 +596,20 @@ class Target:
             string: the name of the event. Can use * wildcard at the end.
             callback: the callback (which takes a message dict and returns nothing)
             repeating: default True, should the callback execute more than once
+            maxsize: how many events can wait for an async callback, 0 for
+                no limit, see `Session.subscribe()`.
+            overflow: "block", "drop-oldest" or "coalesce", for when
+                `maxsize` events are waiting.
 
         """
         session = self.get_session()
-        session.subscribe(string, callback, repeating=repeating)
+        session.subscribe(
+            string,
+            callback,
+            repeating=repeating,
+            maxsize=maxsize,
+            overflow=overflow,
+        )
 
     def unsubscribe(self, string: str) -> None:
         """
@@ -358,6 +622,26 @@ class Target:
         session = self.get_session()
         session.unsubscribe(string)
 
+    def events(
+        self,
+        string: str,
+        *,
+        maxsize: int = 0,
+        overflow: Overflow = "block",
+    ) -> EventStream:
+        """
+        Return an async iterator of events on the first session of this target.
+
+        Args:
+            string: the name of the event. Can use * wildcard at the end.
+            maxsize: how many events can wait to be consumed, 0 for no limit.
+            overflow: "block", "drop-oldest" or "coalesce", for when
+                `maxsize` events are waiting, see `Session.subscribe()`.
+
+        """
+        session = self.get_session()
+        return session.events(string, maxsize=maxsize, overflow=overflow)
+
     def subscribe_once(self, string: str) -> asyncio.Future[Any]:
         """
         Return a future for a browser event for the first session of this target.
@@ -376,3 +660,44 @@ class Target:
         """
         session = self.get_session()
         return session.subscribe_once(string)
+
+
+def _split(command: CommandSpec) -> tuple[str, Params]:
+    if isinstance(command, str):
+        return command, None
+    method, params = command
+    return method, params
+
+
+async def _collect(
+    futures: list[asyncio.Future[protocol.BrowserResponse]],
+    *,
+    ordered: bool,
+) -> (
+    list[protocol.BrowserResponse] | AsyncIterator[tuple[int, protocol.BrowserResponse]]
+):
+    if not ordered:
+        return _as_completed(futures)
+    try:
+        return list(await asyncio.gather(*futures))
+    finally:  # after an error, nobody waits for the rest
+        for future in futures:
+            future.cancel()
+
+
+async def _as_completed(
+    futures: list[asyncio.Future[protocol.BrowserResponse]],
+) -> AsyncIterator[tuple[int, protocol.BrowserResponse]]:
+    index = {future: i for i, future in enumerate(futures)}
+    pending = set(futures)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for future in sorted(done, key=index.__getitem__):
+                yield index[future], future.result()
+    finally:  # the caller stopped iterating
+        for future in pending:
+            future.cancel()
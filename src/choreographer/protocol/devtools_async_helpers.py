@@ -197,15 +197,13 @@ async def execute_js_and_wait(
         await temp_session.send_command("Page.enable")
         await temp_session.send_command("Runtime.enable")
 
-        response = await asyncio.wait_for(
-            temp_session.send_command(
-                "Runtime.evaluate",
-                params={
-                    "expression": expression,
-                    "awaitPromise": True,
-                    "returnByValue": True,
-                },
-            ),
+        response = await temp_session.send_command(
+            "Runtime.evaluate",
+            params={
+                "expression": expression,
+                "awaitPromise": True,
+                "returnByValue": True,
+            },
             timeout=timeout,
         )
 
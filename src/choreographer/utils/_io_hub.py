@@ -0,0 +1,282 @@
+"""Serve every browser's stderr and exit from the event loop, not threads."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import TYPE_CHECKING
+
+import logistro
+
+from ._manual_thread_pool import ManualThreadExecutor
+
+if TYPE_CHECKING:
+    import logging
+    import subprocess
+    from typing import Any, Callable, MutableMapping, Union
+
+    Parser = Callable[[logging.LogRecord, MutableMapping[str, Any]], bool]
+    Process = Union[subprocess.Popen[bytes], subprocess.Popen[str]]
+
+_logger = logistro.getLogger(__name__)
+
+_HAS_PIDFD = hasattr(os, "pidfd_open")  # linux, python 3.9+
+
+POLL_INTERVAL = 0.1
+"""Seconds between checks on processes, where exits can't be watched."""
+WORKERS = 3
+"""Threads in the hub's executor, for the few calls that must block."""
+
+# what logistro.getPipeLogger() blanks, they'd describe our reader, not the browser
+_PIPE_ATTRS = ("filename", "funcName", "threadName", "taskName")
+
+
+class _PipeFilter:
+    def __init__(self, parser: Parser | None) -> None:
+        self._parser = parser
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        old_info = {}
+        for attr in _PIPE_ATTRS:
+            if hasattr(record, attr):
+                old_info[attr] = getattr(record, attr)
+                setattr(record, attr, "")
+        return self._parser(record, old_info) if self._parser else True
+
+
+class LogPipe:
+    """
+    A pipe whose lines are logged, read by the event loop.
+
+    Give `fd` to the process (`Popen(stderr=...)`), `close()` once it exits.
+    """
+
+    __slots__ = ("_buffer", "_loop", "_read", "fd", "logger")
+
+    fd: int
+    """The end to write to."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, logger: logging.Logger) -> None:
+        """
+        Open a pipe and log what comes through it.
+
+        Args:
+            loop: the loop to read it from.
+            logger: where lines go, at DEBUG.
+
+        Raises:
+            NotImplementedError: the loop can't watch pipes.
+
+        """
+        self._read, self.fd = os.pipe()
+        self._loop: asyncio.AbstractEventLoop | None = loop
+        self._buffer = bytearray()
+        self.logger = logger
+        try:
+            loop.add_reader(self._read, self._on_readable)
+        except (NotImplementedError, ValueError, OSError) as e:
+            os.close(self._read)
+            os.close(self.fd)
+            raise NotImplementedError(f"Loop can't watch pipes: {e!r}") from e
+        os.set_blocking(self._read, False)
+
+    def _on_readable(self) -> None:
+        try:
+            data = os.read(self._read, 2**16)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._finish()
+            return
+        self._buffer += data
+        *lines, rest = self._buffer.split(b"\n")
+        self._buffer = bytearray(rest)
+        self._log(lines)
+
+    def _log(self, lines: list[bytearray]) -> None:
+        for line in lines:
+            if line:
+                self.logger.debug(line.decode(errors="replace"))
+
+    def _finish(self) -> None:
+        if not self._loop:
+            return
+        if not self._loop.is_closed():
+            self._loop.remove_reader(self._read)
+        self._loop = None
+        self._log([self._buffer])
+        os.close(self._read)
+
+    def close(self) -> None:
+        """Close our copy of `fd`, log what's left and stop reading."""
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass  # already closed
+        if self._loop:
+            self._on_readable()  # what's already in the pipe
+            self._finish()
+
+
+class IOHub:
+    """
+    The process's one watcher of browsers' stderr and exits, see `get_hub()`.
+
+    The running event loop reads every browser's stderr and watches for every
+    browser's exit, with a pidfd on Linux or else by checking on one timer,
+    so browsers add no threads. The few calls that must block, like
+    `Popen()`, share one small `executor`.
+    """
+
+    def __init__(self) -> None:
+        """Construct a hub, its executor starts on first use."""
+        self._executor: ManualThreadExecutor | None = None
+        self._watched = 0  # pidfds on loops
+        self._filtered: set[tuple[str, Parser | None]] = set()
+        self._waiting: dict[
+            asyncio.AbstractEventLoop,
+            dict[asyncio.Future[int], Process],
+        ] = {}
+
+    @property
+    def executor(self) -> ManualThreadExecutor:
+        """Threads shared by every browser for blocking calls."""
+        if not self._executor:
+            self._executor = ManualThreadExecutor(max_workers=WORKERS, name="io_hub")
+        return self._executor
+
+    def log_pipe(self, name: str, parser: Parser | None = None) -> LogPipe | int:
+        """
+        Return a pipe whose lines are logged, like `logistro.getPipeLogger()`.
+
+        Args:
+            name: the logger's name.
+            parser: modifies each record, dropping it if it returns False.
+
+        Returns:
+            A `LogPipe`, or if the loop can't watch pipes (the Windows
+            proactor loop can't) the write end of one read by a thread.
+
+        """
+        loop = asyncio.get_running_loop()
+        logger = logistro.getLogger(name)
+        if (name, parser) not in self._filtered:  # once, not once per browser
+            logger.addFilter(_PipeFilter(parser))
+            self._filtered.add((name, parser))
+        try:
+            return LogPipe(loop, logger)
+        except NotImplementedError as e:
+            _logger.debug(f"Logging {name} from a thread: {e}")
+            fd, _ = logistro.getPipeLogger(name, parser=parser)
+            return fd
+
+    def wait(self, process: Process) -> asyncio.Future[int]:
+        """
+        Return a future for `process`'s exit code.
+
+        Cancel it to stop waiting. On Linux the loop watches a pidfd, which
+        is readable once the process exits, elsewhere it's checked every
+        `POLL_INTERVAL`.
+
+        Args:
+            process: the process.
+
+        """
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[int] = loop.create_future()
+        returncode = process.poll()
+        if returncode is not None:
+            future.set_result(returncode)
+        elif not self._watch(loop, future, process):
+            self._poll_later(loop, future, process)
+        return future
+
+    def _watch(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        future: asyncio.Future[int],
+        process: Process,
+    ) -> bool:
+        if not _HAS_PIDFD:
+            return False
+        try:
+            pidfd = os.pidfd_open(process.pid)
+        except OSError as e:  # too old a kernel, or it's been reaped
+            _logger.debug(f"No pidfd for {process.pid}: {e!r}")
+            return False
+        try:
+            loop.add_reader(pidfd, self._exited, loop, future, process, pidfd)
+        except (NotImplementedError, ValueError, OSError) as e:
+            _logger.debug(f"Loop can't watch pidfds: {e!r}")
+            os.close(pidfd)
+            return False
+
+        def forget(_: asyncio.Future[int]) -> None:
+            self._watched -= 1
+            if not loop.is_closed():
+                loop.remove_reader(pidfd)
+            os.close(pidfd)
+
+        self._watched += 1
+        future.add_done_callback(forget)
+        return True
+
+    def _exited(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        future: asyncio.Future[int],
+        process: Process,
+        pidfd: int,
+    ) -> None:
+        returncode = process.poll()
+        if returncode is not None:
+            if not future.done():
+                future.set_result(returncode)
+            return
+        # shouldn't happen, but don't spin on the fd: check on a timer
+        loop.remove_reader(pidfd)
+        self._poll_later(loop, future, process)
+
+    def _poll_later(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        future: asyncio.Future[int],
+        process: Process,
+    ) -> None:
+        for old in [old for old in self._waiting if old.is_closed()]:
+            del self._waiting[old]  # a loop closed while its processes ran
+        waiting = self._waiting.get(loop)
+        if waiting is None:
+            waiting = self._waiting[loop] = {}
+            loop.call_later(POLL_INTERVAL, self._poll, loop)
+        waiting[future] = process
+        # stop if it's cancelled
+        future.add_done_callback(lambda f: waiting.pop(f, None))
+
+    def _poll(self, loop: asyncio.AbstractEventLoop) -> None:
+        waiting = self._waiting[loop]
+        for future, process in list(waiting.items()):
+            returncode = process.poll()
+            if returncode is not None and not future.done():
+                future.set_result(returncode)
+        if waiting:
+            loop.call_later(POLL_INTERVAL, self._poll, loop)
+        else:
+            del self._waiting[loop]
+
+    def __repr__(self) -> str:
+        polled = sum(len(futures) for futures in self._waiting.values())
+        return f"<IOHub waiting on {self._watched + polled} processes, {polled} polled>"
+
+
+_hub: IOHub | None = None
+
+
+def get_hub() -> IOHub:
+    """Return the process's `IOHub`."""
+    global _hub  # noqa: PLW0603 one per process
+    if not _hub:
+        _hub = IOHub()
+    return _hub
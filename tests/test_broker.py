@@ -0,0 +1,296 @@
+import asyncio
+import json
+import math
+import time
+
+import pytest
+
+from choreographer._brokers import Broker
+from choreographer._brokers._deadlines import TimerWheel
+from choreographer._brokers._lanes import BULK_BYTES, STARVE_AFTER, WriteLanes, classify
+from choreographer._brokers._perf import PerfStore
+from choreographer.channels import AsyncPipe, ChannelClosedError, Envelope, Pipe
+from choreographer.protocol.devtools_async import Session, Target
+
+
+@pytest.fixture
+def broker():
+    pipe = Pipe()
+    yield Broker(None, pipe)
+    pipe.close()
+
+
+def test_session_routing_table(broker):
+    tabs = [Target(f"T{i}", broker) for i in range(1000)]
+    for i, tab in enumerate(tabs):
+        tab._add_session(Session(f"S{i}", broker))  # noqa: SLF001
+    target, session = broker._get_target_session_by_session_id("S999")  # noqa: SLF001
+    assert target is tabs[999]
+    assert session is tabs[999].sessions["S999"]
+
+    tabs[999]._remove_session("S999")  # noqa: SLF001
+    assert broker._get_target_session_by_session_id("S999") is None  # noqa: SLF001
+    # removing a session from a target that doesn't own it changes nothing
+    tabs[0]._remove_session("S1")  # noqa: SLF001
+    assert broker._get_target_session_by_session_id("S1")[0] is tabs[1]  # noqa: SLF001
+
+
+class _Feed(AsyncPipe):
+    """A channel that returns prepared batches, then closes."""
+
+    def __init__(self, batches):
+        super().__init__()
+        self.batches = list(batches)
+
+    async def read_envelopes_async(self):
+        await asyncio.sleep(0)
+        if not self.batches:
+            raise ChannelClosedError
+        raw = self.batches.pop(0)
+        return [Envelope(r) for r in raw], time.perf_counter()
+
+
+class _Browser:
+    def __init__(self):
+        self.closed = asyncio.Event()
+
+    async def close(self):
+        self.closed.set()
+
+
+async def test_one_read_task():
+    event = b'{"method":"Fake.event","params":{},"sessionId":"nobody"}'
+    browser = _Browser()
+    channel = _Feed([[event], [event] * 5, [event] * 2])
+    broker = Broker(browser, channel)
+    broker.run_read_loop()
+    task = broker._current_read_task  # noqa: SLF001
+    await browser.closed.wait()
+    assert broker._current_read_task is task  # noqa: SLF001
+    assert (broker.read_batches, broker.read_messages, broker.read_batch_max) == (
+        3,
+        8,
+        5,
+    )
+    channel.close()
+
+
+def test_perf_store():
+    store = PerfStore(capacity=100)
+    for i in range(250):
+        method = "Page.enable" if i % 2 else "Runtime.evaluate"
+        store.add(i, method, 10, i, i + 0.5, i + 1 + i % 10)
+    assert len(store) == 100  # noqa: PLR2004
+    assert 149 not in store  # noqa: PLR2004
+    assert store.get(249) == (249, 249.5, 259)
+
+    # answered before its write returned, it evicts 150
+    store.add(1000, "Page.enable", 10, math.nan, math.nan, 1001)
+    stats = store.percentiles(q=(0, 50, 100))
+    assert stats["Runtime.evaluate"]["count"] == 49  # noqa: PLR2004
+    assert stats["Page.enable"]["count"] == 50  # noqa: PLR2004
+    assert stats["Page.enable"]["bytes"] == 500  # noqa: PLR2004
+    assert stats["Page.enable"]["write_p50"] == 0.5  # noqa: PLR2004
+    evaluate = stats["Runtime.evaluate"]
+    assert (evaluate["roundtrip_p0"], evaluate["roundtrip_p100"]) == (1, 9)
+    assert math.isclose(stats["Page.enable"]["roundtrip_p50"], 6)
+
+
+class _Sink(AsyncPipe):
+    """A channel that swallows what's written, responses are routed by hand."""
+
+    async def write_frames_async(self, frames):  # noqa: ARG002
+        await asyncio.sleep(0)
+        return time.perf_counter(), time.perf_counter()
+
+
+async def test_in_flight():
+    channel = _Sink()
+    broker = Broker(None, channel)
+    sends = [
+        asyncio.create_task(
+            broker.write_json(
+                {"id": broker.next_command_id(), "method": method, "params": {}},
+            ),
+        )
+        for method in ("Page.enable", "Runtime.enable", "Network.enable")
+    ]
+    await asyncio.sleep(0)  # they're queued
+    await asyncio.gather(*(c.written for c in broker.in_flight.values()))
+    assert [c.method for c in broker.stuck()] == [
+        "Page.enable",
+        "Runtime.enable",
+        "Network.enable",
+    ]
+    assert broker.stuck(older_than=60) == []
+    first = {"id": 0, "method": "Page.enable", "params": {}}
+    assert broker.in_flight[0].size == len(channel.encode(first))
+
+    broker._route(Envelope(b'{"id": 1, "result": {}}'), time.perf_counter())  # noqa: SLF001
+    assert await sends[1] == {"id": 1, "result": {}}
+    assert list(broker.in_flight) == [0, 2]
+    assert broker.get_perf({"id": 1, "method": "Runtime.enable"}) != (0, 0, 0)
+    # ids are broker-wide, a response from another session isn't ours
+    with pytest.raises(RuntimeError):
+        broker._route(Envelope(b'{"id": 0, "sessionId": "S", "result": {}}'), 0)  # noqa: SLF001
+    broker.clean()
+    for send in (sends[0], sends[2]):
+        with pytest.raises(asyncio.CancelledError):
+            await send
+    channel.close()
+
+
+async def test_timer_wheel():
+    expired = []
+    wheel = TimerWheel(expired.append, resolution=0.01, slots=4)
+    now = asyncio.get_running_loop().time()
+    wheel.add(1, now + 0.02)
+    wheel.add(2, now + 0.1)  # more than a turn away
+    wheel.add(3, now + 0.02)
+    wheel.discard(3)
+    await asyncio.sleep(0.05)
+    assert expired == [1]
+    await asyncio.sleep(0.1)
+    assert expired == [1, 2]
+    assert not len(wheel)
+    assert wheel._handle is None  # noqa: SLF001 idle, no timer
+
+
+async def test_write_lanes():
+    assert classify("Target.createTarget", 10) == "control"
+    assert classify("Page.enable", 10) == "normal"
+    assert classify("Page.enable", BULK_BYTES) == "bulk"
+    loop = asyncio.get_running_loop()
+    lanes = WriteLanes()
+    big = b"x" * (BULK_BYTES // 2 + 1)
+    for _ in range(3):
+        lanes.append("bulk", big, loop.create_future())
+    lanes.append("normal", b"n", loop.create_future())
+    cancelled = loop.create_future()
+    lanes.append("control", b"gone", cancelled)
+    cancelled.cancel()
+    lanes.append("control", b"c", loop.create_future())
+    assert lanes.depths() == {"control": 2, "normal": 1, "bulk": 3}
+
+    # control goes first, bulk up to about BULK_BYTES but at least one frame
+    _, frames = lanes.take(100)
+    assert frames == [b"c", b"n", big]
+    assert lanes.depths() == {"control": 0, "normal": 0, "bulk": 2}
+    assert lanes.sent == {"control": 1, "normal": 1, "bulk": 1}
+    assert lanes.peaks == {"control": 2, "normal": 1, "bulk": 3}
+
+    # a full stream of normal frames can't starve bulk forever
+    for _ in range(STARVE_AFTER):
+        for _ in range(2):
+            lanes.append("normal", b"n", loop.create_future())
+        _, frames = lanes.take(1)
+        assert frames == [b"n"]
+    _, frames = lanes.take(1)
+    assert frames == [big]
+
+    lanes.cancel()
+    assert not len(lanes)
+
+    broker = Broker(None, _Sink())
+    session = Session("", broker)
+    with pytest.raises(ValueError, match="control, normal, bulk"):
+        await session.send_command(
+            "Page.enable",
+            priority="high",  # type: ignore [arg-type]
+        )
+    assert broker.in_flight == {}
+
+
+async def test_command_timeout():
+    channel = _Sink()
+    broker = Broker(None, channel)
+    key = broker.next_command_id()
+    with pytest.raises(asyncio.TimeoutError):
+        await broker.write_json(
+            {"id": key, "method": "Page.enable", "params": {}},
+            timeout=0.01,
+        )
+    assert (broker.in_flight, broker.timeouts) == ({}, 1)
+    broker._route(Envelope(b'{"id": %d, "result": {}}' % key), 0)  # noqa: SLF001
+    assert broker.late_responses == 1
+
+    # giving up from outside forgets the command too
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(
+            broker.write_json(
+                {"id": broker.next_command_id(), "method": "Page.enable"},
+            ),
+            0.01,
+        )
+    assert broker.in_flight == {}
+    assert not len(broker._deadlines)  # noqa: SLF001
+    broker.clean()
+    channel.close()
+
+
+class _Recorder(_Sink):
+    """A sink that keeps each write's frames."""
+
+    def __init__(self):
+        super().__init__()
+        self.writes = []
+
+    async def write_frames_async(self, frames):
+        self.writes.append(list(frames))
+        return await super().write_frames_async(frames)
+
+
+async def test_large_encode_yields():
+    channel = _Recorder()
+    broker = Broker(None, channel)
+    large = {"id": broker.next_command_id(), "method": "Runtime.evaluate"}
+    large["params"] = {"expression": "1+" * 2**21 + "1"}
+    small = {"id": broker.next_command_id(), "method": "Page.enable"}
+    sends = [asyncio.create_task(broker.write_json(o)) for o in (large, small)]
+    while len(channel.writes) < 2:  # noqa: ASYNC110, PLR2004 no responses come
+        await asyncio.sleep(0)
+    # the small one didn't wait for the large one to be encoded
+    assert [json.loads(frame[:-1]) for [frame] in channel.writes] == [small, large]
+    for send in sends:
+        send.cancel()
+    await asyncio.gather(*sends, return_exceptions=True)
+
+
+def _respond(broker, key, result):
+    response = b'{"id": %d, "sessionId": "S", "result": %s}' % (key, result)
+    broker._route(Envelope(response), 0)  # noqa: SLF001
+
+
+async def test_send_commands():
+    channel = _Recorder()
+    broker = Broker(None, channel)
+    target = Target("T", broker)
+    session = Session("S", broker)
+    target._add_session(session)  # noqa: SLF001
+
+    batch = asyncio.create_task(
+        session.send_commands(["Page.enable", ("Page.navigate", {"url": "x"})]),
+    )
+    await asyncio.sleep(0.01)
+    assert len(channel.writes) == 1  # one write for the batch
+    assert len(channel.writes[0]) == 2  # noqa: PLR2004
+    first, second = list(broker.in_flight)
+    _respond(broker, second, b"2")
+    _respond(broker, first, b"1")
+    assert [r["result"] for r in await batch] == [1, 2]
+
+    responses = await target.send_commands(
+        [(session, "A.a", None), "B.b", "C.c"],
+        ordered=False,
+    )
+    keys = list(broker.in_flight)
+    assert len(keys) == 3  # noqa: PLR2004
+    _respond(broker, keys[2], b"3")
+    assert await responses.__anext__() == (
+        2,
+        {"id": keys[2], "sessionId": "S", "result": 3},
+    )
+    await responses.aclose()  # stop waiting for the others
+    await asyncio.sleep(0)
+    assert broker.in_flight == {}
+    channel.close()
@@ -1,4 +1,6 @@
 import asyncio
+import os
+import sys
 
 import logistro
 import pytest
@@ -15,6 +17,85 @@ pytestmark = pytest.mark.asyncio(loop_scope="function")
 _logger = logistro.getLogger(__name__)
 
 
+class _NoProcess:
+    """A browser_cls that starts nothing, for what doesn't need chrome."""
+
+    def __init__(self, channel, path, **kwargs):
+        pass
+
+
+# answers the first command, setDiscoverTargets, reports no tab and dies
+_DIES = """
+import json, os, time
+data = b""
+while b"\\0" not in data:
+    data += os.read(0, 2**16)
+command = json.loads(data.split(b"\\0")[0])
+os.write(1, json.dumps({"id": command["id"], "result": {}}).encode() + b"\\0")
+time.sleep(0.2)
+"""
+
+
+class _Dies(_NoProcess):
+    def __init__(self, channel, path, **kwargs):  # noqa: ARG002
+        self._channel = channel
+        self.path = path
+
+    def pre_open(self):
+        pass
+
+    def get_popen_args(self):
+        return {
+            "close_fds": True,
+            "stdin": self._channel.from_choreo_to_external,
+            "stdout": self._channel.from_external_to_choreo,
+        }
+
+    def get_cli(self):
+        return [sys.executable, "-c", _DIES]
+
+    def get_env(self):
+        return os.environ.copy()
+
+    def clean(self):
+        pass
+
+    def is_isolated(self):
+        return False
+
+
+async def test_open_fails_if_browser_dies():
+    browser = choreo.Browser(browser_cls=_Dies)
+    with pytest.raises(errors.BrowserFailedError) as e:
+        await asyncio.wait_for(browser.open(), choreo.browser_async.FIRST_TAB_TIMEOUT)
+    assert isinstance(e.value.__cause__, errors.BrowserClosedError)
+    await browser.close()
+
+
+async def test_channel_without_codec():
+    # channels written before codecs take no arguments
+    class OldPipe(choreo.channels.Pipe):
+        def __init__(self):
+            super().__init__()
+
+    browser = choreo.Browser(browser_cls=_NoProcess, channel_cls=OldPipe)
+    assert isinstance(browser._channel, OldPipe)  # noqa: SLF001
+    browser._channel.close()  # noqa: SLF001
+
+
+async def test_remove_tab_ends_streams():
+    browser = choreo.Browser(browser_cls=_NoProcess)
+    broker = browser._broker  # noqa: SLF001
+    tab = choreo.Tab("T", broker)
+    tab._add_session(devtools_async.Session("S", broker))  # noqa: SLF001
+    browser._add_tab(tab)  # noqa: SLF001
+    events = tab.events("Page.*")
+    browser._remove_tab("T")  # noqa: SLF001
+    assert events.closed
+    assert [e async for e in events] == []
+    browser._channel.close()  # noqa: SLF001
+
+
 @pytest.mark.asyncio
 async def test_create_and_close_tab(browser):
     _logger.info("testing...")
@@ -162,6 +243,16 @@ async def test_populate_targets(browser):
     assert len(browser.tabs) >= 1
 
 
+@pytest.mark.asyncio
+async def test_open_discovers_tab(browser):
+    _logger.info("testing...")
+    # open() waits for the first tab's event, then stops listening
+    assert browser.get_tab() is not None
+    assert "Target.targetCreated" not in browser.get_session().subscriptions
+    tab = await browser.create_tab("")
+    assert list(browser.tabs).count(tab.target_id) == 1
+
+
 @pytest.mark.asyncio
 async def test_get_tab(browser):
     _logger.info("testing...")
@@ -0,0 +1,159 @@
+import math
+import os
+import threading
+
+import pytest
+
+from choreographer.channels import ChannelClosedError, Envelope, JSONError, Pipe
+from choreographer.channels import _cbor as cbor
+
+codec = cbor.CborCodec()
+
+
+@pytest.fixture
+def pipe():
+    pipe = Pipe(codec="cbor")
+    pipe.open()
+    yield pipe
+    pipe.close()
+
+
+def _peer(pipe, answer):
+    """Be chromium: read one command, write what `answer` makes of it."""
+    fd = pipe.from_choreo_to_external
+    data = os.read(fd, cbor.ENVELOPE_HEAD)
+    size = cbor.frame_size(data)
+    while len(data) < size:
+        data += os.read(fd, size - len(data))
+    response = codec.encode(answer(codec.decode(data)))
+    view = memoryview(response)
+    while view:
+        view = view[os.write(pipe.from_external_to_choreo, view) :]
+
+
+def test_wire_format():
+    # what chromium's crdtp writes and reads: an envelope, indefinite map
+    assert codec.encode({"id": 1, "method": "Page.enable"}) == (
+        b"\xd8\x18\x5a\x00\x00\x00\x19\xbf\x62id\x01\x66method\x6bPage.enable\xff"
+    )
+    # binary is tagged, integers past 32 bits are doubles
+    assert codec.encode([b"\x00\x01", -1, 2**40, None]) == (
+        b"\x9f\xd6\x42\x00\x01\x20\xfb\x42\x70\x00\x00\x00\x00\x00\x00\xf6\xff"
+    )
+
+
+def test_round_trip():
+    message = {
+        "id": 2**31 - 1,
+        "params": {
+            "data": b"\x89PNG\x00" * 1000,
+            "text": "héllo ✓" * 100,
+            "list": [1, -(2**31), 1.5, True, False, None, {"nested": []}],
+            "big": 2**53,
+        },
+        "sessionId": "ABC",
+    }
+    decoded = codec.decode(codec.encode(message))
+    assert decoded["params"].pop("big") == 2.0**53
+    del message["params"]["big"]
+    assert decoded == message
+
+
+def test_non_finite_and_keys():
+    assert codec.decode(codec.encode({"a": math.nan, 1: math.inf})) == {
+        "a": None,
+        "1": None,
+    }
+
+
+def test_decode_crdtp_forms():
+    # a definite map, a UTF-16 byte string and half and single floats
+    message = (
+        b"\xa3"
+        b"\x62id\x18\x2a"
+        b"\x66result\xa1\x64text\x44"
+        + "hé".encode("utf-16-le")
+        + b"\x61f\x82\xf9\x3c\x00\xfa\x3f\xc0\x00\x00"
+    )
+    assert codec.decode(message) == {
+        "id": 42,
+        "result": {"text": "hé"},
+        "f": [1.0, 1.5],
+    }
+
+
+def test_decode_errors():
+    message = codec.encode({"id": 1})
+    with pytest.raises(JSONError):
+        codec.decode(message[:-1])
+    with pytest.raises(JSONError):
+        codec.decode(message + b"\x00")
+    with pytest.raises(JSONError):
+        codec.decode(b"\x5f\x41a\xff")  # indefinite byte strings
+
+
+@pytest.mark.parametrize(
+    ("message", "fields"),
+    [
+        ({"id": 3, "result": {"data": b"x"}}, (3, None, "", False)),
+        ({"id": 4, "error": {"code": 1}, "sessionId": "S"}, (4, None, "S", True)),
+        (
+            {"method": "Page.loaded", "params": {}, "sessionId": "S"},
+            (None, "Page.loaded", "S", False),
+        ),
+    ],
+)
+def test_envelope(message, fields):
+    envelope = Envelope(codec.encode(message), codec)
+    assert (
+        envelope.id,
+        envelope.method,
+        envelope.session_id,
+        envelope.has_error,
+    ) == fields
+    assert envelope._message is None  # noqa: SLF001 peeked, not parsed
+    assert envelope.message() == message
+
+
+def test_pipe_screenshot(pipe):
+    png = os.urandom(3 * 2**20)  # big enough to take the read buffer
+
+    def answer(command):
+        assert command == {"id": 1, "method": "Page.captureScreenshot", "params": {}}
+        return {"id": 1, "result": {"data": png}}
+
+    peer = threading.Thread(target=_peer, args=(pipe, answer), daemon=True)
+    peer.start()
+    pipe.write_json({"id": 1, "method": "Page.captureScreenshot", "params": {}})
+    envelopes = []
+    while not envelopes:
+        envelopes, _ = pipe.read_envelopes(blocking=True)
+    peer.join()
+    assert envelopes[0].id == 1
+    assert envelopes[0].message()["result"]["data"] == png
+
+
+def test_pipe_partial_envelopes(pipe):
+    first, second = codec.encode({"id": 1}), codec.encode({"id": 2})
+    os.write(pipe.from_external_to_choreo, first + second[:5])
+    jsons, _ = pipe.read_jsons(blocking=False)
+    assert jsons == [{"id": 1}]
+    os.write(pipe.from_external_to_choreo, second[5:])
+    jsons, _ = pipe.read_jsons(blocking=False)
+    assert jsons == [{"id": 2}]
+
+
+def test_pipe_closes_on_garbage(pipe):
+    os.write(pipe.from_external_to_choreo, b'{"id": 1}\0')
+    with pytest.raises(ChannelClosedError):
+        pipe.read_jsons(blocking=True)
+    assert not pipe.is_ready()
+
+
+def test_pipe_no_terminator(pipe):
+    json_pipe = Pipe()
+    assert pipe.cbor
+    assert not json_pipe.cbor
+    json_pipe.close()
+    assert pipe.encode({"id": 1}) == codec.encode({"id": 1})
+    assert b"".join(pipe.encode_chunks({"id": 1})) == codec.encode({"id": 1})
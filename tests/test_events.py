@@ -0,0 +1,194 @@
+import asyncio
+
+import pytest
+
+from choreographer._brokers import Broker
+from choreographer._brokers._dispatch import Dispatcher
+from choreographer.channels import Envelope, Pipe
+from choreographer.protocol._events import EventQueue, Subscription
+from choreographer.protocol.devtools_async import Session, Target
+
+
+def _drain(queue):
+    out = []
+    while queue:
+        out.append(queue.get())
+    return out
+
+
+def test_queue_overflow():
+    queue = EventQueue(maxsize=3, overflow="drop-oldest")
+    for i in range(5):
+        queue.put("A", i)
+    assert _drain(queue) == [2, 3, 4]
+    assert queue.dropped == 2  # noqa: PLR2004
+
+    queue = EventQueue(maxsize=3, overflow="coalesce")
+    for method, i in [("A", 0), ("B", 1), ("C", 2), ("B", 3), ("D", 4), ("B", 5)]:
+        queue.put(method, i)
+    # B kept its place with the latest, D had no twin so A was dropped
+    assert _drain(queue) == [5, 2, 4]
+    assert (queue.coalesced, queue.dropped) == (2, 1)
+
+    queue = EventQueue(maxsize=2)
+    for i in range(4):
+        queue.put("A", i)
+    assert queue.full()
+    assert _drain(queue) == [0, 1, 2, 3]  # "block" keeps them
+
+    with pytest.raises(ValueError, match="overflow"):
+        EventQueue(overflow="later")
+
+
+async def test_dispatch_order_and_limit():
+    dispatcher = Dispatcher(concurrency=2)
+    seen = {"A": [], "B": [], "C": []}
+    most = 0
+
+    def track(name):
+        async def callback(event):
+            nonlocal most
+            most = max(most, dispatcher.running)
+            await asyncio.sleep(0.001 * (event % 3))  # out of order if concurrent
+            seen[name].append(event)
+
+        return Subscription(callback, repeating=True, queue=EventQueue())
+
+    subscriptions = {name: track(name) for name in seen}
+    for i in range(30):
+        for name, subscription in subscriptions.items():
+            dispatcher.dispatch(subscription, name, i)
+    await asyncio.gather(*dispatcher._workers.values())  # noqa: SLF001
+    assert all(events == list(range(30)) for events in seen.values())
+    assert most == 2  # noqa: PLR2004
+
+    inline = []
+    dispatcher.dispatch(Subscription(inline.append, True, None), "A", 1)  # noqa: FBT003
+    assert inline == [1]
+    assert dispatcher.inline == 1
+
+
+async def test_dispatch_block():
+    dispatcher = Dispatcher()
+    release = asyncio.Event()
+
+    async def slow(event):  # noqa: ARG001
+        await release.wait()
+
+    subscription = Subscription(slow, True, EventQueue(maxsize=2))  # noqa: FBT003
+    for i in range(3):  # the first is taken at once
+        dispatcher.dispatch(subscription, "A", i)
+    await asyncio.sleep(0)
+    dispatcher.dispatch(subscription, "A", 3)
+    assert dispatcher.blocked()
+    paused = asyncio.create_task(dispatcher.yield_to_callbacks())
+    await asyncio.sleep(0.01)
+    assert not paused.done()
+    release.set()
+    await asyncio.wait_for(paused, 1)
+    assert not dispatcher.blocked()
+
+
+async def test_dispatch_block_timeout(caplog):
+    dispatcher = Dispatcher(concurrency=1, block_timeout=0.05)
+    response = asyncio.Event()  # never read, reading is paused
+
+    async def waits_on_browser(event):  # noqa: ARG001
+        await response.wait()
+
+    queue = EventQueue(maxsize=1)
+    subscription = Subscription(waits_on_browser, True, queue)  # noqa: FBT003
+    for i in range(3):  # the first is taken at once
+        dispatcher.dispatch(subscription, "A", i)
+    await asyncio.sleep(0)
+    assert dispatcher.blocked()
+    await asyncio.wait_for(dispatcher.yield_to_callbacks(), 1)
+    assert not dispatcher.blocked()
+    assert queue.overflow == "drop-oldest"
+    assert "Event queue full" in caplog.text
+    dispatcher.dispatch(subscription, "A", 3)
+    assert queue.dropped == 1
+    assert not dispatcher.blocked()
+    dispatcher.cancel()
+
+
+def _event(n, method="Network.dataReceived"):
+    return Envelope(
+        b'{"method": "%s", "sessionId": "S", "params": {"n": %d}}'
+        % (method.encode(), n),
+    )
+
+
+async def _next(stream):
+    return await stream.__anext__()
+
+
+async def _take(stream, n):
+    for _ in range(n):
+        yield await _next(stream)
+
+
+async def test_awaitable_callbacks():
+    pipe = Pipe()
+    broker = Broker(None, pipe)
+    session = Session("S", broker)
+    Target("T", broker)._add_session(session)  # noqa: SLF001
+    seen = []
+
+    class Callback:
+        async def __call__(self, event):
+            seen.append(("object", event["params"]["n"]))
+
+    async def record(event):
+        seen.append(("lambda", event["params"]["n"]))
+
+    session.subscribe("Page.*", Callback())
+    session.subscribe("Page.loadEventFired", lambda e: record(e))  # noqa: PLW0108
+    assert session.subscriptions["Page.*"].queue is not None
+    broker._route(_event(0, "Page.loadEventFired"), 0)  # noqa: SLF001
+    await asyncio.sleep(0.01)
+    assert sorted(seen) == [("lambda", 0), ("object", 0)]
+    pipe.close()
+
+
+async def test_callback_unsubscribes():
+    pipe = Pipe()
+    broker = Broker(None, pipe)
+    session = Session("S", broker)
+    Target("T", broker)._add_session(session)  # noqa: SLF001
+    seen = []
+    # both match, the first runs inline and removes the second
+    session.subscribe("Page.*", lambda _: session.unsubscribe("Page.loadEventFired"))
+    session.subscribe("Page.loadEventFired", seen.append)
+    broker._route(_event(0, "Page.loadEventFired"), 0)  # noqa: SLF001
+    assert seen == []
+    assert list(session.subscriptions) == ["Page.*"]
+    pipe.close()
+
+
+async def test_event_stream():
+    pipe = Pipe()
+    broker = Broker(None, pipe)
+    target = Target("T", broker)
+    session = Session("S", broker)
+    target._add_session(session)  # noqa: SLF001
+
+    async with session.events("Network.*") as events:
+        for n in range(3):  # before anyone iterates
+            broker._route(_event(n), 0)  # noqa: SLF001
+        broker._route(_event(9, "Page.loadEventFired"), 0)  # noqa: SLF001
+        assert [e["params"]["n"] async for e in _take(events, 2)] == [0, 1]
+        assert [e["params"]["n"] for e in events.drain()] == [2]
+    assert "Network.*" not in session.streams
+    assert [e async for e in events] == []  # closed and empty, it ends
+
+    events = target.events("Network.*", maxsize=1, overflow="block")
+    broker._route(_event(0), 0)  # noqa: SLF001
+    assert broker.dispatcher.blocked()
+    waiting = asyncio.create_task(_next(events))
+    broker._route(_event(1), 0)  # noqa: SLF001
+    assert (await waiting)["params"]["n"] == 0
+    target._remove_session("S")  # noqa: SLF001
+    assert events.closed
+    assert not broker.dispatcher.blocked()  # a closed stream never holds reads
+    pipe.close()
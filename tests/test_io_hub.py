@@ -0,0 +1,57 @@
+import asyncio
+import logging
+import subprocess
+import sys
+
+import pytest
+
+from choreographer.utils import _io_hub
+from choreographer.utils._io_hub import LogPipe, get_hub
+
+
+async def test_log_pipe(caplog):
+    caplog.set_level(logging.DEBUG, logger="hub_test")
+
+    def parser(record, _old):
+        record.msg = record.msg.upper()
+        return record.msg != "DROP"
+
+    hub = get_hub()
+    pipe = hub.log_pipe("hub_test", parser=parser)
+    assert isinstance(pipe, LogPipe)
+    process = subprocess.Popen(  # noqa: ASYNC220 it starts at once
+        [sys.executable, "-c", "import sys; sys.stderr.write('one\\ndrop\\ntwo')"],
+        stderr=pipe.fd,
+    )
+    assert await hub.wait(process) == 0
+    pipe.close()
+    assert [r.getMessage() for r in caplog.records if r.name == "hub_test"] == [
+        "ONE",
+        "TWO",
+    ]
+
+
+@pytest.mark.parametrize("pidfd", [True, False], ids=["pidfd", "polled"])
+async def test_wait(monkeypatch, pidfd):
+    if pidfd and not _io_hub._HAS_PIDFD:  # noqa: SLF001
+        pytest.skip("No pidfd here.")
+    monkeypatch.setattr(_io_hub, "_HAS_PIDFD", pidfd)
+    hub = get_hub()
+    process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(5)"])  # noqa: ASYNC220
+    try:
+        # giving up forgets the process
+        try:
+            await asyncio.wait_for(hub.wait(process), 0.2)
+        except asyncio.TimeoutError:
+            pass
+        await asyncio.sleep(0)
+        assert "waiting on 0 processes" in repr(hub)
+        waits = [hub.wait(process) for _ in range(2)]
+        assert f"{int(not pidfd) * 2} polled" in repr(hub)
+        process.kill()
+        assert await asyncio.gather(*waits) == [-9, -9]
+        await asyncio.sleep(0)
+        assert "waiting on 0 processes" in repr(hub)
+    finally:
+        process.kill()
+        process.wait()
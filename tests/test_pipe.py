@@ -0,0 +1,196 @@
+import asyncio
+import json
+import os
+import threading
+
+import pytest
+
+from choreographer.channels import AsyncPipe, ChannelClosedError, Pipe
+
+
+@pytest.fixture
+def pipe():
+    pipe = Pipe()
+    pipe.open()
+    yield pipe
+    pipe.close()
+
+
+def _browser_write(pipe, data):
+    os.write(pipe.from_external_to_choreo, data)
+
+
+def test_read_several_messages(pipe):
+    _browser_write(pipe, b'{"id": 1}\0{"id": 2}\0{"id": 3}\0')
+    jsons, _ = pipe.read_jsons(blocking=True)
+    assert [j["id"] for j in jsons] == [1, 2, 3]
+
+
+def test_partial_message_kept_between_reads(pipe):
+    _browser_write(pipe, b'{"id": 1}\0{"id": ')
+    jsons, _ = pipe.read_jsons(blocking=False)
+    assert [j["id"] for j in jsons] == [1]
+    jsons, _ = pipe.read_jsons(blocking=False)
+    assert jsons == []
+    _browser_write(pipe, b'2, "method": "x"}\0')
+    jsons, _ = pipe.read_jsons(blocking=False)
+    assert jsons == [{"id": 2, "method": "x"}]
+
+
+def test_large_message(pipe):
+    data = "x" * (8 * 2**20)
+    message = b'{"id": 1, "result": {"data": "' + data.encode() + b'"}}\0'
+
+    writer = threading.Thread(
+        target=lambda: _browser_write(pipe, message),
+        daemon=True,
+    )
+    writer.start()
+    jsons, _ = pipe.read_jsons(blocking=True)
+    writer.join()
+    assert len(jsons) == 1
+    assert jsons[0]["result"]["data"] == data
+
+
+def test_large_frame_takes_buffer(pipe):
+    data = "x" * (4 * 2**20)
+    message = b'{"id":1,"result":{"data":"' + data.encode() + b'"}}\0{"id": '
+
+    writer = threading.Thread(
+        target=lambda: _browser_write(pipe, message),
+        daemon=True,
+    )
+    writer.start()
+    envelopes, _ = pipe.read_envelopes(blocking=True)
+    writer.join()
+    assert envelopes[0].id == 1
+    assert envelopes[0].message()["result"]["data"] == data
+    assert pipe._buffer.capacity() < 2**20  # noqa: SLF001 the big one went with it
+    _browser_write(pipe, b"2}\0")
+    jsons, _ = pipe.read_jsons(blocking=True)
+    assert jsons == [{"id": 2}]
+
+
+def test_bye_closes(pipe):
+    _browser_write(pipe, b"{bye}\n")
+    with pytest.raises(ChannelClosedError):
+        pipe.read_jsons(blocking=True)
+    assert not pipe.is_ready()
+
+
+def _read_frames(pipe, count):
+    received = bytearray()
+    while received.count(b"\0") < count:
+        received += os.read(pipe.from_choreo_to_external, 2**20)
+    return [json.loads(f) for f in received.split(b"\0")[:-1]]
+
+
+def test_write_frames(pipe):
+    frames = [pipe.encode({"id": i, "data": "x" * i * 2**18}) for i in range(8)]
+    received = []
+    reader = threading.Thread(  # 7MB doesn't fit in the pipe
+        target=lambda: received.extend(_read_frames(pipe, 8)),
+        daemon=True,
+    )
+    reader.start()
+    start, end = pipe.write_frames(frames)
+    reader.join()
+    assert start <= end
+    assert [r["id"] for r in received] == list(range(8))
+    assert received[7]["data"] == "x" * 7 * 2**18
+
+
+def test_write_chunks(pipe):
+    command = {"id": 1, "params": {"expression": "x" * 3 * 2**20, "n": [1.5] * 9}}
+    chunks = pipe.encode_chunks(command)
+    received = []
+    reader = threading.Thread(
+        target=lambda: received.extend(_read_frames(pipe, 1)),
+        daemon=True,
+    )
+    reader.start()
+    pipe.write_chunks(chunks)
+    reader.join()
+    assert received == [command]
+
+
+def test_write_chunks_fails_halfway(pipe):
+    def chunks(head):
+        yield head
+        raise TypeError
+
+    with pytest.raises(TypeError):  # nothing written yet
+        pipe.write_chunks(chunks(b'{"id": 1, '))
+    head = b'{"id": 2, "params": "' + b"x" * 2**18
+    with pytest.raises(TypeError):
+        pipe.write_chunks(chunks(head))
+    pipe.write_json({"id": 3})
+    received = bytearray()
+    while received.count(b"\0") < 2:  # noqa: PLR2004
+        received += os.read(pipe.from_choreo_to_external, 2**20)
+    # the broken frame is terminated, the next one is intact
+    assert received == head + b'\0{"id": 3}\0'
+
+
+@pytest.fixture
+async def async_pipe():
+    pipe = AsyncPipe()
+    pipe.open()
+    assert pipe.attach(asyncio.get_running_loop())
+    yield pipe
+    pipe.close()
+
+
+async def test_async_read(async_pipe):
+    read = asyncio.create_task(async_pipe.read_envelopes_async())
+    await asyncio.sleep(0)
+    assert not read.done()
+    _browser_write(async_pipe, b'{"id": 1')
+    await asyncio.sleep(0.01)
+    assert not read.done()
+    _browser_write(async_pipe, b"}\0")
+    envelopes, _ = await asyncio.wait_for(read, timeout=1)
+    assert [e.message() for e in envelopes] == [{"id": 1}]
+
+
+async def test_async_write_waits_for_reader(async_pipe):
+    loop = asyncio.get_running_loop()
+    data = "x" * (4 * 2**20)  # bigger than the pipe
+    write = asyncio.create_task(async_pipe.write_json_async({"data": data}))
+    await asyncio.sleep(0.01)
+    assert not write.done()
+
+    received = bytearray()
+    fd = async_pipe.from_choreo_to_external
+    while not received.endswith(b"\0"):
+        received += await loop.run_in_executor(None, os.read, fd, 2**20)
+    start, end = await asyncio.wait_for(write, timeout=1)
+    assert start <= end
+    assert json.loads(received[:-1]) == {"data": data}
+
+
+async def test_async_close_wakes_reader(async_pipe):
+    read = asyncio.create_task(async_pipe.read_envelopes_async())
+    await asyncio.sleep(0)
+    async_pipe.close()
+    with pytest.raises(ChannelClosedError):
+        await asyncio.wait_for(read, timeout=1)
+
+
+async def test_async_write_frames(async_pipe):
+    loop = asyncio.get_running_loop()
+    frames = [async_pipe.encode({"id": i, "data": "x" * 2**20}) for i in range(4)]
+    write = asyncio.create_task(async_pipe.write_frames_async(frames))
+    received = await loop.run_in_executor(None, _read_frames, async_pipe, 4)
+    await asyncio.wait_for(write, timeout=1)
+    assert [r["id"] for r in received] == [0, 1, 2, 3]
+
+
+async def test_async_write_chunks(async_pipe):
+    loop = asyncio.get_running_loop()
+    command = {"id": 1, "params": {"data": "x" * 3 * 2**20}}
+    chunks = async_pipe.encode_chunks(command)
+    write = asyncio.create_task(async_pipe.write_chunks_async(chunks))
+    received = await loop.run_in_executor(None, _read_frames, async_pipe, 1)
+    await asyncio.wait_for(write, timeout=1)
+    assert received == [command]
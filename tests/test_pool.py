@@ -0,0 +1,165 @@
+import asyncio
+
+import pytest
+
+import choreographer as choreo
+
+pytestmark = pytest.mark.asyncio(loop_scope="function")
+
+
+async def test_open_fails():
+    # trying again can't find chrome, so it's raised at once
+    pool = choreo.BrowserPool(2, path="/nonexistent/chrome")
+    with pytest.raises(choreo.errors.ChromeNotFoundError):
+        await asyncio.wait_for(pool.open(), 5)
+    assert "closed" in repr(pool)
+
+
+async def test_open_retries(monkeypatch):
+    monkeypatch.setattr(choreo.pool, "RETRY_DELAY", 0)
+
+    class Flaky(choreo.BrowserPool):
+        async def _create(self):
+            raise RuntimeError("flaky")
+
+    pool = Flaky(1)
+    with pytest.raises(RuntimeError, match="flaky"):
+        await asyncio.wait_for(pool.open(), 5)
+    assert pool.start_failures == choreo.pool.OPEN_ATTEMPTS
+
+
+async def test_tab_pool_open_fails(monkeypatch):
+    monkeypatch.setattr(choreo.pool, "RETRY_DELAY", 0)
+
+    class Tab:
+        target_id = "T"
+
+        def subscribe(self, *_):
+            pass
+
+        async def send_commands(self, _):
+            raise choreo.channels.ChannelClosedError
+
+    class Browser:
+        def __init__(self):
+            self.tabs = {}
+
+        async def create_tab(self, _):
+            self.tabs["T"] = Tab()
+            return self.tabs["T"]
+
+        async def close_tab(self, target_id):
+            del self.tabs[target_id]
+
+    browser = Browser()
+    pool = choreo.TabPool(browser, 1)  # type: ignore [arg-type]
+    with pytest.raises(choreo.channels.ChannelClosedError):
+        await asyncio.wait_for(pool.open(), 5)
+    assert browser.tabs == {}
+    assert pool._origins == {}  # noqa: SLF001
+
+
+class _Objects(choreo.pool._Pool):  # noqa: SLF001
+    """A pool of plain objects, for what doesn't need chrome."""
+
+    async def _create(self):
+        return object()
+
+    async def _alive(self, item):  # noqa: ARG002
+        return True
+
+    async def _check(self, item):  # noqa: ARG002
+        return True
+
+    async def _destroy(self, item):
+        pass
+
+
+async def test_close_wakes_leases():
+    pool = _Objects(2, None, None)
+    await pool.open()
+    async with pool._lease(None), pool._lease(None):  # noqa: SLF001
+        waiting = asyncio.create_task(pool._acquire(None))  # noqa: SLF001
+        await asyncio.sleep(0)
+        await pool.close()
+        with pytest.raises(RuntimeError, match="closed"):
+            await asyncio.wait_for(waiting, 1)
+
+
+async def test_idle_max_age():
+    pool = _Objects(1, None, 0.05)
+    await pool.open()
+    async with pool._lease(None) as first:  # noqa: SLF001
+        pass
+    await asyncio.sleep(0.1)  # too old while idle
+    async with pool._lease(1) as second:  # noqa: SLF001
+        assert second is not first
+    assert pool.recycled == 1
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_lease_and_recycle(request):
+    headless = request.config.getoption("--headless")
+    async with choreo.BrowserPool(1, max_jobs=2, headless=headless) as pool:
+        async with pool.lease() as first:
+            assert isinstance(first, choreo.Browser)
+            tab = await first.create_tab("")
+            await first.close_tab(tab)
+        async with pool.lease() as second:
+            assert second is first
+        async with pool.lease(timeout=20) as third:
+            assert third is not first  # replaced after max_jobs
+        assert (pool.leases, pool.recycled, pool.unhealthy) == (3, 1, 0)
+        stats = pool.stats()
+        assert stats["size"] == 1
+        assert 0 < stats["utilization"] < 1
+
+        # a browser that dies while leased fails its check
+        async with pool.lease() as fourth:
+            await fourth.close()
+        async with pool.lease(timeout=20) as fifth:
+            assert fifth is not fourth
+        assert pool.unhealthy == 1
+
+        # only one browser, so a second lease waits
+        async with pool.lease():
+            with pytest.raises(asyncio.TimeoutError):
+                async with pool.lease(timeout=0.1):
+                    pass
+    assert "closed" in repr(pool)
+
+
+@pytest.mark.asyncio
+async def test_tab_pool(browser):
+    async with choreo.TabPool(browser, 1, max_jobs=2) as pool:
+        async with pool.lease() as first:
+            assert first.target_id in browser.tabs
+            first.subscribe("Page.frameNavigated", lambda _: None)
+            response = await first.send_command(
+                "Page.navigate",
+                params={"url": "data:text/html,<p>hi</p>"},
+            )
+            assert "result" in response
+        async with pool.lease(timeout=10) as second:
+            assert second is first
+            # reset: the job's subscription is gone, the tab is blank
+            assert "Page.frameNavigated" not in second.get_session().subscriptions
+            response = await second.send_command(
+                "Runtime.evaluate",
+                params={"expression": "location.href", "returnByValue": True},
+            )
+            assert response["result"]["result"]["value"] == "about:blank"
+        async with pool.lease(timeout=10) as third:
+            assert third is not first  # replaced after max_jobs
+        await asyncio.sleep(0.5)
+        assert first.target_id not in browser.tabs
+        assert (pool.leases, pool.recycled, pool.unhealthy) == (3, 1, 0)
+
+    # a tab the job closes is replaced
+    async with choreo.TabPool(browser, 1) as pool:
+        async with pool.lease() as first:
+            await first.close()
+        async with pool.lease(timeout=10) as second:
+            assert second is not first
+        assert pool.unhealthy == 1
@@ -14,7 +14,7 @@ import choreographer.channels._wire as wire
 import logistro
 import numpy as np
 import pytest
-from choreographer.channels import register_custom_encoder
+from choreographer.channels import Envelope, JSONError, register_custom_encoder
 
 if TYPE_CHECKING:
     from typing import Any
@@ -69,3 +69,137 @@ async def test_de_serialize():
     assert len(obj_np) == len(converted_type)
     for o, t in zip(obj_np, converted_type):
         assert isinstance(o, t)
+
+
+@pytest.mark.parametrize("codec", wire.available_codecs())
+async def test_codecs(codec):
+    for obj in (data, np.array(data)):
+        message = wire.serialize(obj, codec)
+        decoded = wire.deserialize(message, codec)
+        assert decoded[:6] == [1, 2.0, 3, None, None, None]
+        assert datetime.fromisoformat(decoded[6].replace("Z", "+00:00")) == _timestamp
+    scalars = {"i": np.int64(3), "f": np.float64(1.5), "nan": np.float64("nan")}
+    decoded = wire.deserialize(wire.serialize(scalars, codec), codec)
+    assert decoded == {"i": 3, "f": 1.5, "nan": None}
+    with pytest.raises(JSONError):
+        wire.deserialize(b'{"id": ', codec)
+
+
+async def test_unknown_codec():
+    with pytest.raises(ValueError, match="Unknown codec"):
+        wire.serialize(data, "not-a-codec")
+
+
+@pytest.mark.parametrize(
+    ("raw", "fields"),
+    [
+        (b'{"id":3,"result":{"a":1},"sessionId":"S1"}', (3, None, "S1", False)),
+        (b'{"id":4,"error":{"code":-1}}', (4, None, "", True)),
+        (
+            b'{"method":"Page.x","params":{"sessionId":"no"}}',
+            (None, "Page.x", "", False),
+        ),
+        (
+            b'{"method":"Page.x","params":{},"sessionId":"S2"}',
+            (None, "Page.x", "S2", False),
+        ),
+        # not laid out like chromium's, so it's parsed
+        (
+            b'{"sessionId": "S3", "method": "Page.y", "params": {}}',
+            (None, "Page.y", "S3", False),
+        ),
+    ],
+)
+async def test_envelope(raw, fields):
+    envelope = Envelope(raw)
+    assert (
+        envelope.id,
+        envelope.method,
+        envelope.session_id,
+        envelope.has_error,
+    ) == fields
+    assert envelope.message() == json.loads(raw)
+
+
+async def test_envelope_is_lazy():
+    envelope = Envelope(b'{"method":"Page.x","params":{"a":}}')  # bad json
+    assert envelope.method == "Page.x"
+    with pytest.raises(JSONError):
+        envelope.message()
+    with pytest.raises(JSONError):
+        Envelope(b'{"params": ')
+
+
+async def test_estimate_size():
+    assert wire.estimate_size({"expression": "x" * 2**20}) >= 2**20
+    assert wire.estimate_size({"arguments": [{"value": list(range(10**5))}]}) >= 10**5
+    assert wire.estimate_size({"value": np.zeros(2**17)}) == 2**20 + 4
+    assert wire.estimate_size({"id": 1, "method": "Page.enable"}) < 2**10
+
+
+@pytest.mark.parametrize("codec", wire.available_codecs())
+@pytest.mark.parametrize("fast", [True, False])
+async def test_arrays(codec, fast, monkeypatch):
+    if not fast:  # as if orjson and msgspec weren't installed
+        monkeypatch.setattr(wire, "_fast_formatter", lambda: None)
+    arrays = {
+        "floats": np.array([1.5, np.nan, np.inf, -np.inf]),
+        "ints": np.arange(3, dtype=np.uint8),
+        "bools": np.array([True, False]),
+        "strided": np.arange(6.0)[::2],
+        "matrix": np.arange(4).reshape(2, 2),
+        "half": np.array([1, 2], dtype=np.float16),
+        "dates": np.array(["2020-01-01", "NaT"], dtype="datetime64[D]"),
+        "empty": np.array([], dtype="datetime64[s]"),
+    }
+    decoded = wire.deserialize(wire.serialize(arrays, codec), codec)
+    assert decoded == {
+        "floats": [1.5, None, None, None],
+        "ints": [0, 1, 2],
+        "bools": [True, False],
+        "strided": [0.0, 2.0, 4.0],
+        "matrix": [[0, 1], [2, 3]],
+        "half": [1.0, 2.0],
+        "dates": ["2020-01-01", None],
+        "empty": [],
+    }
+
+
+def _fast_array_encoding():
+    try:
+        import orjson  # noqa: F401, PLC0415
+    except ImportError:
+        try:
+            import msgspec  # noqa: F401, PLC0415
+        except ImportError:
+            return False
+    return True
+
+
+@pytest.mark.skipif(not _fast_array_encoding(), reason="needs orjson or msgspec")
+async def test_array_encoding_in_bulk():
+    # the speed is in benchmarks/bench_arrays.py, here it's that it's taken
+    a = np.random.default_rng(0).random(10)
+    assert wire._format_array(a) is not None  # noqa: SLF001 the bulk path
+    assert json.loads(wire.serialize({"x": a})) == {"x": a.tolist()}
+
+
+@pytest.mark.parametrize(
+    "codec",
+    [c for c in wire.available_codecs() if not wire.is_binary(c)],  # cbor is whole
+)
+async def test_iter_serialize(codec):
+    obj = {
+        "id": 1,
+        "params": {
+            "expression": 'é"\n\\' * 1000,
+            "arguments": [{"value": list(range(5000))}, float("nan")],
+            "array": np.arange(3000.0),
+        },
+    }
+    chunks = list(wire.iter_serialize(obj, codec, chunk_size=2**10))
+    assert len(chunks) > 10  # noqa: PLR2004
+    assert wire.deserialize(b"".join(chunks), codec) == wire.deserialize(
+        wire.serialize(obj, codec),
+        codec,
+    )
@@ -0,0 +1,41 @@
+import random
+
+from choreographer.protocol._subscriptions import SubscriptionIndex, matches
+
+_METHODS = [
+    "Page.loadEventFired",
+    "Page.frameNavigated",
+    "Network.requestWillBeSent",
+    "Network.responseReceived",
+    "Target.targetCreated",
+    "Runtime.consoleAPICalled",
+]
+
+
+def test_matches_like_a_scan():
+    rng = random.Random(0)  # noqa: S311 not crypto
+    queries = [*_METHODS, "*", "Page.*", "Network.re*", "Network.response*", "N*"]
+    index = SubscriptionIndex()
+    for _ in range(500):
+        query = rng.choice(queries)
+        if query in index and rng.random() < 0.5:  # noqa: PLR2004
+            del index[query]
+        else:
+            index[query] = None
+        for method in _METHODS:
+            expected = tuple(q for q in index if matches(q, method))
+            assert index.match(method) == expected
+
+
+def test_subscription_order_and_values():
+    index = SubscriptionIndex()
+    index["Page.*"] = 1
+    index["Page.loadEventFired"] = 2
+    index["*"] = 3
+    assert index.match("Page.loadEventFired") == ("Page.*", "Page.loadEventFired", "*")
+    assert index.match("Network.dataReceived") == ("*",)
+    index["Page.*"] = 4  # replacing keeps its place
+    assert list(index.items()) == [("Page.*", 4), ("Page.loadEventFired", 2), ("*", 3)]
+    assert index.pop("*") == 3  # noqa: PLR2004
+    assert index.match("Network.dataReceived") == ()
+    assert len(index) == 2  # noqa: PLR2004